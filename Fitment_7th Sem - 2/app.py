@@ -1,11 +1,36 @@
-from flask import Flask, render_template, request, jsonify, Response
+import time
+_import_started = time.perf_counter()  # startup_seconds in /healthz counts from here
+
+from flask import Flask, render_template, request, jsonify, Response, g
 from flask_cors import CORS
 import os
-import pickle
-import requests
 import json
-from utils.resume_parser import parse_resume
+import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import heapq
+import hmac
+import tempfile
+import threading
+import uuid
+import requests
+from utils.resume_parser import copy_stream, extract_requirements, parse_resume, save_upload
 from utils.score_calculator import calculate_fitment_score
+from utils.batch_scorer import score_profiles, norm_list, parse_experience
+from utils.bulk_writer import bulk_upsert, bulk_upsert_async
+from utils.async_supabase import AsyncSupabaseClient, AsyncSupabaseError
+from utils import async_supabase
+from utils.supabase_client import get_client
+from utils.skill_index import INDEX_ROWS, get_skill_index
+from utils.attrition_predictor import get_predictor, features_from_profile
+from utils.bulk_ingest import MAX_FILE_BYTES, iter_parsed, iter_saved_uploads
+from utils.candidate_store import STORE_ROWS, canonical_skills, get_candidate_store, scoring_profile, upsert_candidates
+from utils.job_queue import RankJobQueue
+from utils.rank_cache import DEFAULT_DB_PATH as RANK_CACHE_DB, RankCache, job_fingerprint, profile_key, row_fingerprint
+from utils.skill_vectors import get_skill_matcher
+from utils.ttl_cache import InvalidationLog, TTLCache
+from utils import metrics
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,7 +43,8 @@ CORS_ALLOWED_ORIGINS = os.getenv("FLASK_ALLOW_ORIGINS", "*")
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": CORS_ALLOWED_ORIGINS,
     "Access-Control-Allow-Methods": "GET, POST, OPTIONS, PATCH",
-    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Profile",
+    "Access-Control-Expose-Headers": "Server-Timing, X-Rank-Rescored",
 }
 
 @app.after_request
@@ -27,19 +53,101 @@ def add_cors_headers(response):
         response.headers.setdefault(k, v)
     return response
 
+# Per-request stage breakdown in a Server-Timing header, for requests sent with
+# "X-Profile: 1" (or ?profile=1); METRICS_PROFILING=0 turns the option off
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "1") != "0"
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    if PROFILING_ENABLED and "1" in (request.headers.get("X-Profile"), request.args.get("profile")):
+        g.profile_token = metrics.start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.HTTP_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method)
+    profile = metrics.current_profile()
+    if g.get("profile_token") is not None and profile is not None:
+        response.headers["Server-Timing"] = metrics.server_timing(profile, elapsed)
+    return response
+
+@app.teardown_request
+def end_request_profile(exc):
+    token = g.pop("profile_token", None)
+    if token is not None:
+        metrics.end_profile(token)
+
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Load trained ML model & scaler
-with open("models/attrition_model.pkl", "rb") as f:
-    attrition_model = pickle.load(f)
-with open("models/scaler.pkl", "rb") as f:
-    scaler = pickle.load(f)
+# Load trained ML model & scaler once, fused into a single batched predictor
+attrition_predictor = get_predictor()
+# Map the skill vectors (SKILL_MATCH_MODE=semantic) before any worker fork so the pages are shared
+get_skill_matcher()
+
+# Job requirements (saves a Supabase round trip per /rank) and normalized candidate profiles.
+# Webhook invalidations go through a table in the rank cache's SQLite file, so every worker drops the entry.
+CACHE_LOG = InvalidationLog(RANK_CACHE_DB, interval=float(os.getenv("CACHE_SYNC_INTERVAL", "1")))
+JOB_CACHE = TTLCache("job_requirements", maxsize=int(os.getenv("JOB_CACHE_SIZE", "1024")),
+                     ttl=float(os.getenv("JOB_CACHE_TTL", "300")), log=CACHE_LOG)
+PROFILE_CACHE = TTLCache("candidate_profiles", maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "20000")),
+                         ttl=float(os.getenv("PROFILE_CACHE_TTL", "3600")), log=CACHE_LOG)
+# /score and /rank build profiles from differently shaped rows, so each keeps its own entry per candidate
+PROFILE_SOURCES = ("score", "rank")
+# candidate ids published here are re-read into every worker's columnar store and skill index
+CACHE_LOG.attach(STORE_ROWS)
+CACHE_LOG.attach(INDEX_ROWS)
+
+def _candidate_store(client):
+    """The columnar store with this worker caught up on webhook changes."""
+    CACHE_LOG.sync()
+    return get_candidate_store(client)
+
+def _scoring_profile(candidate, source="rank"):
+    """
+    scoring_profile with skills and experience already normalized, cached
+    per (source, candidate id). An entry is only reused while the row it was
+    built from is unchanged, so a stale profile is never scored; /score and
+    the Supabase webhook replace or drop entries early.
+    """
+    candidate_id = candidate.get("id")
+    key = (source, candidate_id)
+    if candidate_id is not None:
+        cached = PROFILE_CACHE.get(key, check=lambda entry: entry[0] == candidate)
+        if cached is not None:
+            return cached[1]
+    profile = scoring_profile(candidate)
+    # both are idempotent, so scores and fingerprints are the same as for the raw profile
+    profile["skills"] = norm_list(profile["skills"])
+    profile["experience_years"] = parse_experience(profile["experience_years"])
+    profile["fingerprint_key"] = profile_key(profile)
+    if candidate_id is not None:
+        PROFILE_CACHE.set(key, (candidate, profile))
+    return profile
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
+def _required_skills_field():
+    """The optional comma separated "skills_required" form field of the upload routes."""
+    return [s for s in (request.form.get("skills_required") or "").split(",") if s.strip()]
+
+def _score_resume(candidate, req_skills, attrition_prob):
+    """
+    (fitment_score, breakdown) of parsed resume features. With required skills
+    the skill match comes from the parsed skills; without, it stays the
+    parser's placeholder (DEFAULT_FEATURES), as do cultural fit and growth.
+    """
+    if req_skills:
+        _, _, columns = score_profiles(req_skills, [candidate], attrition_prob)
+        # score_profiles reports a percentage; the parser's skill_match, like the rest, is a 0-1 fraction
+        candidate = {**candidate, "skill_match": float(columns["skill_match"][0]) / 100.0}
+    return calculate_fitment_score(candidate, attrition_prob)
+
 @app.route("/upload", methods=["POST"])
 def upload_resume():
     if "resume" not in request.files:
@@ -48,16 +156,30 @@ def upload_resume():
     if file.filename == "":
         return "No selected file", 400
 
-    filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(filepath)
+    # Stream to uploads/<sha256><ext>; the hash doubles as the parse cache key
+    try:
+        with metrics.stage("upload", "save"):
+            filepath, digest = save_upload(file.stream, UPLOAD_FOLDER, file.filename, max_bytes=MAX_FILE_BYTES)
+    except ValueError as e:
+        return str(e), 400
 
-    # Extract candidate info
-    candidate_data = parse_resume(filepath)
+    # Extract candidate info (cached by content hash, so re-uploads skip parsing)
+    try:
+        with metrics.stage("upload", "parse"):
+            candidate_data = parse_resume(filepath, digest=digest)
+    except Exception:
+        app.logger.exception("Failed to parse resume %s", file.filename)
+        metrics.FAILURES.inc(endpoint="upload", stage="parse")
+        # nothing will ever read it back
+        with contextlib.suppress(OSError):
+            os.remove(filepath)
+        return "Could not read resume", 422
+    (metrics.CACHE_HITS if candidate_data.get("cache_hit") else metrics.CACHE_MISSES).inc(cache="resume_parse")
 
     # Log parsed resume for debugging (prints to Flask console)
     try:
         import json as _json
-        app.logger.info("Parsed resume data: %s", _json.dumps(candidate_data, ensure_ascii=False))
+        app.logger.info("Parsed resume data: %s", _json.dumps({k: v for k, v in candidate_data.items() if k != "text"}, ensure_ascii=False))
         # Also log extracted plain text if present
         text_preview = candidate_data.get("text") or candidate_data.get("raw_text") or candidate_data.get("resume_text")
         if text_preview:
@@ -69,27 +191,102 @@ def upload_resume():
     if request.args.get("json") == "1":
         return jsonify({"parsed": candidate_data}), 200
 
-    # Create feature vector matching model input
-    feature_vector = [
-        candidate_data["Age"],
-        candidate_data["JobSatisfaction"],
-        candidate_data["EnvironmentSatisfaction"],
-        candidate_data["MonthlyIncome"],
-        candidate_data["YearsAtCompany"],
-        candidate_data["DistanceFromHome"],
-        candidate_data["WorkLifeBalance"],
-        candidate_data["Education"],
-        candidate_data["JobInvolvement"]
-    ]
-
-    # Scale and predict attrition probability
-    X_scaled = scaler.transform([feature_vector])
-    attrition_prob = attrition_model.predict_proba(X_scaled)[0][1]
+    # Create feature vector matching model input and predict attrition probability
+    with metrics.stage("upload", "attrition"):
+        feature_vector = [candidate_data[name] for name in attrition_predictor.feature_names]
+        attrition_prob = attrition_predictor.predict_one(feature_vector)
 
     # Calculate fitment score
-    final_score, breakdown = calculate_fitment_score(candidate_data, attrition_prob)
+    with metrics.stage("upload", "score"):
+        final_score, breakdown = _score_resume(candidate_data, _required_skills_field(), attrition_prob)
+    metrics.ROWS_SCORED.inc(endpoint="upload")
+
+    with metrics.stage("upload", "render"):
+        return render_template("result.html", score=final_score, breakdown=breakdown)
+
+@app.route("/upload/batch", methods=["POST"])
+def upload_resume_batch():
+    """
+    Multipart form with one or more "resumes" files (PDF/DOCX/TXT or .zip
+    archives of them), optionally "skills_required" (comma separated) to score
+    against a job.
+
+    Resumes are parsed in a process pool and results are streamed back as
+    NDJSON, one line per file, in completion order:
+    { "file", "sha256", "cache_hit", "skills", "experience_years", "fitment_score", "sub_scores" }
+    or { "file", "error" }
+    """
+    files = request.files.getlist("resumes") or request.files.getlist("resume")
+    files = [f for f in files if f.filename]
+    if not files:
+        return jsonify({"error": "no files uploaded"}), 400
+    req_skills = _required_skills_field()
+
+    # the request's file streams are closed before the response body is
+    # generated, so stage the uploads on disk first; a resume over
+    # MAX_FILE_BYTES is rejected here (zip members are capped as they are extracted)
+    staged = []
+
+    def discard_staged():
+        # runs when the stream ends and again when the response is closed, which
+        # also covers a client that disconnects before the stream ever starts
+        for _, path in staged:
+            if path is not None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+    with metrics.stage("upload_batch", "stage"):
+        try:
+            for f in files:
+                fd, path = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix=".batch")
+                staged.append((f.filename, path))
+                limit = None if f.filename.lower().endswith(".zip") else MAX_FILE_BYTES
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        copy_stream(f.stream, out, limit)
+                except ValueError:
+                    os.remove(path)
+                    staged[-1] = (f.filename, None)
+        except BaseException:
+            discard_staged()
+            raise
+
+    def score(name, candidate):
+        features = features_from_profile(candidate)
+        attrition_prob = attrition_predictor.predict_one(features) if features else 0.0
+        final_score, breakdown = _score_resume(candidate, req_skills, attrition_prob)
+        return {
+            "file": name,
+            "sha256": candidate.get("sha256"),
+            "cache_hit": candidate.get("cache_hit"),
+            "skills": candidate.get("skills"),
+            "experience_years": candidate.get("experience_years"),
+            "fitment_score": final_score,
+            "sub_scores": breakdown,
+        }
 
-    return render_template("result.html", score=final_score, breakdown=breakdown)
+    def generate():
+        try:
+            for name, candidate, error in iter_parsed(iter_saved_uploads(staged, UPLOAD_FOLDER)):
+                if error is None:
+                    (metrics.CACHE_HITS if candidate.get("cache_hit") else metrics.CACHE_MISSES).inc(cache="resume_parse")
+                    try:
+                        line = score(name, candidate)
+                        metrics.ROWS_SCORED.inc(endpoint="upload_batch")
+                    except Exception:
+                        app.logger.exception("Scoring failed for %s", name)
+                        metrics.FAILURES.inc(endpoint="upload_batch", stage="score")
+                        line = {"file": name, "error": "scoring failed"}
+                else:
+                    metrics.FAILURES.inc(endpoint="upload_batch", stage="parse")
+                    line = {"file": name, "error": error}
+                yield json.dumps(line) + "\n"
+        finally:
+            discard_staged()
+
+    response = Response(generate(), mimetype="application/x-ndjson")
+    response.call_on_close(discard_staged)
+    return response
 
 @app.route("/score", methods=["POST"])
 def score_and_upsert_application():
@@ -120,51 +317,26 @@ def score_and_upsert_application():
 
         # Determine required skills list from job payload
         required_skills = job.get("skills_required") or job.get("skills") or []
-        # Normalize skills lists to compare
-        def norm_list(arr):
-            return [str(x).strip().lower() for x in (arr or []) if str(x).strip()]
 
-        req_skills_norm = norm_list(required_skills)
-        cand_skills_norm = norm_list(profile.get("skills") or profile.get("skills_text") or [])
+        # normalized once per distinct profile; this call replaces any entry built from older data
+        with metrics.stage("score", "profile"):
+            scoring_profile = _scoring_profile({"id": candidate_id, "profile": profile}, source="score")
 
-        skill_match = 0.0
-        if req_skills_norm and cand_skills_norm:
-            matches = set(req_skills_norm).intersection(set(cand_skills_norm))
-            skill_match = (len(matches) / max(1, len(req_skills_norm))) * 100.0
+        # compute attrition probability when the profile carries the model features, else 0
+        with metrics.stage("score", "attrition"):
+            features = scoring_profile["attrition_features"]
+            attrition_prob = attrition_predictor.predict_one(features) if features else 0.0
 
-        # experience_years may be provided or embedded; try to parse fallback
-        exp_years = 0
-        try:
-            exp_val = profile.get("experience_years") or profile.get("experience") or 0
-            # if experience is a string like "3 years" try to extract digits
-            if isinstance(exp_val, str):
-                import re
-                m = re.search(r"(\d+)", exp_val)
-                exp_years = int(m.group(1)) if m else 0
-            else:
-                exp_years = int(exp_val or 0)
-        except Exception:
-            exp_years = 0
-
-        # construct candidate_data dict matching score_calculator expected keys
-        candidate_data_for_scoring = {
-            "skill_match": skill_match,
-            "experience_years": exp_years,
-            # sensible defaults for downstream features
-            "cultural_fit": float(profile.get("cultural_fit") or 0.5),
-            "growth_potential": float(profile.get("growth_potential") or 0.5),
-            "resume_quality": float(profile.get("resume_quality") or 0.5),
-        }
+        with metrics.stage("score", "score"):
+            scores, breakdowns, _ = score_profiles(required_skills, [scoring_profile], attrition_prob)
+            final_score, breakdown = scores[0], breakdowns[0]
+        metrics.ROWS_SCORED.inc(endpoint="score")
 
-        # compute attrition probability (best-effort). Keep default 0 if not computed.
-        try:
-            # If you can derive model features from profile/resume, do it here and call attrition_model
-            attrition_prob = 0.0
-            # Example: if profile provides features matching your attrition model, compute them.
-        except Exception:
-            attrition_prob = 0.0
-
-        final_score, breakdown = calculate_fitment_score(candidate_data_for_scoring, attrition_prob)
+        # keep the candidate skill index current for /candidates/top
+        with metrics.stage("score", "index_update"):
+            get_skill_index().update(candidate_id, scoring_profile["skills"])
+            # and the columnar store for /candidates/rank and /match/jd (name and email are kept)
+            upsert_candidates([{"id": candidate_id, "profile": profile}])
 
         # robust extractors for breakdown keys (supports varied key naming)
         def get_breakdown_val(b, *keys, default=0.0):
@@ -185,24 +357,18 @@ def score_and_upsert_application():
         bm_attrition = get_breakdown_val(breakdown, "attrition_risk", "Attrition Risk", "attritionRisk")
 
         # Upsert into Supabase via REST (service role). Uses environment secrets.
-        SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").rstrip("/")
-        SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-        if not SUPABASE_URL or not SERVICE_KEY:
+        supabase = get_client()
+        if supabase is None:
             app.logger.warning("Supabase env not configured; returning score only")
             return jsonify({"fitment_score": final_score, "sub_scores": breakdown}), 200
 
-        base_headers = {
-            "Content-Type": "application/json",
-            "apikey": SERVICE_KEY,
-            "Authorization": f"Bearer {SERVICE_KEY}",
-        }
-
         # --- Robust upsert logic: check for existing application, patch by id, otherwise insert ---
         try:
             # Look for existing application row for (job_id, candidate_id)
-            lookup_url = f"{SUPABASE_URL}/rest/v1/applications?job_id=eq.{job_id}&candidate_id=eq.{candidate_id}&select=id"
-            lookup_resp = requests.get(lookup_url, headers=base_headers, timeout=15)
+            with metrics.stage("score", "lookup"):
+                lookup_resp = supabase.get("applications", params={
+                    "job_id": f"eq.{job_id}", "candidate_id": f"eq.{candidate_id}", "select": "id"
+                })
             if lookup_resp.status_code != 200:
                 app.logger.warning("Supabase lookup failed %s %s", lookup_resp.status_code, lookup_resp.text)
                 # fallback: try direct insert
@@ -213,7 +379,6 @@ def score_and_upsert_application():
 
             if existing_app and existing_app.get("id"):
                 app_id = existing_app["id"]
-                patch_url = f"{SUPABASE_URL}/rest/v1/applications?id=eq.{app_id}"
                 patch_body = {
                     "fitment_score": float(final_score),
                     "skill_match": bm_skill,
@@ -221,14 +386,19 @@ def score_and_upsert_application():
                     "growth_potential": bm_growth,
                     "attrition_risk": bm_attrition
                 }
-                patch_headers = {**base_headers, "Prefer": "return=representation"}
-                patch_resp = requests.patch(patch_url, headers=patch_headers, json=patch_body, timeout=15)
+                with metrics.stage("score", "write"):
+                    patch_resp = supabase.patch("applications", params={"id": f"eq.{app_id}"}, json=patch_body,
+                                                headers={"Prefer": "return=representation"})
+                # /rank reuses the score it stored for a row while the row's inputs are unchanged, so
+                # drop that entry (in every worker, the cache is shared) and let the next run rewrite it
+                get_rank_cache().forget(job_id, [str(app_id)])
                 if patch_resp.status_code in (200, 204):
                     app.logger.info("Updated existing application %s with fitment %s", app_id, final_score)
+                    metrics.ROWS_WRITTEN.inc(endpoint="score")
                 else:
+                    metrics.FAILURES.inc(endpoint="score", stage="write")
                     app.logger.warning("Failed to PATCH application %s: %s %s", app_id, patch_resp.status_code, patch_resp.text)
             else:
-                post_url = f"{SUPABASE_URL}/rest/v1/applications"
                 insert_body = {
                     "job_id": job_id,
                     "candidate_id": candidate_id,
@@ -239,14 +409,17 @@ def score_and_upsert_application():
                     "growth_potential": bm_growth,
                     "attrition_risk": bm_attrition
                 }
-                post_headers = {**base_headers, "Prefer": "return=representation"}
-                post_resp = requests.post(post_url, headers=post_headers, json=insert_body, timeout=15)
+                with metrics.stage("score", "write"):
+                    post_resp = supabase.post("applications", json=insert_body, headers={"Prefer": "return=representation"})
                 if post_resp.status_code in (200, 201):
                     app.logger.info("Inserted new application for candidate %s (job %s)", candidate_id, job_id)
+                    metrics.ROWS_WRITTEN.inc(endpoint="score")
                 else:
+                    metrics.FAILURES.inc(endpoint="score", stage="write")
                     app.logger.warning("Failed to INSERT application for candidate %s: %s %s", candidate_id, post_resp.status_code, post_resp.text)
         except Exception:
             app.logger.exception("Supabase upsert error")
+            metrics.FAILURES.inc(endpoint="score", stage="write")
             # still return score to caller even if DB update failed
             return jsonify({"fitment_score": final_score, "sub_scores": breakdown, "warning": "db_upsert_failed"}), 200
 
@@ -257,6 +430,292 @@ def score_and_upsert_application():
         app.logger.exception("Scoring/upsert error")
         return jsonify({"error": "Scoring service error"}), 500
 
+class RankError(Exception):
+    """A ranking run that could not load its inputs; `detail` is the upstream response body."""
+    def __init__(self, message, detail=None, status=500):
+        super().__init__(message)
+        self.detail = detail
+        self.status = status
+
+def _rank_row_key(a):
+    if a.get("id"):
+        return str(a["id"])
+    return f"candidate:{(a.get('candidates') or {}).get('id') or a.get('candidate_id')}"
+
+_rank_cache = None
+
+def get_rank_cache():
+    global _rank_cache
+    if _rank_cache is None:
+        _rank_cache = RankCache()
+    return _rank_cache
+
+RANK_PAGE_SIZE = int(os.getenv("RANK_PAGE_SIZE", "1000"))
+
+def _score_rank_rows(job_id, page, req_skills, job_fp, run_id, payload):
+    """
+    Score one page of application rows, reusing stored scores for rows whose
+    inputs did not change. Returns the page state used by _rank_writes and
+    _store_rank_page; state["scored"] is a list of
+    (application row, fitment_score, sub_scores) for every usable row.
+    """
+    cache = get_rank_cache()
+    scorable = []
+    profiles = []
+    with metrics.stage("rank", "profiles"):
+        for a in page:
+            try:
+                candidate = a.get("candidates") or {}
+                profiles.append(_scoring_profile(candidate))
+                scorable.append(a)
+            except Exception:
+                app.logger.exception("Error processing application row: %s", a)
+                metrics.FAILURES.inc(endpoint="rank", stage="profiles")
+                # continue to next application
+
+    # only rows whose scoring inputs changed since the last run are rescored and written back
+    with metrics.stage("rank", "cache_lookup"):
+        keys = [_rank_row_key(a) for a in scorable]
+        fingerprints = [row_fingerprint(job_fp, p, p.get("fingerprint_key")) for p in profiles]
+        cached = {} if payload.get("force") else cache.lookup(job_id, keys, run_id)
+        stale = [i for i, (k, fp) in enumerate(zip(keys, fingerprints)) if k not in cached or cached[k][0] != fp]
+    metrics.CACHE_HITS.inc(len(keys) - len(stale), cache="rank_fingerprint")
+    metrics.CACHE_MISSES.inc(len(stale), cache="rank_fingerprint")
+
+    scores = [cached[k][1] if k in cached else 0.0 for k in keys]
+    breakdowns = [cached[k][2] if k in cached else {} for k in keys]
+    scoring_failed = False
+    try:
+        stale_profiles = [profiles[i] for i in stale]
+        with metrics.stage("rank", "attrition"):
+            attrition_probs = attrition_predictor.predict_partial([p["attrition_features"] for p in stale_profiles])
+        with metrics.stage("rank", "score"):
+            stale_scores, stale_breakdowns, _ = score_profiles(req_skills, stale_profiles, attrition_probs)
+        for i, s, b in zip(stale, stale_scores, stale_breakdowns):
+            scores[i], breakdowns[i] = s, b
+        metrics.ROWS_SCORED.inc(len(stale), endpoint="rank")
+    except Exception:
+        app.logger.exception("Batch scoring failed for job %s", job_id)
+        metrics.FAILURES.inc(endpoint="rank", stage="score")
+        scoring_failed = True
+        for i in stale:
+            scores[i], breakdowns[i] = 0.0, {}
+
+    return {
+        "scorable": scorable, "keys": keys, "fingerprints": fingerprints, "scores": scores,
+        "breakdowns": breakdowns, "stale": stale, "scoring_failed": scoring_failed,
+        "scored": list(zip(scorable, scores, breakdowns)),
+    }
+
+def _rank_writes(state, job_id):
+    """The rows to write back for a scored page, as [(rows, on_conflict), ...] upserts."""
+    # write changed scores back in chunked upserts instead of one PATCH per row
+    updates, inserts = [], []
+    for i in state["stale"]:
+        a, final_score, breakdown = state["scorable"][i], state["scores"][i], state["breakdowns"][i]
+        candidate = a.get("candidates") or {}
+        if a.get("id"):
+            updates.append({
+                "id": a["id"],
+                "job_id": a.get("job_id") or job_id,
+                "candidate_id": a.get("candidate_id") or candidate.get("id"),
+                "fitment_score": float(final_score),
+                "sub_scores": breakdown
+            })
+        else:
+            # fallback: insert if no application id (unlikely)
+            inserts.append({
+                "job_id": job_id,
+                "candidate_id": candidate.get("id"),
+                "status": "applied",
+                "fitment_score": float(final_score),
+                "sub_scores": breakdown
+            })
+    return [(rows, on_conflict) for rows, on_conflict in ((updates, "id"), (inserts, None)) if rows]
+
+def _note_rank_writes(job_id, rows, written):
+    """Count and log a bulk upsert's outcome; returns the row keys that failed to write."""
+    failed_keys = set()
+    metrics.ROWS_WRITTEN.inc(written["written"], endpoint="rank")
+    if written["failed"]:
+        metrics.FAILURES.inc(len(written["failed"]), endpoint="rank", stage="write")
+    for failure in written["failed"]:
+        row = failure["row"]
+        failed_keys.add(str(row["id"]) if row.get("id") else f"candidate:{row.get('candidate_id')}")
+        app.logger.warning("Failed to write application %s (candidate %s): %s %s",
+                           row.get("id"), row.get("candidate_id"), failure["status"], failure["error"])
+    app.logger.info("Wrote %s/%s application scores for job %s", written["written"], len(rows), job_id)
+    return failed_keys
+
+def _store_rank_page(job_id, state, failed_keys, run_id):
+    # remember what was written so the next run can skip these rows
+    if not state["scoring_failed"]:
+        keys, fingerprints, scores, breakdowns = state["keys"], state["fingerprints"], state["scores"], state["breakdowns"]
+        with metrics.stage("rank", "cache_store"):
+            get_rank_cache().store(job_id, (
+                (keys[i], fingerprints[i], scores[i], breakdowns[i]) for i in state["stale"] if keys[i] not in failed_keys
+            ), run_id)
+
+def _score_rank_page(supabase, job_id, page, req_skills, job_fp, run_id, payload):
+    """
+    Score one page of application rows and write back the changed ones.
+
+    Returns (scored, rescored) where scored is a list of
+    (application row, fitment_score, sub_scores) for every usable row.
+    """
+    state = _score_rank_rows(job_id, page, req_skills, job_fp, run_id, payload)
+    failed_keys = set()
+    for rows, on_conflict in _rank_writes(state, job_id):
+        with metrics.stage("rank", "write"):
+            written = bulk_upsert(supabase, "applications", rows, chunk_size=payload.get("chunk_size"), on_conflict=on_conflict)
+        failed_keys |= _note_rank_writes(job_id, rows, written)
+    _store_rank_page(job_id, state, failed_keys, run_id)
+    return state["scored"], len(state["stale"])
+
+def _rank_result(a, final_score, breakdown):
+    candidate = a.get("candidates") or {}
+    return {
+        "candidate_id": candidate.get("id"),
+        "display_name": candidate.get("display_name"),
+        "email": candidate.get("email"),
+        "fitment_score": float(final_score),
+        "sub_scores": breakdown
+    }
+
+class _RankResults:
+    """Ranked results as pages arrive: all of them, or the best `top_n` (>= 1) in a bounded heap."""
+    def __init__(self, top_n=None):
+        self.top_n = top_n
+        self.heap = []       # (score, -seq, result) min-heap of the best top_n so far
+        self.results = []    # every result when no top_n was asked for
+        self.seq = 0
+
+    def add(self, scored):
+        heap, top_n = self.heap, self.top_n
+        for a, final_score, breakdown in scored:
+            self.seq += 1
+            if top_n is None:
+                self.results.append(_rank_result(a, final_score, breakdown))
+            elif len(heap) < top_n:
+                heapq.heappush(heap, (float(final_score), -self.seq, _rank_result(a, final_score, breakdown)))
+            elif (float(final_score), -self.seq) > heap[0][:2]:
+                heapq.heapreplace(heap, (float(final_score), -self.seq, _rank_result(a, final_score, breakdown)))
+
+    def ranked(self):
+        with metrics.stage("rank", "sort"):
+            if self.top_n is not None:
+                return [r for _, _, r in sorted(self.heap, key=lambda item: (-item[0], -item[1]))]
+            # sort descending
+            self.results.sort(key=lambda x: x.get("fitment_score", 0), reverse=True)
+            return self.results
+
+def _rank_options(payload):
+    """
+    (page_size, top_n) of a rank request; top_n is None when it was left out
+    (rank everything). Raises RankError (400) before any I/O when top_n is not
+    a positive integer, 0 included, or page_size / chunk_size are not integers.
+    """
+    try:
+        page_size = max(1, int(payload.get("page_size") or RANK_PAGE_SIZE))
+        top_n = int(payload["top_n"]) if payload.get("top_n") is not None else None
+        # used by the write-back, checked here so a bad value fails before anything is fetched
+        int(payload.get("chunk_size") or 0)
+    except (TypeError, ValueError):
+        raise RankError("page_size, top_n and chunk_size must be integers", status=400)
+    if top_n is not None and top_n < 1:
+        raise RankError("top_n must be at least 1 (leave it out to rank every application)", status=400)
+    return page_size, top_n
+
+def _job_skills_from_response(job_id, jresp):
+    """
+    Required skills from a jobs?id=eq.<id> response ([] when the lookup
+    failed); found jobs are kept in JOB_CACHE, normalized.
+    """
+    if jresp.status_code == 200:
+        jdata = jresp.json()
+        if isinstance(jdata, list) and len(jdata) > 0:
+            req_skills = norm_list(jdata[0].get("skills") or [])
+            JOB_CACHE.set(job_id, req_skills)
+            return req_skills
+        return None
+    app.logger.warning("Could not fetch job skills: %s %s", jresp.status_code, jresp.text)
+    return []
+
+def _rank_applications_params(job_id):
+    return {
+        "job_id": f"eq.{job_id}",
+        "select": "*,candidates(id,display_name,email,skills,skills_text,experience,github,linkedin,resume_url)",
+    }
+
+def run_rank(supabase, job_id, payload, progress=None, stats=None):
+    """
+    Fetch and rank every application for `job_id`; returns the ranked results.
+    Shared by the synchronous /rank route and the background rank queue.
+
+    Applications are fetched page by page ("page_size", default RANK_PAGE_SIZE)
+    and each page is scored and written back as it arrives. With "top_n" only
+    the best N results are kept, in a bounded heap, so memory depends on the
+    page size rather than the number of applicants.
+
+    Rows whose scoring inputs are unchanged since the last run reuse their
+    stored score; only the rest are rescored and written back ("force": true in
+    the payload rescores everything). `progress(stage, done, total)` is called
+    as the run advances and `stats`, if given, receives total/rescored counts.
+    """
+    progress = progress or (lambda stage, done, total: None)
+    page_size, top_n = _rank_options(payload)
+
+    # Optionally allow caller to pass job details to compute req_skills, otherwise fetch job
+    req_skills = payload.get("job", {}).get("skills_required") or payload.get("job", {}).get("skills")
+    if not req_skills:
+        req_skills = JOB_CACHE.get(job_id)
+    if req_skills is None:
+        # try fetching job from Supabase REST
+        with metrics.stage("rank", "job_skills"):
+            jresp = supabase.get("jobs", params={"id": f"eq.{job_id}", "select": "skills"})
+        req_skills = _job_skills_from_response(job_id, jresp)
+
+    job_fp = job_fingerprint(req_skills, attrition_predictor.version)
+    run_id = uuid.uuid4().hex
+    ranking = _RankResults(top_n)
+    total = rescored = 0
+
+    # fetch applications for the job including candidate details, one keyset page at a time
+    pages = metrics.timed_iter(supabase.iter_pages("applications", params=_rank_applications_params(job_id),
+                                                   page_size=page_size), "rank", "fetch")
+    progress("score", 0, None)
+    try:
+        for page in pages:
+            scored, page_rescored = _score_rank_page(supabase, job_id, page, req_skills, job_fp, run_id, payload)
+            total += len(scored)
+            rescored += page_rescored
+            ranking.add(scored)
+            progress("score", total, None)
+    except requests.HTTPError as e:
+        app.logger.error("Failed to load applications: %s %s", e.response.status_code, e.response.text)
+        metrics.FAILURES.inc(endpoint="rank", stage="fetch")
+        raise RankError("could not load applications", e.response.text)
+
+    # rows that were not seen in this run are gone from the job
+    with metrics.stage("rank", "cache_prune"):
+        get_rank_cache().forget_unseen(job_id, run_id)
+    if stats is not None:
+        stats.update(total=total, rescored=rescored)
+    progress("done", total, total)
+    return ranking.ranked()
+
+def _rank_request():
+    """(payload, Supabase client, None) for a /rank call, or (None, None, error response)."""
+    payload = request.get_json() or {}
+    if not payload.get("job_id"):
+        return None, None, (jsonify({"error": "job_id required"}), 400)
+
+    supabase = get_client()
+    if supabase is None:
+        app.logger.error("Missing Supabase config on server")
+        return None, None, (jsonify({"error": "Supabase config missing on server"}), 500)
+    return payload, supabase, None
+
 @app.route("/rank", methods=["POST", "OPTIONS"])
 def rank_job_applications():
     # respond to preflight directly
@@ -264,138 +723,583 @@ def rank_job_applications():
         return Response(status=204, headers=CORS_HEADERS)
 
     try:
-        payload = request.get_json() or {}
-        job_id = payload.get("job_id")
-        if not job_id:
-            return jsonify({"error": "job_id required"}), 400
-
-        SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").rstrip("/")
-        SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        if not SUPABASE_URL or not SERVICE_KEY:
-            app.logger.error("Missing Supabase config on server")
-            return jsonify({"error": "Supabase config missing on server"}), 500
-
-        base_headers = {
-            "apikey": SERVICE_KEY,
-            "Authorization": f"Bearer {SERVICE_KEY}",
-            "Content-Type": "application/json",
-        }
+        payload, supabase, error = _rank_request()
+        if error:
+            return error
 
-        # fetch applications for the job including candidate details
-        apps_url = f"{SUPABASE_URL}/rest/v1/applications?job_id=eq.{job_id}&select=*,candidates(id,display_name,email,skills,skills_text,experience,github,linkedin,resume_url)"
-        resp = requests.get(apps_url, headers=base_headers, timeout=30)
-        if resp.status_code != 200:
-            app.logger.error("Failed to load applications: %s %s", resp.status_code, resp.text)
-            return jsonify({"error": "could not load applications", "detail": resp.text}), 500
+        stats = {}
+        try:
+            results = run_rank(supabase, payload["job_id"], payload, stats=stats)
+        except RankError as e:
+            return jsonify({"error": str(e), "detail": e.detail}), e.status
+        return jsonify(results), 200, {"X-Rank-Rescored": f"{stats.get('rescored', 0)}/{stats.get('total', 0)}"}
 
-        apps = resp.json()
-        results = []
+    except Exception:
+        app.logger.exception("rank endpoint error")
+        return jsonify({"error": "Ranking service error"}), 500
 
-        def norm_list(arr):
-            return [str(x).strip().lower() for x in (arr or []) if str(x).strip()]
+# --- async ranking ---------------------------------------------------------------
 
-        # Optionally allow caller to pass job details to compute req_skills, otherwise fetch job
-        req_skills = payload.get("job", {}).get("skills_required") or payload.get("job", {}).get("skills")
-        if not req_skills:
-            # try fetching job from Supabase REST
-            job_url = f"{SUPABASE_URL}/rest/v1/jobs?id=eq.{job_id}&select=skills"
-            jresp = requests.get(job_url, headers=base_headers, timeout=15)
-            if jresp.status_code == 200:
-                jdata = jresp.json()
-                if isinstance(jdata, list) and len(jdata) > 0:
-                    req_skills = jdata[0].get("skills") or []
-            else:
-                app.logger.warning("Could not fetch job skills: %s %s", jresp.status_code, jresp.text)
-                req_skills = []
+RANK_WRITE_CONCURRENCY = int(os.getenv("RANK_WRITE_CONCURRENCY", "4"))
+RANK_ASYNC_KEEPALIVE = float(os.getenv("RANK_ASYNC_KEEPALIVE", "10"))
 
-        req_norm_global = norm_list(req_skills)
+_rank_loop = None
+_async_clients = {}
+_rank_loop_lock = threading.Lock()
 
-        for a in apps:
-            try:
-                a_id = a.get("id")
-                candidate = a.get("candidates") or {}
-                profile = candidate.get("profile", {}) if isinstance(candidate.get("profile"), dict) else {}
+def get_rank_loop():
+    """This process's event loop for async rank runs, on a daemon thread started on first use (so after a fork)."""
+    global _rank_loop
+    with _rank_loop_lock:
+        if _rank_loop is None:
+            _rank_loop = asyncio.new_event_loop()
+            threading.Thread(target=_rank_loop.run_forever, name="rank-loop", daemon=True).start()
+            atexit.register(_close_rank_loop)
+        return _rank_loop
 
-                cand_skills_source = profile.get("skills") or profile.get("skills_text") or candidate.get("skills") or candidate.get("skills_text") or []
-                cand_norm = norm_list(cand_skills_source)
+def _close_rank_loop():
+    async def close_clients():
+        for client in list(_async_clients.values()):
+            await client.close()
+    try:
+        asyncio.run_coroutine_threadsafe(close_clients(), _rank_loop).result(timeout=5)
+    except Exception:
+        pass
 
-                skill_match = 0.0
-                if req_norm_global and cand_norm:
-                    matches = set(req_norm_global).intersection(set(cand_norm))
-                    skill_match = (len(matches) / max(1, len(req_norm_global))) * 100.0
+def _async_client(supabase):
+    # one aiohttp session per Supabase client, created on (and only used from) the rank loop
+    client = _async_clients.get(id(supabase))
+    if client is None or client.client is not supabase:
+        client = _async_clients[id(supabase)] = AsyncSupabaseClient(supabase)
+    return client
 
-                # experience
-                exp_years = 0
-                try:
-                    exp_val = profile.get("experience_years") or profile.get("experience") or candidate.get("experience") or 0
-                    if isinstance(exp_val, str):
-                        import re
-                        m = re.search(r"(\d+)", exp_val)
-                        exp_years = int(m.group(1)) if m else 0
-                    else:
-                        exp_years = int(exp_val or 0)
-                except Exception:
-                    exp_years = 0
-
-                candidate_data_for_scoring = {
-                    "skill_match": skill_match,
-                    "experience_years": exp_years,
-                    "cultural_fit": float(profile.get("cultural_fit") or 0.5),
-                    "growth_potential": float(profile.get("growth_potential") or 0.5),
-                    "resume_quality": float(profile.get("resume_quality") or 0.5),
-                }
+async def _write_rank_page(client, semaphore, job_id, state, run_id, payload):
+    failed_keys = set()
+    for rows, on_conflict in _rank_writes(state, job_id):
+        with metrics.stage("rank", "write"):
+            written = await bulk_upsert_async(client, "applications", rows, chunk_size=payload.get("chunk_size"),
+                                              on_conflict=on_conflict, semaphore=semaphore)
+        failed_keys |= _note_rank_writes(job_id, rows, written)
+    await asyncio.to_thread(_store_rank_page, job_id, state, failed_keys, run_id)
 
-                # attrition_prob best-effort (default 0)
-                attrition_prob = 0.0
+async def run_rank_async(supabase, job_id, payload, stats=None, profile=None):
+    """
+    run_rank on asyncio, for high-latency links to Supabase: same results,
+    fingerprint cache and write-backs, but the job lookup and the first page
+    of applications are fetched concurrently, the next page is fetched while
+    the current one is scored, and write-backs from all pages overlap, at most
+    "write_concurrency" (default RANK_WRITE_CONCURRENCY) requests at a time.
+    Scoring runs in a worker thread so other runs on the loop keep going.
 
-                try:
-                    final_score, breakdown = calculate_fitment_score(candidate_data_for_scoring, attrition_prob)
-                except Exception:
-                    app.logger.exception("calculate_fitment_score failed for candidate %s", candidate.get("id"))
-                    final_score, breakdown = 0.0, {}
-
-                # upsert fitment_score for this application row (patch by id)
-                if a_id:
-                    patch_url = f"{SUPABASE_URL}/rest/v1/applications?id=eq.{a_id}"
-                    patch_body = {"fitment_score": float(final_score), "sub_scores": breakdown}
-                    patch_headers = {**base_headers, "Prefer": "return=representation"}
-                    patch_resp = requests.patch(patch_url, headers=patch_headers, json=patch_body, timeout=30)
-                    if patch_resp.status_code not in (200, 204):
-                        app.logger.warning("Failed to update application %s: %s %s", a_id, patch_resp.status_code, patch_resp.text)
-                    else:
-                        app.logger.info("Updated application %s with score %s", a_id, final_score)
-                else:
-                    # fallback: insert if no application id (unlikely)
-                    post_url = f"{SUPABASE_URL}/rest/v1/applications"
-                    insert_body = {
-                        "job_id": job_id,
-                        "candidate_id": candidate.get("id"),
-                        "status": "applied",
-                        "fitment_score": float(final_score),
-                        "sub_scores": breakdown
-                    }
-                    post_resp = requests.post(post_url, headers={**base_headers, "Prefer": "return=representation"}, json=insert_body, timeout=30)
-                    if post_resp.status_code not in (200, 201):
-                        app.logger.warning("Failed to insert application row for candidate %s: %s %s", candidate.get("id"), post_resp.status_code, post_resp.text)
-
-                results.append({
-                    "candidate_id": candidate.get("id"),
-                    "display_name": candidate.get("display_name"),
-                    "email": candidate.get("email"),
-                    "fitment_score": float(final_score),
-                    "sub_scores": breakdown
-                })
+    Cancelling the task stops fetching and writing; pages already written
+    keep their cached fingerprints and the cache is not pruned. `profile` is
+    the request's stage profile (metrics.current_profile()) to record into.
+    """
+    if profile is not None:
+        metrics.start_profile(profile)
+    page_size, top_n = _rank_options(payload)
+    try:
+        write_concurrency = max(1, int(payload.get("write_concurrency") or RANK_WRITE_CONCURRENCY))
+    except (TypeError, ValueError):
+        raise RankError("write_concurrency must be an integer", status=400)
+
+    client = _async_client(supabase)
+    semaphore = asyncio.Semaphore(write_concurrency)
+    req_skills = payload.get("job", {}).get("skills_required") or payload.get("job", {}).get("skills")
+    if not req_skills:
+        req_skills = JOB_CACHE.get(job_id)
+    skills_task = None
+    if req_skills is None:
+        skills_task = asyncio.ensure_future(client.get("jobs", params={"id": f"eq.{job_id}", "select": "skills"}))
+        # a job with no applications never awaits it
+        skills_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    job_fp = None if skills_task else job_fingerprint(req_skills, attrition_predictor.version)
+    run_id = uuid.uuid4().hex
+    ranking = _RankResults(top_n)
+    writes = set()
+    total = rescored = 0
+
+    pages = client.iter_pages("applications", params=_rank_applications_params(job_id), page_size=page_size)
+    try:
+        async with contextlib.aclosing(pages):
+            while True:
+                with metrics.stage("rank", "fetch"):
+                    page = await anext(pages, None)
+                if page is None:
+                    break
+                if job_fp is None:
+                    with metrics.stage("rank", "job_skills"):
+                        req_skills = _job_skills_from_response(job_id, await skills_task)
+                    job_fp = job_fingerprint(req_skills, attrition_predictor.version)
+                state = await asyncio.to_thread(_score_rank_rows, job_id, page, req_skills, job_fp, run_id, payload)
+                total += len(state["scored"])
+                rescored += len(state["stale"])
+                ranking.add(state["scored"])
+                writes.add(asyncio.ensure_future(_write_rank_page(client, semaphore, job_id, state, run_id, payload)))
+                # don't let scored pages pile up (in memory) behind slow writes
+                while len(writes) > write_concurrency:
+                    done, writes = await asyncio.wait(writes, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+        if writes:
+            await asyncio.gather(*writes)
+            writes = set()
+    except AsyncSupabaseError as e:
+        app.logger.error("Failed to load applications: %s %s", e.status, e.text)
+        metrics.FAILURES.inc(endpoint="rank", stage="fetch")
+        raise RankError("could not load applications", e.text)
+    except asyncio.CancelledError:
+        app.logger.info("Async rank of job %s cancelled after %s applications", job_id, total)
+        metrics.FAILURES.inc(endpoint="rank", stage="cancelled")
+        raise
+    finally:
+        if skills_task is not None:
+            skills_task.cancel()
+        for task in writes:
+            task.cancel()
+
+    # rows that were not seen in this run are gone from the job
+    with metrics.stage("rank", "cache_prune"):
+        await asyncio.to_thread(get_rank_cache().forget_unseen, job_id, run_id)
+    if stats is not None:
+        stats.update(total=total, rescored=rescored)
+    return ranking.ranked()
+
+def submit_rank_async(supabase, job_id, payload, stats=None):
+    """Start run_rank_async on the rank loop; returns a concurrent.futures.Future (cancel() stops the run)."""
+    coro = run_rank_async(supabase, job_id, payload, stats=stats, profile=metrics.current_profile())
+    return asyncio.run_coroutine_threadsafe(coro, get_rank_loop())
+
+def _stream_rank(future):
+    """Whitespace keepalives until the run finishes, then its JSON; closing the stream cancels the run."""
+    try:
+        while True:
+            try:
+                body = future.result(timeout=RANK_ASYNC_KEEPALIVE)
+                break
+            except concurrent.futures.TimeoutError:
+                yield b" "  # leading whitespace is valid JSON
+            except RankError as e:
+                body = {"error": str(e), "detail": e.detail}
+                break
             except Exception:
-                app.logger.exception("Error processing application row: %s", a)
-                # continue to next application
+                app.logger.exception("async rank error")
+                body = {"error": "Ranking service error"}
+                break
+    finally:
+        # the WSGI server closes the stream when the client goes away
+        future.cancel()
+    yield json.dumps(body).encode()
+
+@app.route("/rank/async", methods=["POST", "OPTIONS"])
+def rank_job_applications_async():
+    """
+    /rank on the asyncio pipeline (run_rank_async). Runs that finish within
+    RANK_ASYNC_KEEPALIVE seconds answer exactly like /rank; longer ones stream
+    a 200 of whitespace keepalives followed by the JSON result (or
+    {"error": ...}), and are cancelled when the client disconnects. Without
+    aiohttp installed this is the synchronous /rank.
+    """
+    if request.method == "OPTIONS":
+        return Response(status=204, headers=CORS_HEADERS)
+    if not async_supabase.available():
+        return rank_job_applications()
 
-        # sort descending
-        results.sort(key=lambda x: x.get("fitment_score", 0), reverse=True)
-        return jsonify(results), 200
+    try:
+        payload, supabase, error = _rank_request()
+        if error:
+            return error
+
+        stats = {}
+        future = submit_rank_async(supabase, payload["job_id"], payload, stats=stats)
+        try:
+            results = future.result(timeout=RANK_ASYNC_KEEPALIVE)
+        except concurrent.futures.TimeoutError:
+            return Response(_stream_rank(future), mimetype="application/json")
+        except RankError as e:
+            return jsonify({"error": str(e), "detail": e.detail}), e.status
+        return jsonify(results), 200, {"X-Rank-Rescored": f"{stats.get('rescored', 0)}/{stats.get('total', 0)}"}
 
     except Exception:
         app.logger.exception("rank endpoint error")
         return jsonify({"error": "Ranking service error"}), 500
 
+def _queued_rank(job_id, payload, progress):
+    supabase = get_client()
+    if supabase is None:
+        raise RankError("Supabase config missing on server")
+    try:
+        return run_rank(supabase, job_id, payload, progress)
+    except Exception:
+        app.logger.exception("queued rank failed for job %s", job_id)
+        raise
+
+def _rank_run_key(job_id, payload):
+    """
+    Coalescing key of a queued run: the job plus every option that changes
+    its result (page_size and chunk_size only change how it is fetched and written).
+    """
+    _, top_n = _rank_options(payload)
+    job = payload.get("job") or {}
+    skills = job.get("skills_required") or job.get("skills")
+    return json.dumps({"job_id": job_id, "top_n": top_n, "force": bool(payload.get("force")),
+                       "skills": norm_list(skills) if skills else None}, sort_keys=True)
+
+_rank_queue = None
+
+def get_rank_queue():
+    global _rank_queue
+    if _rank_queue is None:
+        _rank_queue = RankJobQueue(_queued_rank, workers=int(os.getenv("RANK_QUEUE_WORKERS", "2")))
+        # also picks up runs left queued by a previous process
+        _rank_queue.start()
+    return _rank_queue
+
+@app.route("/rank/jobs", methods=["POST", "OPTIONS"])
+def enqueue_rank_job():
+    """
+    Same JSON body as /rank, but the run happens in the background.
+
+    Returns 202 { "token", "job_id", "coalesced" } immediately; a request for a
+    job_id that is already queued or running with the same top_n, force and
+    job skills gets that run's token.
+    """
+    if request.method == "OPTIONS":
+        return Response(status=204, headers=CORS_HEADERS)
+
+    payload = request.get_json() or {}
+    job_id = payload.get("job_id")
+    if not job_id:
+        return jsonify({"error": "job_id required"}), 400
+    if get_client() is None:
+        return jsonify({"error": "Supabase config missing on server"}), 500
+
+    try:
+        key = _rank_run_key(job_id, payload)
+    except RankError as e:
+        return jsonify({"error": str(e)}), e.status
+    token, created = get_rank_queue().submit(job_id, payload, key)
+    return jsonify({"token": token, "job_id": job_id, "coalesced": not created}), 202
+
+@app.route("/rank/jobs/<token>", methods=["GET"])
+def get_rank_job(token):
+    """
+    Poll a background rank run: { "status": queued|running|done|failed,
+    "progress": { "stage", "done", "total" }, "result": [...] once done }.
+    Pass ?result=0 to poll progress without the result body.
+    """
+    job = get_rank_queue().get(token, include_result=request.args.get("result") != "0")
+    if job is None:
+        return jsonify({"error": "unknown token"}), 404
+    return jsonify(job), 200
+
+@app.route("/candidates/top", methods=["POST", "OPTIONS"])
+def top_candidates_for_skills():
+    """
+    Expects JSON: { "skills": [...], "k": 20 } or { "job_id": "<uuid>", "k": 20 }
+
+    Returns the k candidates holding the most required skills, looked up in the
+    in-process skill index rather than by scoring every candidate:
+    [ { "candidate_id", "matched", "skill_match" }, ... ]
+    """
+    if request.method == "OPTIONS":
+        return Response(status=204, headers=CORS_HEADERS)
+
+    try:
+        payload = request.get_json() or {}
+        try:
+            k = int(payload["k"]) if payload.get("k") is not None else 20
+        except (TypeError, ValueError):
+            return jsonify({"error": "k must be an integer"}), 400
+        if k < 1:
+            return jsonify({"error": "k must be at least 1"}), 400
+
+        supabase = get_client()
+        req_skills = payload.get("skills") or payload.get("skills_required")
+        if not req_skills and payload.get("job_id"):
+            if supabase is None:
+                return jsonify({"error": "Supabase config missing on server"}), 500
+            jresp = supabase.get("jobs", params={"id": f"eq.{payload['job_id']}", "select": "skills"})
+            if jresp.status_code == 200 and jresp.json():
+                req_skills = jresp.json()[0].get("skills") or []
+        if not req_skills:
+            return jsonify({"error": "skills or job_id required"}), 400
+
+        # catch up on candidates the webhook reported to any worker
+        CACHE_LOG.sync()
+        index = get_skill_index(supabase)
+        return jsonify(index.top_k(req_skills, k)), 200
+
+    except Exception:
+        app.logger.exception("top candidates error")
+        return jsonify({"error": "Candidate search error"}), 500
+
+@app.route("/candidates/rank", methods=["POST", "OPTIONS"])
+def rank_candidates_from_store():
+    """
+    Expects JSON: { "skills": [...], "top_n": 50 } or { "job_id": "<uuid>", "top_n": 50 },
+    plus optionally "candidate_ids": [...] to rank only those candidates.
+
+    Full fitment scores for every candidate in the columnar candidate store
+    (utils.candidate_store), computed in one vectorized pass with nothing
+    fetched or written per candidate. Returns the /rank result shape, best
+    first. The store is loaded from CANDIDATE_STORE, or taken from the
+    candidates table on first use, and kept current by /score, the candidates
+    webhook and a re-snapshot every CANDIDATE_STORE_TTL seconds.
+    """
+    if request.method == "OPTIONS":
+        return Response(status=204, headers=CORS_HEADERS)
+
+    try:
+        payload = request.get_json() or {}
+        try:
+            top_n = int(payload["top_n"]) if payload.get("top_n") is not None else 50
+        except (TypeError, ValueError):
+            return jsonify({"error": "top_n must be an integer"}), 400
+        if top_n < 1:
+            return jsonify({"error": "top_n must be at least 1"}), 400
+
+        supabase = get_client()
+        req_skills = payload.get("skills") or payload.get("skills_required")
+        job_id = payload.get("job_id")
+        if not req_skills and job_id:
+            req_skills = JOB_CACHE.get(job_id)
+            if req_skills is None:
+                if supabase is None:
+                    return jsonify({"error": "Supabase config missing on server"}), 500
+                with metrics.stage("candidates_rank", "job_skills"):
+                    jresp = supabase.get("jobs", params={"id": f"eq.{job_id}", "select": "skills"})
+                req_skills = _job_skills_from_response(job_id, jresp)
+        if not req_skills:
+            return jsonify({"error": "skills or job_id required"}), 400
+
+        with metrics.stage("candidates_rank", "load"):
+            store = _candidate_store(supabase)
+        if store is None:
+            return jsonify({"error": "candidate store not available (set CANDIDATE_STORE or the Supabase config)"}), 503
+
+        rows = store.rows_for(payload["candidate_ids"]) if payload.get("candidate_ids") else None
+        with metrics.stage("candidates_rank", "score"):
+            top = store.top(req_skills, attrition_predictor, top_n, rows)
+        metrics.ROWS_SCORED.inc(len(store) if rows is None else len(rows), endpoint="candidates_rank")
+        return jsonify([_store_result(store, *entry) for entry in top]), 200
+
+    except Exception:
+        app.logger.exception("candidate store rank error")
+        return jsonify({"error": "Ranking service error"}), 500
+
+def _store_result(store, row, final_score, breakdown):
+    return {
+        "candidate_id": store.candidate_id(row),
+        "display_name": store.display_name(row),
+        "email": store.email(row),
+        "fitment_score": final_score,
+        "sub_scores": breakdown,
+    }
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/match/jd", methods=["POST", "OPTIONS"])
+def match_job_description():
+    """
+    Expects JSON: { "jd": "<job description text>", "top_k": 10 } ("generated_jd",
+    as jd-backend returns it, works too), optionally "skills" (added to the
+    extracted ones), "min_experience" (replaces the extracted floor) and
+    "candidate_ids".
+
+    Extracts the required skills and experience floor from the text and
+    streams the best matches from the candidate store as Server-Sent Events:
+      event: requirements  { "skills", "min_experience", "candidates" }
+      event: top           { "results": [...], "scored", "filtered" }, each time the top k improves
+      event: done          the same, final, plus "skipped" (candidates never scored)
+    Candidates are scored best bound first and the search stops once no
+    remaining candidate's fitment upper bound can beat the k-th best score.
+    """
+    if request.method == "OPTIONS":
+        return Response(status=204, headers=CORS_HEADERS)
+
+    payload = request.get_json() or {}
+    text = payload.get("jd") or payload.get("generated_jd") or ""
+    if not isinstance(text, str):
+        return jsonify({"error": "jd must be a string"}), 400
+    requirements = extract_requirements(text)
+    req_skills = sorted(set(requirements["skills"]) | set(canonical_skills(payload.get("skills") or [])))
+    if not req_skills:
+        return jsonify({"error": "no known skills found in jd (pass \"skills\" to add some)"}), 400
+    try:
+        top_k = int(payload["top_k"]) if payload.get("top_k") is not None else 10
+        min_experience = int(payload["min_experience"]) if payload.get("min_experience") is not None else requirements["min_experience"]
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k and min_experience must be integers"}), 400
+    if top_k < 1:
+        return jsonify({"error": "top_k must be at least 1"}), 400
+
+    with metrics.stage("match_jd", "load"):
+        store = _candidate_store(get_client())
+    if store is None:
+        return jsonify({"error": "candidate store not available (set CANDIDATE_STORE or the Supabase config)"}), 503
+    rows = store.rows_for(payload["candidate_ids"]) if payload.get("candidate_ids") else None
+
+    def generate():
+        started = time.perf_counter()
+        yield _sse("requirements", {"skills": req_skills, "min_experience": min_experience,
+                                    "candidates": len(store) if rows is None else len(rows)})
+        stats = {}
+        try:
+            for top, stats in store.iter_top(req_skills, attrition_predictor, top_k, rows, min_experience):
+                event = {"results": [_store_result(store, *entry) for entry in top],
+                         "scored": stats["scored"], "filtered": stats["filtered"]}
+                if stats["done"]:
+                    event["skipped"] = stats["skipped"]
+                yield _sse("done" if stats["done"] else "top", event)
+        except Exception:
+            app.logger.exception("JD match error")
+            metrics.FAILURES.inc(endpoint="match_jd", stage="search")
+            yield _sse("error", {"error": "Matching service error"})
+        finally:
+            metrics.record_stage("match_jd", "search", time.perf_counter() - started)
+            metrics.ROWS_SCORED.inc(stats.get("scored", 0), endpoint="match_jd")
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@metrics.register_collector
+def _service_metrics():
+    families = []
+    supabase = get_client()
+    if supabase is not None:
+        st = supabase.stats()
+        families += [
+            ("fitment_supabase_requests_total", "counter", "HTTP calls to Supabase", [({}, st["requests"])]),
+            ("fitment_supabase_retries_total", "counter", "Supabase calls retried", [({}, st["retries"])]),
+            ("fitment_supabase_failures_total", "counter", "Supabase calls that failed after retries", [({}, st["failures"])]),
+            ("fitment_supabase_latency_seconds_total", "counter", "Total time spent in Supabase calls", [({}, st["latency_seconds_total"])]),
+            ("fitment_supabase_connections_opened_total", "counter", "Connections opened to Supabase", [({}, st["connections_opened"])]),
+            ("fitment_supabase_connections_reused_total", "counter", "Supabase calls served on a kept-alive connection", [({}, st["connections_reused"])]),
+        ]
+    families.append(("fitment_skill_index_candidates", "gauge", "Candidates in the in-memory skill index",
+                     [({}, len(get_skill_index()))]))
+    if _rank_queue is not None:
+        families.append(("fitment_rank_jobs", "gauge", "Background rank runs by status",
+                         [({"status": k}, v) for k, v in sorted(_rank_queue.counts().items())]))
+    cache_stats = [(cache.name, cache.stats()) for cache in (JOB_CACHE, PROFILE_CACHE)]
+    for key, kind, help in (
+        ("hits", "counter", "Lookups served from the cache"),
+        ("misses", "counter", "Lookups not in the cache (absent, expired or stale)"),
+        ("evictions", "counter", "Entries evicted as least recently used"),
+        ("expired", "counter", "Entries dropped because their TTL ran out"),
+        ("stale", "counter", "Entries dropped because their source row changed"),
+        ("invalidations", "counter", "Entries dropped by the Supabase webhook"),
+        ("entries", "gauge", "Entries currently cached"),
+    ):
+        name = f"fitment_lru_cache_{key}" + ("_total" if kind == "counter" else "")
+        families.append((name, kind, help, [({"cache": c}, st[key]) for c, st in cache_stats]))
+    return families
+
+SUPABASE_WEBHOOK_SECRET = os.getenv("SUPABASE_WEBHOOK_SECRET")
+
+@app.route("/webhooks/supabase", methods=["POST"])
+def supabase_webhook():
+    """
+    Supabase database webhook for the jobs and candidates tables: drops the
+    cached requirements or profiles of every row the event touched, in every
+    worker (the others replay it within CACHE_SYNC_INTERVAL seconds), and
+    has every worker re-read changed candidates into its columnar store and
+    skill index. With
+    SUPABASE_WEBHOOK_SECRET set, the webhook must send it as
+    "Authorization: Bearer <secret>" (an HTTP header on the webhook in Supabase).
+    """
+    if SUPABASE_WEBHOOK_SECRET:
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {SUPABASE_WEBHOOK_SECRET}".encode()):
+            return jsonify({"error": "unauthorized"}), 401
+
+    event = request.get_json(silent=True) or {}
+    table = event.get("table")
+    cache = {"jobs": JOB_CACHE, "candidates": PROFILE_CACHE}.get(table)
+    if cache is None:
+        return jsonify({"table": table, "invalidated": 0}), 200
+    if event.get("type") == "TRUNCATE":
+        invalidated = CACHE_LOG.publish(cache)
+        if cache is PROFILE_CACHE:
+            CACHE_LOG.publish(STORE_ROWS)
+            CACHE_LOG.publish(INDEX_ROWS)
+    else:
+        ids = {row["id"] for row in (event.get("record"), event.get("old_record")) if isinstance(row, dict) and "id" in row}
+        keys = [(source, i) for i in ids for source in PROFILE_SOURCES] if cache is PROFILE_CACHE else ids
+        invalidated = sum(CACHE_LOG.publish(cache, key) for key in keys)
+        if cache is PROFILE_CACHE:
+            for i in ids:
+                CACHE_LOG.publish(STORE_ROWS, i)
+                CACHE_LOG.publish(INDEX_ROWS, i)
+    app.logger.info("Supabase %s on %s: %s cached entries invalidated", event.get("type"), table, invalidated)
+    return jsonify({"table": table, "invalidated": invalidated}), 200
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Counters and latency histograms of this worker process in Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# --- serving -------------------------------------------------------------------
+
+_startup = {"ready": False, "seconds": None}
+
+def _process_memory():
+    """Resident and shared (copy-on-write) memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            _, resident, shared = (int(v) for v in f.read().split()[:3])
+        page = os.sysconf("SC_PAGE_SIZE")
+        return {"rss_bytes": resident * page, "shared_bytes": shared * page}
+    except (OSError, ValueError):
+        import resource
+        # peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_bytes": peak if os.uname().sysname == "Darwin" else peak * 1024, "shared_bytes": None}
+
+def _health():
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.perf_counter() - _import_started, 3),
+        "startup_seconds": _startup["seconds"],
+        "model_version": attrition_predictor.version,
+        "skill_match": "semantic" if get_skill_matcher() is not None else "exact",
+        **_process_memory(),
+    }
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the worker is up and answering."""
+    return jsonify({"status": "ok", **_health()}), 200
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once create_app() has warmed the model, 503 before that."""
+    status = 200 if _startup["ready"] else 503
+    return jsonify({"status": "ready" if _startup["ready"] else "starting", **_health()}), status
+
+def create_app():
+    """
+    Return the app with everything read-only warmed up: the fused attrition
+    model, the skill vectors, the candidate store (if CANDIDATE_STORE is set)
+    and the compiled templates. Under gunicorn with
+    preload_app this runs once in the master, so the workers forked from it
+    share those pages instead of each loading its own copy. Per-process state
+    (Supabase sessions, the SQLite rank cache, the rank queue threads, the
+    parse pool) stays lazy and is created in each worker on first use.
+    """
+    if not _startup["ready"]:
+        attrition_predictor.predict_one([0.0] * len(attrition_predictor.feature_names))
+        get_skill_matcher()
+        # the columnar candidate store, when CANDIDATE_STORE points at a snapshot
+        get_candidate_store()
+        for template in ("index.html", "result.html"):
+            app.jinja_env.get_template(template)
+        _startup["seconds"] = round(time.perf_counter() - _import_started, 3)
+        _startup["ready"] = True
+        app.logger.info("app ready in %.2fs (model %s)", _startup["seconds"], attrition_predictor.version)
+    return app
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=os.getenv("FLASK_DEBUG", "1") == "1")
@@ -0,0 +1,147 @@
+"""
+Minimal pytest-benchmark style timing harness.
+
+Scenarios receive a `Benchmark` and call it (or .pedantic) with the code under
+test; stats are per call, in seconds, with the same names pytest-benchmark
+uses (min, max, mean, stddev, median, iqr, ops, rounds) so result files can be
+compared across runs with compare_results.
+"""
+import datetime
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+
+
+class Benchmark:
+    def __init__(self, name, group, params=None, rounds=5, warmup_rounds=1):
+        self.name = name
+        self.group = group
+        self.params = params or {}
+        self.rounds = rounds
+        self.warmup_rounds = warmup_rounds
+        self.timings = []
+        self.extra_info = {}
+
+    def __call__(self, fn, *args, **kwargs):
+        return self.pedantic(fn, args=args, kwargs=kwargs)
+
+    def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=None, iterations=1, warmup_rounds=None):
+        """
+        Time `fn` for `rounds` rounds of `iterations` calls each. `setup`, if
+        given, runs untimed before every round and may return (args, kwargs).
+        """
+        kwargs = kwargs or {}
+        rounds = rounds or self.rounds
+        warmup_rounds = self.warmup_rounds if warmup_rounds is None else warmup_rounds
+        result = None
+        for r in range(warmup_rounds + rounds):
+            call_args, call_kwargs = args, kwargs
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    call_args, call_kwargs = prepared
+            gc.collect()
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    result = fn(*call_args, **call_kwargs)
+                elapsed = time.perf_counter() - start
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            if r >= warmup_rounds:
+                self.timings.append(elapsed / iterations)
+        return result
+
+    def record(self, seconds):
+        """Add externally measured per-call timings (e.g. latencies of concurrent requests)."""
+        self.timings.extend(seconds)
+
+    def stats(self):
+        t = np.array(self.timings, dtype=np.float64)
+        if t.size == 0:
+            return None
+        q1, median, q3 = np.percentile(t, [25, 50, 75])
+        return {
+            "min": float(t.min()),
+            "max": float(t.max()),
+            "mean": float(t.mean()),
+            "stddev": float(statistics.stdev(t)) if t.size > 1 else 0.0,
+            "median": float(median),
+            "iqr": float(q3 - q1),
+            "p95": float(np.percentile(t, 95)),
+            "p99": float(np.percentile(t, 99)),
+            "ops": float(1.0 / t.mean()) if t.mean() else 0.0,
+            "rounds": int(t.size),
+        }
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "group": self.group,
+            "params": self.params,
+            "stats": self.stats(),
+            "extra_info": self.extra_info,
+        }
+
+
+def machine_info():
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python_implementation": platform.python_implementation(),
+        "python_version": platform.python_version(),
+        "system": platform.system(),
+        "release": platform.release(),
+        "cpu_count": os.cpu_count(),
+        "numpy_version": np.__version__,
+    }
+
+
+def commit_info(cwd=None):
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {
+        "id": git("rev-parse", "HEAD"),
+        "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def results_document(benchmarks, cwd=None):
+    return {
+        "machine_info": machine_info(),
+        "commit_info": commit_info(cwd),
+        "benchmarks": [b.as_dict() for b in benchmarks],
+        "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare_results(baseline, current, metric="median", max_regression=0.10):
+    """
+    Compare two result documents benchmark by benchmark. Returns a list of
+    (name, baseline, current, change) and the names that slowed down by more
+    than `max_regression` (a fraction).
+    """
+    before = {b["name"]: b["stats"] for b in baseline["benchmarks"] if b.get("stats")}
+    rows, regressions = [], []
+    for b in current["benchmarks"]:
+        if not b.get("stats") or b["name"] not in before:
+            continue
+        old, new = before[b["name"]][metric], b["stats"][metric]
+        change = (new - old) / old if old else 0.0
+        rows.append((b["name"], old, new, change))
+        if change > max_regression:
+            regressions.append(b["name"])
+    return rows, regressions
@@ -0,0 +1,122 @@
+"""
+Run the benchmark scenarios and write the results as JSON.
+
+Run from the app folder:
+
+    python -m benchmarks.run                          # everything, 1k/10k/100k applicants
+    python -m benchmarks.run --sizes 1000,10000 -k rank
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+
+Every run uses a fresh temporary working directory (rank cache, job queue,
+resume cache, uploads) and an in-process stub Supabase, so nothing touches a
+real project. The stub runs in this process, so /rank and HTTP timings include
+its JSON encoding: compare runs with each other, not with production numbers.
+With --compare the exit status is 1 when any benchmark's median got slower
+than --max-regression.
+"""
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(APP_DIR, "benchmarks", "results")
+
+
+def prepare_environment(workdir, supabase_url):
+    """Point every on-disk cache and the Supabase client at throwaway locations. Must run before importing app."""
+    os.environ.update({
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "benchmark",
+        "RANK_CACHE_DB": os.path.join(workdir, "rank_cache.sqlite3"),
+        "RANK_QUEUE_DB": os.path.join(workdir, "rank_jobs.sqlite3"),
+        "RESUME_CACHE_DIR": os.path.join(workdir, "resume_cache"),
+    })
+    # app.py creates uploads/ relative to the working directory
+    os.chdir(workdir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fitment service benchmarks")
+    parser.add_argument("-k", dest="pattern", default="*", help="glob over benchmark names, e.g. 'rank/*' or '*upload*'")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="applicant counts for n-parameterised scenarios")
+    parser.add_argument("--rounds", type=float, default=1.0, help="multiply every scenario's round count")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Supabase round-trip latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default benchmarks/results/<utc time>_<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed slowdown as a fraction (default 0.10)")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args(argv)
+    # the run changes into its working directory; resolve user paths first
+    args.out = args.out and os.path.abspath(args.out)
+    args.compare = args.compare and os.path.abspath(args.compare)
+
+    sizes = {int(s) for s in args.sizes.split(",") if s}
+    sys.path.insert(0, APP_DIR)
+    workdir = tempfile.mkdtemp(prefix="fitment-bench-")
+
+    from benchmarks.stub_supabase import StubSupabase
+    stub = StubSupabase(latency=args.latency_ms / 1000.0).start()
+    prepare_environment(workdir, stub.url)
+
+    from benchmarks.harness import Benchmark, compare_results, results_document
+    from benchmarks.scenarios import SCENARIOS, BenchContext, benchmark_name
+
+    ctx = BenchContext(stub, workdir, seed=args.seed, sizes=sizes)
+    done = []
+    try:
+        for entry in SCENARIOS:
+            for params in entry["params"]:
+                name = benchmark_name(entry, params)
+                if "n" in params and params["n"] not in sizes or not fnmatch.fnmatch(name, args.pattern):
+                    continue
+                bench = Benchmark(name, entry["group"], params,
+                                  rounds=max(1, round(entry["rounds"] * args.rounds)),
+                                  warmup_rounds=entry["warmup_rounds"])
+                print(f"{name} ...", end=" ", flush=True)
+                try:
+                    entry["fn"](bench, ctx, **params)
+                except Exception as e:
+                    bench.extra_info["error"] = f"{type(e).__name__}: {e}"
+                    print("failed:", bench.extra_info["error"])
+                else:
+                    s = bench.stats()
+                    print(f"median {s['median'] * 1e3:.3f} ms  p95 {s['p95'] * 1e3:.3f} ms  ({s['rounds']} rounds)")
+                done.append(bench)
+    finally:
+        ctx.close()
+        stub.stop()
+        os.chdir(APP_DIR)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    doc = results_document(done, cwd=APP_DIR)
+    doc["options"] = {"sizes": sorted(sizes), "latency_ms": args.latency_ms, "seed": args.seed, "rounds": args.rounds}
+    out = args.out
+    if not out:
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = os.path.join(RESULTS_DIR, f"{stamp}_{(doc['commit_info']['id'] or 'nogit')[:8]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print("results written to", out)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare_results(baseline, doc, max_regression=args.max_regression)
+        for name, old, new, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name:55s} {old * 1e3:10.3f} ms -> {new * 1e3:10.3f} ms  {change:+7.1%}{flag}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Benchmark scenarios: scalar scoring, batch scoring, /rank at several applicant
+counts, resume parsing and end-to-end HTTP latency.
+
+Each scenario is `fn(benchmark, ctx, **params)`; run.py builds the context
+(synthetic data, stub Supabase, the Flask app) and calls every registered
+scenario once per parameter set.
+"""
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.synthetic import SyntheticData, write_resume
+
+SCENARIOS = []
+
+
+def scenario(group, params=None, rounds=5, warmup_rounds=1):
+    """Register a scenario; `params` is a list of keyword dicts, one benchmark each."""
+    def register(fn):
+        SCENARIOS.append({
+            "name": fn.__name__, "group": group, "fn": fn, "params": params or [{}],
+            "rounds": rounds, "warmup_rounds": warmup_rounds,
+        })
+        return fn
+    return register
+
+
+def benchmark_name(entry, params):
+    if not params:
+        return f"{entry['group']}/{entry['name']}"
+    label = ",".join(f"{k}={v}" for k, v in params.items())
+    return f"{entry['group']}/{entry['name']}[{label}]"
+
+
+class BenchContext:
+    """Shared fixtures; the app module is imported lazily, after run.py has set up the environment."""
+
+    def __init__(self, stub, workdir, seed=0, sizes=(1000, 10000, 100000)):
+        self.stub = stub
+        self.workdir = workdir
+        self.seed = seed
+        self.sizes = sizes
+        self.data = SyntheticData(seed)
+        self._jobs = {}
+        self._next_candidate = 0
+        self._server = None
+        self._base_url = None
+
+    @property
+    def service(self):
+        import app
+        return app
+
+    def client(self):
+        from utils.supabase_client import get_client
+        return get_client()
+
+    def job_with_applicants(self, n):
+        """A job with `n` applications loaded into the stub; created once per size."""
+        if n not in self._jobs:
+            job = self.data.job(job_id=f"job-{n}")
+            candidates = self.data.candidates(n, start=self._next_candidate)
+            self._next_candidate += n
+            apps = [{k: v for k, v in a.items() if k != "candidates"} for a in self.data.applications(job["id"], candidates)]
+            for a in apps:
+                a["id"] = f"{job['id']}-{a['id']}"
+            for table, rows in (("jobs", [job]), ("candidates", candidates), ("applications", apps)):
+                self.stub.load(table, self.stub.rows(table) + rows)
+            self._jobs[n] = job
+        return self._jobs[n]
+
+    def base_url(self):
+        """The Flask app served over real HTTP on a local port (threaded werkzeug server)."""
+        if self._base_url is None:
+            from werkzeug.serving import make_server
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            self._server = make_server("127.0.0.1", 0, self.service.app, threaded=True)
+            threading.Thread(target=self._server.serve_forever, name="bench-http", daemon=True).start()
+            self._base_url = f"http://127.0.0.1:{self._server.server_port}"
+        return self._base_url
+
+    def resumes(self, count, fmt):
+        folder = os.path.join(self.workdir, f"resumes-{fmt}")
+        if not os.path.isdir(folder):
+            for c in self.data.candidates(count):
+                write_resume(c, folder, fmt)
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder))
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+# --- scoring ---------------------------------------------------------------
+
+@scenario("scoring", rounds=20)
+def scalar_scoring(benchmark, ctx):
+    """calculate_fitment_score + one attrition prediction per call, as /upload does."""
+    from utils.attrition_predictor import features_from_profile, get_predictor
+    from utils.score_calculator import calculate_fitment_score
+
+    predictor = get_predictor()
+    rows = [(features_from_profile(c["profile"]), {
+        "skill_match": 0.85, "cultural_fit": c["profile"]["cultural_fit"],
+        "growth_potential": c["profile"]["growth_potential"],
+    }) for c in ctx.data.candidates(1000)]
+    cycle = itertools.cycle(rows)
+
+    def score_one():
+        features, data = next(cycle)
+        return calculate_fitment_score(data, predictor.predict_one(features))
+
+    benchmark.pedantic(score_one, iterations=len(rows))
+
+
+@scenario("scoring", params=[{"n": 1000}, {"n": 10000}, {"n": 100000}], rounds=5)
+def batch_scoring(benchmark, ctx, n):
+    """score_profiles + batched attrition for n applicants, no I/O (the core of /rank)."""
+    from utils.attrition_predictor import get_predictor
+    from utils.batch_scorer import score_profiles
+    from utils.candidate_store import scoring_profile
+
+    predictor = get_predictor()
+    job = ctx.data.job()
+    profiles = [scoring_profile(c) for c in ctx.data.candidates(n)]
+
+    def score_all():
+        probs = predictor.predict_partial([p["attrition_features"] for p in profiles])
+        return score_profiles(job["skills"], profiles, probs)
+
+    benchmark(score_all)
+    benchmark.extra_info["per_applicant_us"] = benchmark.stats()["median"] / n * 1e6
+
+
+@scenario("scoring", params=[{"n": 10000}, {"n": 100000}], rounds=5)
+def store_scoring(benchmark, ctx, n):
+    """Top 50 of n candidates straight off the columnar CandidateStore (no dicts, no I/O)."""
+    from utils.attrition_predictor import get_predictor
+    from utils.candidate_store import CandidateStore
+
+    predictor = get_predictor()
+    job = ctx.data.job()
+    store = CandidateStore.from_rows(ctx.data.candidates(n))
+
+    benchmark(lambda: store.top(job["skills"], predictor, 50))
+    benchmark.extra_info["per_applicant_us"] = benchmark.stats()["median"] / n * 1e6
+    benchmark.extra_info["bytes_per_candidate"] = store.nbytes / n
+
+
+@scenario("scoring", params=[{"n": 100000, "k": 10}], rounds=5)
+def store_first_match(benchmark, ctx, n, k):
+    """Time to the first top-k event of the best-first /match/jd search over n candidates."""
+    from utils.attrition_predictor import get_predictor
+    from utils.candidate_store import CandidateStore
+
+    predictor = get_predictor()
+    job = ctx.data.job()
+    store = CandidateStore.from_rows(ctx.data.candidates(n))
+
+    benchmark(lambda: next(store.iter_top(job["skills"], predictor, k)))
+    _, stats = list(store.iter_top(job["skills"], predictor, k))[-1]
+    benchmark.extra_info["scored_fraction"] = stats["scored"] / n
+
+
+# --- ranking ---------------------------------------------------------------
+
+_RANK_SIZES = [{"n": 1000}, {"n": 10000}, {"n": 100000}]
+
+
+def _rank(benchmark, ctx, n, payload, use_async=False):
+    job = ctx.job_with_applicants(n)
+    client = ctx.client()
+    stats = {}
+    before = dict(ctx.stub.requests)
+
+    if use_async:
+        from utils.async_supabase import available
+        if not available():
+            raise RuntimeError("aiohttp is not installed")
+        run = lambda: ctx.service.submit_rank_async(client, job["id"], dict(payload), stats=stats).result()
+    else:
+        run = lambda: ctx.service.run_rank(client, job["id"], dict(payload), stats=stats)
+    result = benchmark(run)
+    calls = {k: v - before.get(k, 0) for k, v in ctx.stub.requests.items()}
+    runs = benchmark.rounds + benchmark.warmup_rounds
+    benchmark.extra_info.update({
+        "returned": len(result),
+        "rescored_last_run": stats.get("rescored"),
+        "supabase_requests_per_run": {k: v / runs for k, v in calls.items()},
+    })
+
+
+@scenario("rank", params=_RANK_SIZES, rounds=3)
+def rank_cold(benchmark, ctx, n):
+    """run_rank with every row rescored and written back (first run / model change)."""
+    _rank(benchmark, ctx, n, {"force": True})
+
+
+@scenario("rank", params=_RANK_SIZES, rounds=3)
+def rank_warm(benchmark, ctx, n):
+    """run_rank when nothing changed since the last run (fingerprint cache hits)."""
+    _rank(benchmark, ctx, n, {})
+
+
+@scenario("rank", params=_RANK_SIZES, rounds=3)
+def rank_top50(benchmark, ctx, n):
+    """run_rank returning only the best 50 (bounded heap)."""
+    _rank(benchmark, ctx, n, {"top_n": 50})
+
+
+@scenario("rank", params=_RANK_SIZES, rounds=3)
+def rank_async_cold(benchmark, ctx, n):
+    """run_rank_async with every row rescored: overlapping page fetches and write-backs (try --latency-ms 20)."""
+    _rank(benchmark, ctx, n, {"force": True}, use_async=True)
+
+
+@scenario("rank", params=_RANK_SIZES, rounds=3)
+def rank_async_warm(benchmark, ctx, n):
+    """run_rank_async when nothing changed since the last run."""
+    _rank(benchmark, ctx, n, {}, use_async=True)
+
+
+# --- resume parsing --------------------------------------------------------
+
+@scenario("upload", params=[{"fmt": "txt"}, {"fmt": "docx"}], rounds=5)
+def parse_cold(benchmark, ctx, fmt):
+    """parse_resume with an empty cache (text extraction + feature extraction) per file."""
+    from utils.resume_parser import parse_resume
+
+    files = ctx.resumes(200, fmt)
+    state = {}
+
+    def fresh_cache():
+        if state.get("cache"):
+            shutil.rmtree(state["cache"], ignore_errors=True)
+        state["cache"] = tempfile.mkdtemp(dir=ctx.workdir)
+        state["files"] = iter(files)
+
+    benchmark.pedantic(lambda: parse_resume(next(state["files"]), cache_dir=state["cache"]),
+                       setup=fresh_cache, iterations=len(files))
+
+
+@scenario("upload", params=[{"fmt": "docx"}], rounds=5)
+def parse_cached(benchmark, ctx, fmt):
+    """parse_resume for files already in the content-hash cache (hash + JSON load)."""
+    from utils.resume_parser import parse_resume
+
+    files = ctx.resumes(200, fmt)
+    cache = tempfile.mkdtemp(dir=ctx.workdir)
+    for f in files:
+        parse_resume(f, cache_dir=cache)
+    cycle = itertools.cycle(files)
+    benchmark.pedantic(lambda: parse_resume(next(cycle), cache_dir=cache), iterations=len(files))
+
+
+@scenario("upload", params=[{"fmt": "docx"}], rounds=3)
+def batch_parse(benchmark, ctx, fmt):
+    """200 resumes through the /upload/batch process pool, cold cache; timing is per batch."""
+    from utils import resume_parser
+    from utils.bulk_ingest import iter_parsed
+    from utils.resume_parser import hash_file
+
+    files = ctx.resumes(200, fmt)
+    items = [(os.path.basename(f), f, hash_file(f)) for f in files]
+
+    def clear_cache():
+        shutil.rmtree(resume_parser.CACHE_DIR, ignore_errors=True)
+
+    benchmark.pedantic(lambda: list(iter_parsed(items)), setup=clear_cache)
+    benchmark.extra_info["files_per_second"] = len(files) / benchmark.stats()["median"]
+
+
+# --- end to end over HTTP --------------------------------------------------
+
+def _score_payload(candidate, job):
+    return {"job_id": job["id"], "candidate_id": candidate["id"], "job": {"skills_required": job["skills"]},
+            "candidate": {"profile": candidate["profile"]}}
+
+
+@scenario("http", rounds=200, warmup_rounds=5)
+def http_score(benchmark, ctx):
+    """POST /score round trip: scoring, skill index update, Supabase lookup + write."""
+    base = ctx.base_url()
+    job = ctx.job_with_applicants(1000)
+    session = requests.Session()
+    cycle = itertools.cycle(ctx.data.candidates(200))
+    benchmark(lambda: session.post(f"{base}/score", json=_score_payload(next(cycle), job)).raise_for_status())
+
+
+@scenario("http", params=[{"clients": 8}], rounds=1, warmup_rounds=0)
+def http_score_concurrent(benchmark, ctx, clients):
+    """Latency of POST /score with several clients in parallel (400 requests)."""
+    base = ctx.base_url()
+    job = ctx.job_with_applicants(1000)
+    payloads = [_score_payload(c, job) for c in ctx.data.candidates(400)]
+    local = threading.local()
+
+    def one(payload):
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        start = time.perf_counter()
+        session.post(f"{base}/score", json=payload).raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = list(pool.map(one, payloads))
+    benchmark.record(latencies)
+    benchmark.extra_info["requests_per_second"] = len(payloads) / (time.perf_counter() - start)
+
+
+@scenario("http", params=[{"n": 1000}, {"n": 10000}], rounds=5)
+def http_rank(benchmark, ctx, n):
+    """POST /rank round trip, incremental (warm) run."""
+    base = ctx.base_url()
+    job = ctx.job_with_applicants(n)
+    session = requests.Session()
+    benchmark(lambda: session.post(f"{base}/rank", json={"job_id": job["id"]}).raise_for_status())
+
+
+@scenario("http", rounds=50, warmup_rounds=2)
+def http_upload(benchmark, ctx):
+    """POST /upload?json=1 of a DOCX resume; after the first call this is the cached path."""
+    base = ctx.base_url()
+    path = ctx.resumes(200, "docx")[0]
+    with open(path, "rb") as f:
+        body = f.read()
+    session = requests.Session()
+    benchmark(lambda: session.post(f"{base}/upload?json=1", files={"resume": ("resume.docx", body)}).raise_for_status())
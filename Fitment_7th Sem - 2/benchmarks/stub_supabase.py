@@ -0,0 +1,207 @@
+"""
+In-process stand-in for the Supabase REST API (PostgREST), for benchmarks.
+
+Implements the subset the service uses: GET with eq./gt./lt./in. filters,
+order, limit/offset (capped at `max_rows` per response, like PostgREST's
+db-max-rows) and an embedded candidates(...) select on applications;
+POST inserts and merge-duplicates upserts (on_conflict); PATCH by filter.
+Tables live in memory. An optional per-request latency stands in for the
+network round trip to a real project, and `reject_writes(table, rows)` can
+return an HTTP status to refuse a write with, as PostgREST refuses a whole
+request for one bad row.
+
+    with StubSupabase(latency=0.002) as stub:
+        stub.load("candidates", rows)
+        os.environ["SUPABASE_URL"] = stub.url
+"""
+import bisect
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+_OPS = {
+    "eq": lambda a, b: str(a) == b,
+    "neq": lambda a, b: str(a) != b,
+    "gt": lambda a, b: a is not None and str(a) > b,
+    "gte": lambda a, b: a is not None and str(a) >= b,
+    "lt": lambda a, b: a is not None and str(a) < b,
+    "lte": lambda a, b: a is not None and str(a) <= b,
+    "in": lambda a, b: str(a) in b.strip("()").split(","),
+    "is": lambda a, b: (a is None) if b == "null" else str(a).lower() == b,
+}
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict"}
+
+
+class StubSupabase:
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0, max_rows=None):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.reject_writes = None
+        self.tables = {}
+        self._indexes = {}
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-supabase", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def load(self, table, rows):
+        """Replace a table's contents; rows are kept in primary-key (id) order like PostgREST's default."""
+        with self._lock:
+            self.tables[table] = {str(r["id"]): dict(r) for r in sorted(rows, key=lambda r: str(r["id"]))}
+            self._indexes.pop(table, None)
+
+    def rows(self, table):
+        with self._lock:
+            return list(self.tables.get(table, {}).values())
+
+    # --- request handling -------------------------------------------------
+
+    def _select(self, table, query):
+        filters = [(k, v) for k, v in query if k not in _RESERVED]
+        opts = dict(q for q in query if q[0] in _RESERVED)
+        with self._lock:
+            rows = self._candidate_rows(table, filters)
+            for col, expr in filters:
+                op, _, value = expr.partition(".")
+                rows = [r for r in rows if _OPS[op](r.get(col), value)]
+            if opts.get("order"):
+                col, _, direction = opts["order"].partition(".")
+                rows.sort(key=lambda r: str(r.get(col)), reverse=direction.startswith("desc"))
+            offset = int(opts.get("offset", 0))
+            rows = rows[offset:offset + int(opts["limit"])] if "limit" in opts else rows[offset:]
+            if self.max_rows is not None:
+                rows = rows[:self.max_rows]
+            if table == "applications" and "candidates(" in opts.get("select", ""):
+                candidates = self.tables.get("candidates", {})
+                rows = [{**r, "candidates": candidates.get(str(r.get("candidate_id")), r.get("candidates"))} for r in rows]
+            return [dict(r) for r in rows]
+
+    def _candidate_rows(self, table, filters):
+        """Rows that can match: narrowed by hash indexes on eq. filters, like a real index scan."""
+        stored = self.tables.get(table, {})
+        index = self._indexes.setdefault(table, {})
+        best = None
+        for col, expr in filters:
+            if expr.startswith("eq."):
+                if col not in index:
+                    by_value = index[col] = {}
+                    for key, row in stored.items():
+                        by_value.setdefault(str(row.get(col)), []).append(key)
+                keys = index[col].get(expr[3:], ())
+                if best is None or len(keys) < len(best):
+                    best = keys
+        return list(stored.values()) if best is None else [stored[k] for k in best]
+
+    def _write(self, table, query, body, method):
+        rows = body if isinstance(body, list) else [body]
+        opts = dict(query)
+        with self._lock:
+            stored = self.tables.setdefault(table, {})
+            if method == "PATCH":
+                filters = [(k, v) for k, v in query if k not in _RESERVED]
+                matched = [str(r["id"]) for r in self._candidate_rows(table, filters)
+                           if all(_OPS[e.partition(".")[0]](r.get(c), e.partition(".")[2]) for c, e in filters)]
+                for key in matched:
+                    self._put(table, key, {**stored[key], **body})
+                return [stored[k] for k in matched]
+            out = []
+            for row in rows:
+                row = {k: v for k, v in row.items() if k != "candidates"}
+                key = str(row.get(opts.get("on_conflict", "id")) or f"stub-{len(stored)}")
+                row.setdefault("id", key)
+                if key in stored and "on_conflict" in opts:
+                    row = {**stored[key], **row}
+                self._put(table, key, row)
+                out.append(stored[key])
+            return out
+
+    def _put(self, table, key, row):
+        """Store a row and keep the eq. indexes (lists of keys in id order) in step."""
+        stored = self.tables[table]
+        old = stored.get(key)
+        stored[key] = row
+        for col, by_value in self._indexes.get(table, {}).items():
+            before, after = (None if old is None else str(old.get(col))), str(row.get(col))
+            if before == after:
+                continue
+            if before is not None:
+                by_value[before].remove(key)
+            bisect.insort(by_value.setdefault(after, []), key)
+
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per response
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _route(self):
+            url = urlparse(self.path)
+            prefix = "/rest/v1/"
+            if not url.path.startswith(prefix):
+                return None, None
+            return url.path[len(prefix):], parse_qsl(url.query)
+
+        def _reply(self, status, payload=None):
+            body = b"" if payload is None else json.dumps(payload).encode()
+            if stub.latency:
+                time.sleep(stub.latency)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            stub.requests["GET"] += 1
+            table, query = self._route()
+            if table is None:
+                return self._reply(404, {"message": "not found"})
+            self._reply(200, stub._select(table, query))
+
+        def _do_write(self):
+            stub.requests[self.command] += 1
+            table, query = self._route()
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"null")
+            if table is None or body is None:
+                return self._reply(404 if table is None else 400, {"message": "bad request"})
+            status = stub.reject_writes and stub.reject_writes(table, body if isinstance(body, list) else [body])
+            if status:
+                return self._reply(status, {"message": "rejected by stub"})
+            written = stub._write(table, query, body, self.command)
+            prefer = self.headers.get("Prefer", "")
+            status = 200 if self.command == "PATCH" else 201
+            self._reply(status, written if "return=representation" in prefer else None)
+
+        do_POST = _do_write
+        do_PATCH = _do_write
+
+    return Handler
@@ -0,0 +1,121 @@
+"""
+Synthetic jobs, candidates and applications for benchmarks.
+
+Candidate attributes are resampled from rows of the IBM HR attrition CSV
+(train_model/), so ages, incomes, tenure and satisfaction scores keep their
+real joint distribution; skills are drawn from the resume parser vocabulary
+with a long-tailed popularity. Everything is seeded and reproducible.
+"""
+import datetime
+import os
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from utils.attrition_predictor import ATTRITION_FEATURES
+from utils.resume_parser import SKILL_VOCABULARY
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HR_CSV = os.path.join(APP_DIR, "train_model", "WA_Fn-UseC_-HR-Employee-Attrition.csv")
+
+_HR_COLUMNS = ATTRITION_FEATURES + [
+    "TotalWorkingYears", "RelationshipSatisfaction", "PerformanceRating", "TrainingTimesLastYear", "JobRole",
+]
+
+
+def load_hr_sample(path=HR_CSV):
+    """The HR columns the generator draws from."""
+    return pd.read_csv(path, usecols=_HR_COLUMNS, encoding="utf-8-sig")
+
+
+class SyntheticData:
+    def __init__(self, seed=0, hr=None):
+        self.rng = np.random.default_rng(seed)
+        self.hr = load_hr_sample() if hr is None else hr
+        # Zipf-like popularity: a few skills are everywhere, most are rare
+        ranks = self.rng.permutation(len(SKILL_VOCABULARY)) + 1
+        self.skill_p = (1.0 / ranks) / (1.0 / ranks).sum()
+
+    def skills(self, size):
+        return self.rng.choice(SKILL_VOCABULARY, size=size, replace=False, p=self.skill_p).tolist()
+
+    def job(self, job_id="job-0", n_skills=6):
+        return {"id": job_id, "title": "Synthetic role", "skills": self.skills(n_skills)}
+
+    def candidates(self, n, start=0):
+        """`n` candidate rows shaped like the Supabase candidates table (profile JSON included)."""
+        rows = self.hr.iloc[self.rng.integers(0, len(self.hr), size=n)].to_dict("records")
+        n_skills = np.clip(self.rng.poisson(6, size=n), 1, 20)
+        out = []
+        for i, (hr, k) in enumerate(zip(rows, n_skills)):
+            cid = f"cand-{start + i:07d}"
+            skills = self.skills(int(k))
+            profile = {name: hr[name] for name in ATTRITION_FEATURES}
+            profile.update({
+                "skills": skills,
+                "experience_years": int(hr["TotalWorkingYears"]),
+                "cultural_fit": round((hr["EnvironmentSatisfaction"] + hr["RelationshipSatisfaction"]) / 8, 2),
+                "growth_potential": round(min(1.0, (hr["JobInvolvement"] + hr["TrainingTimesLastYear"] / 2) / 7), 2),
+                "resume_quality": round((hr["PerformanceRating"] - 1) / 3, 2),
+            })
+            out.append({
+                "id": cid,
+                "display_name": f"Candidate {start + i}",
+                "email": f"candidate{start + i}@example.com",
+                "skills": skills,
+                "skills_text": ", ".join(skills),
+                "experience": f"{int(hr['TotalWorkingYears'])} years",
+                "job_role": hr["JobRole"],
+                "profile": profile,
+            })
+        return out
+
+    def applications(self, job_id, candidates):
+        """Application rows with the candidate embedded, as /rank selects them."""
+        return [
+            {"id": f"app-{i:07d}", "job_id": job_id, "candidate_id": c["id"], "status": "applied",
+             "fitment_score": None, "sub_scores": None, "candidates": c}
+            for i, c in enumerate(candidates)
+        ]
+
+
+def resume_text(candidate):
+    p = candidate["profile"]
+    return "\n".join([
+        candidate["display_name"],
+        candidate["email"],
+        f"Age: {p['Age']}",
+        "",
+        "Summary",
+        f"{candidate['job_role']} with {p['experience_years']} years of experience.",
+        "",
+        "Skills",
+        ", ".join(candidate["skills"]),
+        "",
+        "Experience",
+        f"{candidate['job_role']}, Example Corp   Jan {datetime.date.today().year - p['YearsAtCompany']} - Present",
+        "",
+        "Education",
+        "Bachelor of Technology, Example University   2012 - 2016",
+    ])
+
+
+def write_resume(candidate, folder, fmt="txt"):
+    """Write the candidate's resume as .txt or .docx and return its path."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{candidate['id']}.{fmt}")
+    text = resume_text(candidate)
+    if fmt == "txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    elif fmt == "docx":
+        paragraphs = "".join(f"<w:p><w:r><w:t>{escape(line)}</w:t></w:r></w:p>" for line in text.splitlines())
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("word/document.xml",
+                       '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                       f"<w:body>{paragraphs}</w:body></w:document>")
+    else:
+        raise ValueError(f"unsupported resume format {fmt!r}")
+    return path
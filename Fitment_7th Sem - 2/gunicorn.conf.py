@@ -0,0 +1,52 @@
+"""
+Gunicorn settings for the fitment service.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is loaded once in the master (preload_app) and the workers are forked
+from it, so the model weights, skill vectors and imported libraries are shared
+copy-on-write. Requests mostly wait on Supabase, so each worker also runs a
+few threads.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+# read by the preloaded app, e.g. to split the resume parse pool's cores between the workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = True
+# /rank on a large job can take a while; /rank/jobs is there for the really long ones
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    from utils import metrics
+
+    # counters restart from zero with the server, as they would in one process
+    metrics.clear_shared()
+
+
+def post_fork(server, worker):
+    from utils import metrics
+
+    metrics.start_flusher()
+
+
+def worker_exit(server, worker):
+    from utils import metrics
+
+    # keep the exiting worker's final counts in the totals
+    metrics.flush()
+
+
+def when_ready(server):
+    # Move everything allocated so far out of the collector's reach: a gc pass
+    # in a worker would otherwise write to (and so un-share) every object header.
+    gc.freeze()
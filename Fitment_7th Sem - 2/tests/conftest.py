@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# tests import app.py and utils/ the way the app does, from the app folder
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# every on-disk cache in a throwaway folder, set before app.py reads the paths at import
+_WORKDIR = tempfile.mkdtemp(prefix="fitment-tests-")
+os.environ.update({
+    "RANK_CACHE_DB": os.path.join(_WORKDIR, "rank_cache.sqlite3"),
+    "RANK_QUEUE_DB": os.path.join(_WORKDIR, "rank_jobs.sqlite3"),
+    "RESUME_CACHE_DIR": os.path.join(_WORKDIR, "resume_cache"),
+})
+for name in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "CANDIDATE_STORE", "METRICS_DIR"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def supabase_stub(monkeypatch):
+    """Factory: start a StubSupabase (benchmarks/) with the given options and point get_client() at it."""
+    from benchmarks.stub_supabase import StubSupabase
+
+    def start(**kwargs):
+        stub = StubSupabase(**kwargs).start()
+        started.append(stub)
+        monkeypatch.setenv("SUPABASE_URL", stub.url)
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "test")
+        return stub
+
+    started = []
+    yield start
+    for stub in started:
+        stub.stop()
@@ -0,0 +1,81 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from utils.attrition_predictor import ATTRITION_FEATURES, MODELS_DIR, AttritionPredictor, save_artifact
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # roughly the HR dataset's ranges: age, 1-4 ratings, income, years, distance, education
+    low = np.array([18, 1, 1, 1000, 0, 1, 1, 1, 1])
+    high = np.array([60, 4, 4, 20000, 40, 29, 4, 5, 4])
+    return rng.integers(low, high + 1, size=(n, len(ATTRITION_FEATURES))).astype(np.float64)
+
+
+def test_matches_sklearn_on_a_fitted_pipeline():
+    X = _rows(500, seed=1)
+    y = (X[:, 3] < 5000) ^ (np.arange(len(X)) % 7 == 0)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+
+    predictor = AttritionPredictor.from_sklearn(model, scaler)
+    X_new = _rows(2000, seed=2)
+
+    np.testing.assert_allclose(predictor.predict_proba(X_new), model.predict_proba(scaler.transform(X_new))[:, 1],
+                               rtol=1e-12, atol=1e-15)
+    assert predictor.predict_one(X_new[0]) == predictor.predict_proba(X_new[:1])[0]
+
+
+# the pickles come from an older sklearn and were fitted on a DataFrame
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_shipped_pickles_match_sklearn_cold_and_cached(tmp_path):
+    with open(os.path.join(MODELS_DIR, "attrition_model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(os.path.join(MODELS_DIR, "scaler.pkl"), "rb") as f:
+        scaler = pickle.load(f)
+    X = _rows(1000, seed=3)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    cache = str(tmp_path / "fused.json")
+
+    cold = AttritionPredictor.from_pickles(cache_path=cache)
+    warm = AttritionPredictor.from_pickles(cache_path=cache)
+
+    np.testing.assert_allclose(cold.predict_proba(X), expected, rtol=1e-12, atol=1e-15)
+    # the cached fused weights give bit-identical predictions
+    assert np.array_equal(warm.predict_proba(X), cold.predict_proba(X))
+    assert warm.version == cold.version
+
+
+def test_predict_partial_scores_known_rows_in_one_batch():
+    predictor = AttritionPredictor(np.linspace(-0.5, 0.5, len(ATTRITION_FEATURES)), 0.1)
+    X = _rows(3, seed=4)
+
+    out = predictor.predict_partial([X[0], None, X[2]], default=-1.0)
+
+    assert out[1] == -1.0
+    assert np.array_equal(out[[0, 2]], predictor.predict_proba(X[[0, 2]]))
+
+
+def test_artifact_round_trips_and_rejects_tampered_weights(tmp_path):
+    rng = np.random.default_rng(5)
+    coef, mean, scale = rng.normal(size=9), rng.normal(size=9) * 10, rng.random(9) + 0.5
+    path = str(tmp_path / "model.npz")
+    meta = save_artifact(path, coef, -0.3, mean, scale, metadata={"trained_on": "test"})
+
+    loaded = AttritionPredictor.from_artifact(path)
+    X = _rows(100, seed=6)
+    assert loaded.version == meta["version"] and loaded.metadata["trained_on"] == "test"
+    assert np.array_equal(loaded.predict_proba(X), AttritionPredictor.from_arrays(coef, -0.3, mean, scale).predict_proba(X))
+
+    with open(tmp_path / "model.json", "w", encoding="utf-8") as f:
+        json.dump({**meta, "version": "0" * 12}, f)
+    with pytest.raises(ValueError, match="hash"):
+        AttritionPredictor.from_artifact(path)
@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from utils import batch_scorer
+from utils.batch_scorer import norm_list, score_profiles
+from utils.score_calculator import calculate_fitment_score
+
+SKILLS = ["python", "Python ", "SQL", "sql", "docker", "java", "react", " aws", "go", "c++"]
+
+
+@pytest.fixture(autouse=True)
+def exact_mode(monkeypatch):
+    monkeypatch.setattr(batch_scorer, "get_skill_matcher", lambda: None)
+
+
+def _scalar(required_skills, profile, attrition_prob):
+    """The per-application loop score_profiles replaces."""
+    req_norm = norm_list(required_skills)
+    cand_norm = norm_list(profile.get("skills"))
+    skill_match = 0.0
+    if req_norm and cand_norm:
+        skill_match = (len(set(req_norm) & set(cand_norm)) / max(1, len(req_norm))) * 100.0
+    return calculate_fitment_score({
+        "skill_match": skill_match,
+        "cultural_fit": float(profile.get("cultural_fit") or 0.5),
+        "growth_potential": float(profile.get("growth_potential") or 0.5),
+    }, attrition_prob)
+
+
+def _assert_identical(required_skills, profiles, attrition):
+    scores, breakdowns, _ = score_profiles(required_skills, profiles, np.array(attrition))
+    for profile, prob, score, breakdown in zip(profiles, attrition, scores, breakdowns):
+        expected_score, expected_breakdown = _scalar(required_skills, profile, prob)
+        # bit-identical, not approximately equal
+        assert (score, breakdown) == (expected_score, expected_breakdown), (profile, prob)
+
+
+def test_random_profiles_match_the_scalar_calculator():
+    rng = random.Random(7)
+    for _ in range(20):
+        required = rng.sample(SKILLS, rng.randint(0, 5))
+        profiles = [{
+            "skills": [rng.choice(SKILLS) for _ in range(rng.randint(0, 8))],
+            "cultural_fit": round(rng.random(), rng.randint(1, 6)),
+            "growth_potential": rng.choice([None, 0, round(rng.random(), 3)]),
+        } for _ in range(500)]
+        _assert_identical(required, profiles, [round(rng.random(), rng.randint(1, 6)) for _ in profiles])
+
+
+def test_round2_ties_match_the_scalar_calculator():
+    # x * 100 lands on (or a float hair off) a .xx5 tie for every value below
+    ties = [(2 * k + 1) / 20000 for k in range(10000)]
+    profiles = [{"skills": ["python"], "cultural_fit": v, "growth_potential": ties[-1 - i]} for i, v in enumerate(ties)]
+    _assert_identical(["python", "sql"], profiles, ties)
+
+
+def test_empty_and_duplicate_skills_match_the_scalar_calculator():
+    profiles = [
+        {"skills": []},
+        {"skills": None},
+        {"skills": ["", "  "]},
+        {"skills": ["python", "Python", " python "]},
+        {"skills": ["sql", "SQL", "docker", "docker"]},
+    ]
+    for required in ([], ["python"], ["python", "python", "sql"], ["Python", " SQL", "sql", "java"]):
+        _assert_identical(required, profiles, [0.0, 0.25, 0.5, 0.125, 1.0])
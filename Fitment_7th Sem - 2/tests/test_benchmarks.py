@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from benchmarks import run
+from benchmarks.harness import compare_results
+from benchmarks.synthetic import SyntheticData, load_hr_sample
+
+
+@pytest.fixture(scope="module")
+def hr():
+    return load_hr_sample()
+
+
+def test_synthetic_data_is_seeded_and_drawn_from_the_hr_csv(hr):
+    first = SyntheticData(seed=3, hr=hr)
+    again = SyntheticData(seed=3, hr=hr)
+    other = SyntheticData(seed=4, hr=hr)
+
+    candidates = first.candidates(200)
+    assert candidates == again.candidates(200)
+    assert candidates != other.candidates(200)
+    assert first.job("job-1") == again.job("job-1")
+    # every candidate's HR attributes are one real row's
+    rows = {tuple(r) for r in hr[["Age", "MonthlyIncome", "YearsAtCompany"]].itertuples(index=False)}
+    assert all((c["profile"]["Age"], c["profile"]["MonthlyIncome"], c["profile"]["YearsAtCompany"]) in rows
+               for c in candidates)
+
+
+def _doc(**medians):
+    return {"benchmarks": [{"name": name, "stats": {"median": m}} for name, m in medians.items()]}
+
+
+def test_compare_results_flags_only_slowdowns_past_the_limit():
+    rows, regressions = compare_results(_doc(a=1.0, b=1.0, c=1.0, gone=1.0), _doc(a=1.05, b=1.2, c=0.5, new=9.0),
+                                        max_regression=0.10)
+
+    assert [(name, round(change, 2)) for name, _, _, change in rows] == [("a", 0.05), ("b", 0.2), ("c", -0.5)]
+    assert regressions == ["b"]
+
+
+def test_run_writes_comparable_json(tmp_path, monkeypatch):
+    # run.main points the environment and working directory at its own stub and workdir
+    for name in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "RANK_CACHE_DB", "RANK_QUEUE_DB", "RESUME_CACHE_DIR"):
+        monkeypatch.setenv(name, "")
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "current.json"
+
+    assert run.main(["-k", "*scoring*", "--sizes", "1000", "--rounds", "0.1", "--out", str(out)]) == 0
+
+    doc = json.loads(out.read_text())
+    names = [b["name"] for b in doc["benchmarks"]]
+    assert names == ["scoring/scalar_scoring", "scoring/batch_scoring[n=1000]"]
+    assert all(b["stats"]["rounds"] >= 1 and "error" not in b["extra_info"] for b in doc["benchmarks"])
+    assert doc["options"]["sizes"] == [1000]
+
+    # a baseline ten times as fast makes the comparison fail
+    baseline = tmp_path / "baseline.json"
+    for b in doc["benchmarks"]:
+        b["stats"]["median"] /= 10
+    baseline.write_text(json.dumps(doc))
+    assert run.main(["-k", "*scalar*", "--rounds", "2", "--out", str(tmp_path / "next.json"),
+                     "--compare", str(baseline), "--max-regression", "0.5"]) == 1
@@ -0,0 +1,38 @@
+import glob
+import io
+import os
+
+import app as service
+from utils import bulk_ingest
+
+
+def _staged_files():
+    return glob.glob(os.path.join(service.UPLOAD_FOLDER, "*.batch"))
+
+
+def test_batch_upload_removes_staged_files_when_the_stream_never_starts():
+    before = set(_staged_files())
+    resp = service.app.test_client().post(
+        "/upload/batch", data={"resumes": [(io.BytesIO(b"Skills: Python"), "a.txt"), (io.BytesIO(b"Java"), "b.txt")]},
+        content_type="multipart/form-data", buffered=False)
+    assert resp.status_code == 200
+    assert len(set(_staged_files()) - before) == 2
+
+    # the client goes away before the first line: the generator never runs
+    resp.close()
+
+    assert set(_staged_files()) - before == set()
+
+
+def test_default_workers_split_cores_between_web_workers(monkeypatch):
+    monkeypatch.setattr(bulk_ingest, "available_cores", lambda: 8)
+    monkeypatch.delenv("BULK_INGEST_WORKERS", raising=False)
+
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert bulk_ingest.default_workers() == 8
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert bulk_ingest.default_workers() == 2
+    monkeypatch.setenv("WEB_CONCURRENCY", "16")
+    assert bulk_ingest.default_workers() == 1
+    monkeypatch.setenv("BULK_INGEST_WORKERS", "3")
+    assert bulk_ingest.default_workers() == 3
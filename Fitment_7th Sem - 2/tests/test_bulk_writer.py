@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from utils.bulk_writer import bulk_upsert, bulk_upsert_async
+from utils.supabase_client import get_client
+
+ROWS = [{"id": f"app-{i}", "fitment_score": float(i)} for i in range(8)]
+
+
+def _upsert(mode, rows, chunk_size):
+    client = get_client()
+    if mode == "sync":
+        return bulk_upsert(client, "applications", rows, chunk_size=chunk_size)
+    pytest.importorskip("aiohttp")
+    from utils.async_supabase import AsyncSupabaseClient
+
+    async def run():
+        async_client = AsyncSupabaseClient(client)
+        try:
+            return await bulk_upsert_async(async_client, "applications", rows, chunk_size=chunk_size)
+        finally:
+            await async_client.close()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_bulk_upsert_writes_every_chunk(supabase_stub, mode):
+    stub = supabase_stub()
+
+    result = _upsert(mode, ROWS, chunk_size=3)
+
+    assert result == {"written": 8, "failed": []}
+    assert stub.requests["POST"] == 3
+    assert sorted(r["id"] for r in stub.rows("applications")) == sorted(r["id"] for r in ROWS)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_bulk_upsert_isolates_a_conflicting_row(supabase_stub, mode):
+    stub = supabase_stub()
+    stub.reject_writes = lambda table, rows: 409 if any(r["id"] == "app-5" for r in rows) else None
+
+    result = _upsert(mode, ROWS, chunk_size=8)
+
+    assert result["written"] == 7
+    assert [(f["row"]["id"], f["status"]) for f in result["failed"]] == [("app-5", 409)]
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1
+    assert stub.requests["POST"] == 7
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_bulk_upsert_fails_an_unauthorized_chunk_once(supabase_stub, mode):
+    stub = supabase_stub()
+    stub.reject_writes = lambda table, rows: 401
+
+    result = _upsert(mode, ROWS, chunk_size=8)
+
+    assert result["written"] == 0
+    assert [f["status"] for f in result["failed"]] == [401] * 8
+    assert stub.requests["POST"] == 1
+
+
+def test_rank_rejects_non_integer_chunk_size(supabase_stub):
+    import app as service
+
+    stub = supabase_stub()
+    resp = service.app.test_client().post("/rank", json={"job_id": "job-chunk", "chunk_size": "many"})
+
+    assert resp.status_code == 400
+    assert "chunk_size" in resp.get_json()["error"]
+    assert stub.requests["GET"] == 0
@@ -0,0 +1,90 @@
+import random
+import time
+
+import numpy as np
+
+from utils import candidate_store
+from utils.candidate_store import CandidateStore, DeltaStore
+
+SKILLS = ["python", "sql", "docker", "k8s", "java", "go"]
+
+
+class FixedPredictor:
+    version = "test"
+
+    def predict_proba(self, features):
+        return np.round(features[:, 0] / 10, 2)
+
+
+def _row(rng, cid, named=True):
+    row = {"id": cid, "profile": {
+        "skills": rng.sample(SKILLS, rng.randint(0, 3)),
+        "experience_years": rng.randint(0, 5),
+        # few distinct values, so plenty of ties
+        "cultural_fit": rng.choice([0.25, 0.5, 0.75]),
+    }}
+    if named:
+        row.update(display_name=f"Name {cid}", email=f"{cid}@example.com")
+    return row
+
+
+def _assert_same(store, expected):
+    predictor = FixedPredictor()
+    assert len(store) == len(expected)
+    ids = [expected.candidate_id(i) for i in range(len(expected))]
+    assert [store.candidate_id(r) for r in store.rows_for([*ids, "missing"])] == ids
+    for required in (["python", "sql"], ["kubernetes"], []):
+        assert ([(store.candidate_id(r), s, b) for r, s, b in store.top(required, predictor, 7)]
+                == [(expected.candidate_id(r), s, b) for r, s, b in expected.top(required, predictor, 7)])
+        *_, (top, stats) = store.iter_top(required, predictor, 5, min_experience=1, first_chunk=4)
+        *_, (want, want_stats) = expected.iter_top(required, predictor, 5, min_experience=1, first_chunk=4)
+        assert [(store.candidate_id(r), s) for r, s, _ in top] == [(expected.candidate_id(r), s) for r, s, _ in want]
+        assert stats["candidates"] == want_stats["candidates"] and stats["done"]
+    for cid in ids[:20]:
+        row, = store.rows_for([cid])
+        want, = expected.rows_for([cid])
+        assert (store.display_name(row), store.email(row)) == (expected.display_name(want), expected.email(want))
+
+
+def test_layered_changes_answer_as_a_rebuilt_store():
+    rng = random.Random(3)
+    rows = {f"c{i:03d}": _row(rng, f"c{i:03d}") for i in range(200)}
+    base = CandidateStore.from_rows(rows.values())
+    store = base
+    for _ in range(30):
+        upserts = [_row(rng, f"c{rng.randrange(260):03d}", named=rng.random() < 0.5) for _ in range(rng.randint(0, 6))]
+        removed = [f"c{rng.randrange(260):03d}" for _ in range(rng.randint(0, 3))]
+        removed = [cid for cid in removed if cid not in {row["id"] for row in upserts}]
+        store = store.with_changes(upserts, removed)
+        for cid in removed:
+            rows.pop(cid, None)
+        for row in upserts:
+            # a row without a name keeps the stored one
+            if "display_name" not in row and row["id"] in rows:
+                row = {**row, "display_name": rows[row["id"]].get("display_name"), "email": rows[row["id"]].get("email")}
+            rows[row["id"]] = row
+
+    assert isinstance(store, DeltaStore) and store.base is base
+    expected = CandidateStore.from_rows(rows.values())
+    _assert_same(store, expected)
+    _assert_same(store.compact(), expected)
+
+
+def test_store_compacts_in_the_background(monkeypatch):
+    rng = random.Random(5)
+    base = CandidateStore.from_rows([_row(rng, f"c{i:03d}") for i in range(50)])
+    monkeypatch.setattr(candidate_store, "_store", base)
+    monkeypatch.setattr(candidate_store, "STORE_COMPACT_ROWS", 4)
+
+    candidate_store.upsert_candidates([_row(rng, "c001"), _row(rng, "c100")])
+    layered = candidate_store.get_candidate_store()
+    assert isinstance(layered, DeltaStore) and layered.delta_rows == 3
+
+    candidate_store.upsert_candidates([_row(rng, "c101")])
+    assert isinstance(candidate_store.get_candidate_store(), DeltaStore)
+    deadline = time.monotonic() + 5
+    while candidate_store._journal is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    compacted = candidate_store.get_candidate_store()
+    assert isinstance(compacted, CandidateStore) and len(compacted) == 52
+    assert compacted.candidate_id(compacted.rows_for(["c101"])[0]) == "c101"
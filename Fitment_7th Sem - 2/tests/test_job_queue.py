@@ -0,0 +1,55 @@
+import sqlite3
+import threading
+import time
+
+from utils.job_queue import RankJobQueue
+
+
+def _wait_for(queue, token, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(token)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"run {token} still {job['status']}")
+
+
+def test_heartbeat_keeps_a_silent_run_claimed(tmp_path):
+    calls = []
+
+    def handler(job_id, payload, progress):
+        # never reports progress, and runs for several stale_after periods
+        calls.append(job_id)
+        time.sleep(1.0)
+        return {"ok": True}
+
+    queue = RankJobQueue(handler, db_path=str(tmp_path / "jobs.sqlite3"), workers=2, poll_interval=0.05,
+                         stale_after=0.3, heartbeat_interval=0.05)
+    token, _ = queue.submit("job-1", {})
+
+    assert _wait_for(queue, token)["result"] == {"ok": True}
+    # the idle second worker would have re-claimed a run whose row went stale
+    assert calls == ["job-1"]
+
+
+def test_worker_survives_a_failed_outcome_write(tmp_path):
+    queue = RankJobQueue(lambda job_id, payload, progress: job_id, db_path=str(tmp_path / "jobs.sqlite3"),
+                         workers=1, poll_interval=0.05)
+    update = queue._update
+    failed = threading.Event()
+
+    def flaky_update(token, **fields):
+        if fields.get("status") == "done" and not failed.is_set():
+            failed.set()
+            raise sqlite3.OperationalError("database is locked")
+        return update(token, **fields)
+
+    queue._update = flaky_update
+    first, _ = queue.submit("job-1", {})
+    assert failed.wait(5)
+    second, _ = queue.submit("job-2", {})
+
+    assert _wait_for(queue, second)["result"] == "job-2"
+    assert queue.get(first)["status"] == "running"
+    assert all(t.is_alive() for t in queue._threads)
@@ -0,0 +1,42 @@
+import json
+
+import app as service
+from utils import candidate_store
+from utils.resume_parser import extract_requirements
+
+
+def test_extract_requirements_resolves_aliases():
+    assert extract_requirements("Must know Go, C, R, node, k8s")["skills"] == ["c", "golang", "kubernetes", "node.js", "r"]
+    # the same words in prose are not skills
+    assert extract_requirements("We go fast; the rest of the team works on R&D.")["skills"] == []
+
+
+def test_match_jd_rejects_top_k_below_one(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    client = service.app.test_client()
+    for top_k in (0, -5):
+        resp = client.post("/match/jd", json={"jd": "Python, Docker", "top_k": top_k})
+        assert resp.status_code == 400
+        assert "top_k" in resp.get_json()["error"]
+
+
+def _sse_events(body):
+    events = {}
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events[lines["event"]] = json.loads(lines["data"])
+    return events
+
+
+def test_match_jd_matches_alias_spelled_candidate_skills(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    monkeypatch.setattr(candidate_store, "_store", candidate_store.CandidateStore.from_rows([
+        {"id": "cand-aliases", "profile": {"skills": ["Go", "k8s", "Node"]}},
+        {"id": "cand-canonical", "profile": {"skills": ["golang", "kubernetes", "node.js"]}},
+    ]))
+
+    resp = service.app.test_client().post("/match/jd", json={"jd": "Must know Go, k8s, node", "top_k": 2})
+
+    done = _sse_events(resp.get_data(as_text=True))["done"]
+    matches = {r["candidate_id"]: r["sub_scores"]["Skill Match"] for r in done["results"]}
+    assert matches["cand-aliases"] == matches["cand-canonical"] > 0
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+
+import app as service
+from utils import metrics
+
+SCORE_REQUEST = {
+    "job_id": "job-metrics", "candidate_id": "cand-metrics",
+    "job": {"skills_required": ["python"]},
+    "candidate": {"profile": {"skills": ["python", "sql"], "experience_years": 2}},
+}
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def _samples(text):
+    """{(name, frozenset of label pairs): value} of a Prometheus text exposition."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, labels, value = _SAMPLE.match(line).groups()
+            out[name, frozenset(re.findall(r'(\w+)="([^"]*)"', labels or ""))] = float(value)
+    return out
+
+
+def _value(samples, name, **labels):
+    return sum(v for (n, ls), v in samples.items() if n == name and set(labels.items()) <= ls)
+
+
+def _server_timing(header):
+    return {name: float(dur) for name, dur in re.findall(r"([\w-]+);dur=([\d.]+)", header)}
+
+
+def test_server_timing_only_when_asked(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    client = service.app.test_client()
+
+    plain = client.post("/score", json=SCORE_REQUEST)
+    by_header = client.post("/score", json=SCORE_REQUEST, headers={"X-Profile": "1"})
+    by_query = client.post("/score?profile=1", json=SCORE_REQUEST)
+
+    assert "Server-Timing" not in plain.headers
+    for resp in (by_header, by_query):
+        timing = _server_timing(resp.headers["Server-Timing"])
+        assert {"profile", "attrition", "score", "index_update", "total"} <= set(timing)
+        assert sum(v for k, v in timing.items() if k != "total") <= timing["total"]
+
+
+def test_metrics_count_requests_and_stages(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    client = service.app.test_client()
+    before = _samples(client.get("/metrics").get_data(as_text=True))
+
+    for _ in range(3):
+        client.post("/score", json=SCORE_REQUEST)
+    resp = client.get("/metrics")
+
+    assert resp.mimetype == "text/plain"
+    after = _samples(resp.get_data(as_text=True))
+    for name, labels in (("fitment_http_requests_total", {"endpoint": "/score", "status": "200"}),
+                         ("fitment_rows_scored_total", {"endpoint": "score"}),
+                         ("fitment_stage_seconds_count", {"endpoint": "score", "stage": "score"})):
+        assert _value(after, name, **labels) - _value(before, name, **labels) == 3
+    # cumulative buckets, ending in the count
+    buckets = sorted((float(dict(ls)["le"]), v) for (n, ls), v in after.items()
+                     if n == "fitment_stage_seconds_bucket" and {("endpoint", "score"), ("stage", "score")} <= ls)
+    assert [v for _, v in buckets] == sorted(v for _, v in buckets)
+    assert buckets[-1] == (float("inf"), _value(after, "fitment_stage_seconds_count", endpoint="score", stage="score"))
+
+
+def test_shared_metrics_add_up_every_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    metrics.ROWS_SCORED.inc(endpoint="shared-test")
+    own = _value(_samples(metrics.render()), "fitment_rows_scored_total", endpoint="shared-test")
+
+    # another worker's snapshot, from a process that has since exited
+    with open(tmp_path / f"{os.getpid()}.json") as f:
+        snapshot = json.load(f)
+    snapshot["pid"] = 2 ** 22 + 1
+    (tmp_path / "other.json").write_text(json.dumps(snapshot))
+
+    assert _value(_samples(metrics.render()), "fitment_rows_scored_total", endpoint="shared-test") == 2 * own
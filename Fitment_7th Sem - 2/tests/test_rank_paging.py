@@ -0,0 +1,33 @@
+import pytest
+
+import app as service
+
+N_APPLICATIONS = 2500
+
+
+def _load_job(stub, job_id):
+    candidates = [{"id": f"cand-{i:05d}", "display_name": f"Candidate {i}", "email": f"c{i}@example.com",
+                   "profile": {"skills": ["python", "sql"] if i % 2 else ["java"], "experience_years": i % 10}}
+                  for i in range(N_APPLICATIONS)]
+    stub.load("jobs", [{"id": job_id, "skills": ["python", "sql"]}])
+    stub.load("candidates", candidates)
+    stub.load("applications", [{"id": f"{job_id}-app-{i:05d}", "job_id": job_id, "candidate_id": c["id"],
+                                "status": "applied", "fitment_score": None} for i, c in enumerate(candidates)])
+
+
+@pytest.mark.parametrize("route", ["/rank", "/rank/async"])
+def test_rank_pages_past_the_server_row_cap(supabase_stub, route):
+    if route == "/rank/async":
+        pytest.importorskip("aiohttp")
+    # PostgREST caps every response at db-max-rows, whatever limit the request asks for
+    stub = supabase_stub(max_rows=1000)
+    job_id = f"job-paging{route.replace('/', '-')}"
+    _load_job(stub, job_id)
+
+    resp = service.app.test_client().post(route, json={"job_id": job_id, "page_size": 2000})
+
+    assert resp.status_code == 200
+    results = resp.get_json()
+    assert len(results) == N_APPLICATIONS
+    assert len({r["candidate_id"] for r in results}) == N_APPLICATIONS
+    assert all(a["fitment_score"] is not None for a in stub.rows("applications"))
@@ -0,0 +1,37 @@
+import app as service
+from utils.skill_index import get_skill_index
+
+
+def test_score_keeps_skills_text_candidate_findable(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    resp = service.app.test_client().post("/score", json={
+        "job_id": "job-skills-text",
+        "candidate_id": "cand-skills-text",
+        "job": {"skills_required": ["python"]},
+        "candidate": {"profile": {"skills_text": "Python, Docker"}},
+    })
+
+    assert resp.status_code == 200
+    found = [r["candidate_id"] for r in get_skill_index().top_k(["python"])]
+    assert "cand-skills-text" in found
+    assert [r["candidate_id"] for r in get_skill_index().top_k(["p"])] == []
+
+
+def test_score_write_makes_rank_rewrite_the_application(supabase_stub):
+    stub = supabase_stub()
+    stub.load("jobs", [{"id": "job-score-rank", "skills": ["python", "sql"]}])
+    stub.load("candidates", [{"id": "cand-score-rank", "display_name": "C", "email": "c@example.com",
+                              "profile": {"skills": ["python", "sql"], "experience_years": 3}}])
+    stub.load("applications", [{"id": "app-score-rank", "job_id": "job-score-rank", "candidate_id": "cand-score-rank",
+                                "status": "applied", "fitment_score": None}])
+    client = service.app.test_client()
+
+    ranked = client.post("/rank", json={"job_id": "job-score-rank"}).get_json()[0]["fitment_score"]
+    # /score rates the same application against other skills and writes its own score
+    client.post("/score", json={"job_id": "job-score-rank", "candidate_id": "cand-score-rank",
+                                "job": {"skills_required": ["java"]},
+                                "candidate": {"profile": {"skills": ["python", "sql"], "experience_years": 3}}})
+    assert stub.rows("applications")[0]["fitment_score"] != ranked
+
+    client.post("/rank", json={"job_id": "job-score-rank"})
+    assert stub.rows("applications")[0]["fitment_score"] == ranked
@@ -0,0 +1,36 @@
+from utils import skill_index
+from utils.skill_index import SkillIndex
+
+import app as service
+
+
+def _top(client, skills, **extra):
+    return client.post("/candidates/top", json={"skills": skills, **extra})
+
+
+def test_candidates_top_follows_webhook_changes(supabase_stub, monkeypatch):
+    monkeypatch.setattr(skill_index, "_index", SkillIndex())
+    stub = supabase_stub()
+    stub.load("candidates", [
+        {"id": "cand-a", "skills": ["python", "sql"]},
+        {"id": "cand-b", "skills_text": "Java"},
+    ])
+    client = service.app.test_client()
+    assert [r["candidate_id"] for r in _top(client, ["python"]).get_json()] == ["cand-a"]
+
+    stub.load("candidates", [{"id": "cand-b", "skills": ["python"]}])
+    for event in ({"type": "UPDATE", "table": "candidates", "record": {"id": "cand-b"}},
+                  {"type": "DELETE", "table": "candidates", "old_record": {"id": "cand-a"}}):
+        assert client.post("/webhooks/supabase", json=event).status_code == 200
+
+    assert [r["candidate_id"] for r in _top(client, ["python"]).get_json()] == ["cand-b"]
+    assert _top(client, ["java"]).get_json() == []
+
+
+def test_candidates_top_rejects_k_below_one(monkeypatch):
+    monkeypatch.setattr(service, "get_client", lambda: None)
+    client = service.app.test_client()
+    for k in (0, -1):
+        resp = _top(client, ["python"], k=k)
+        assert resp.status_code == 400
+        assert "k must be" in resp.get_json()["error"]
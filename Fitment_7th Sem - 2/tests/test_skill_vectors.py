@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from utils import batch_scorer, skill_vectors
+from utils.batch_scorer import pack_skill_lists, score_profiles, skill_match_batch
+from utils.skill_vectors import SkillVectors
+
+
+@pytest.fixture(scope="module")
+def raw():
+    """The shipped vocabulary with every similarity kept (threshold 0)."""
+    return SkillVectors.from_files(threshold=0)
+
+
+def _with_threshold(matcher, threshold):
+    return SkillVectors(matcher.skills, matcher.vectors, matcher.aliases, matcher.version, threshold)
+
+
+def test_vectors_are_mapped_read_only(raw):
+    assert isinstance(raw.vectors, np.memmap)
+    assert not raw.vectors.flags.writeable
+
+
+def test_threshold_zeroes_weaker_similarities(raw):
+    close = float(raw.similarities(["pytorch"], ["pytorch lightning"])[0, 0])
+    assert 0 < close < 1
+
+    below = _with_threshold(raw, close - 1e-6).similarities(["pytorch"], ["pytorch lightning", "cooking"])
+    above = _with_threshold(raw, close + 1e-6).similarities(["pytorch"], ["pytorch lightning", "cooking"])
+
+    assert below[0].tolist() == [pytest.approx(close), 0.0]
+    assert above[0].tolist() == [0.0, 0.0]
+    # aliases are the same canonical skill: full credit at any threshold
+    assert _with_threshold(raw, 1.0).similarities(["javascript", "kubernetes"], ["JS", "k8s"]).tolist() == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_semantic_skill_match_follows_the_threshold(raw, monkeypatch):
+    close = float(raw.similarities(["pytorch"], ["pytorch lightning"])[0, 0])
+    profiles = [{"skills": ["pytorch lightning"]}, {"skills": ["PyTorch"]}, {"skills": ["cooking"]}]
+
+    for threshold, expected in ((close - 1e-6, [close * 100, 100.0, 0.0]), (close + 1e-6, [0.0, 100.0, 0.0])):
+        monkeypatch.setattr(batch_scorer, "get_skill_matcher", lambda: _with_threshold(raw, threshold))
+        _, _, columns = score_profiles(["pytorch"], profiles)
+        assert columns["skill_match"].tolist() == pytest.approx(expected)
+
+
+def test_threshold_one_is_exact_matching(raw):
+    rng = random.Random(11)
+    exact = _with_threshold(raw, 1.0)
+    for _ in range(20):
+        required = rng.sample(raw.skills, rng.randint(1, 6))
+        flat, offsets = pack_skill_lists([rng.sample(raw.skills, rng.randint(0, 8)) for _ in range(200)])
+        assert np.array_equal(exact.match(required, flat, offsets), skill_match_batch(required, flat, offsets))
+
+
+def test_semantic_mode_is_opt_in(monkeypatch):
+    monkeypatch.setattr(skill_vectors, "_matcher", None)
+    monkeypatch.setattr(skill_vectors, "_matcher_loaded", False)
+    monkeypatch.setenv("SKILL_MATCH_MODE", "semantic")
+
+    matcher = skill_vectors.get_skill_matcher()
+
+    assert isinstance(matcher, SkillVectors)
+    assert skill_vectors.match_version() == matcher.match_version != "exact"
@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.stub_supabase import StubSupabase
+from utils.supabase_client import SupabaseClient
+
+
+@pytest.fixture
+def stub():
+    with StubSupabase() as stub:
+        yield stub
+
+
+def _failing(statuses):
+    """reject_writes that answers with each of `statuses` in turn, then lets writes through."""
+    statuses = list(statuses)
+    return lambda table, rows: statuses.pop(0) if statuses else None
+
+
+def test_requests_reuse_one_pooled_connection(stub):
+    stub.load("jobs", [{"id": "job-1", "skills": ["python"]}])
+    client = SupabaseClient(stub.url, "test")
+
+    for _ in range(20):
+        assert client.get("jobs", params={"id": "eq.job-1"}).json() == [{"id": "job-1", "skills": ["python"]}]
+
+    stats = client.stats()
+    assert (stats["requests"], stats["connections_opened"], stats["connections_reused"]) == (20, 1, 19)
+
+
+def test_retries_5xx_with_backoff_when_safe_to_repeat(stub):
+    stub.reject_writes = _failing([503, 429])
+    client = SupabaseClient(stub.url, "test", backoff=0.001)
+
+    resp = client.post("jobs", json={"id": "job-1"}, retry=True)
+
+    assert resp.status_code in (200, 201)
+    assert stub.requests["POST"] == 3
+    assert [row["id"] for row in stub.rows("jobs")] == ["job-1"]
+    assert (client.stats()["retries"], client.stats()["failures"]) == (2, 0)
+
+
+def test_plain_post_is_not_retried(stub):
+    stub.reject_writes = _failing([503])
+    client = SupabaseClient(stub.url, "test", backoff=0.001)
+
+    assert client.post("jobs", json={"id": "job-1"}).status_code == 503
+    assert stub.requests["POST"] == 1
+    assert stub.rows("jobs") == []
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.reject_writes = lambda table, rows: 502
+    client = SupabaseClient(stub.url, "test", max_retries=2, backoff=0.001)
+
+    assert client.post("jobs", json={"id": "job-1"}, retry=True).status_code == 502
+    assert stub.requests["POST"] == 3
+    assert (client.stats()["retries"], client.stats()["failures"]) == (2, 1)
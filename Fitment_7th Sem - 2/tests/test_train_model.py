@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.attrition_predictor import ATTRITION_FEATURES, AttritionPredictor
+
+pytest.importorskip("sklearn")
+from train_model.train_attrition_model import DEFAULT_CSV, load_data, main  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _train(tmp_path, name, *args):
+    out = str(tmp_path / f"{name}.npz")
+    main(["--out", out, *args])
+    with open(tmp_path / f"{name}.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    with np.load(out) as arrays:
+        return meta, {key: arrays[key] for key in arrays.files}
+
+
+def _same_arrays(a, b):
+    return a.keys() == b.keys() and all(np.array_equal(a[k], b[k]) for k in a)
+
+
+def test_training_is_reproducible(tmp_path):
+    first_meta, first = _train(tmp_path, "first")
+    again_meta, again = _train(tmp_path, "again")
+    other_meta, _ = _train(tmp_path, "other", "--seed", "7")
+
+    assert first_meta["version"] == again_meta["version"] != other_meta["version"]
+    assert _same_arrays(first, again)
+    assert first_meta["data"]["sha256"] == again_meta["data"]["sha256"]
+    assert AttritionPredictor.from_artifact(str(tmp_path / "first.npz")).version == first_meta["version"]
+
+
+def test_parallel_search_is_reproducible(tmp_path):
+    first_meta, first = _train(tmp_path, "first", "--search", "--cv", "3", "--jobs", "2")
+    again_meta, again = _train(tmp_path, "again", "--search", "--cv", "3", "--jobs", "2")
+
+    assert first_meta["version"] == again_meta["version"]
+    assert _same_arrays(first, again)
+    assert first_meta["training"]["search"] and "cv_roc_auc" in first_meta["metrics"]
+
+
+def test_load_data_reads_only_the_model_columns(tmp_path):
+    df = pd.read_csv(DEFAULT_CSV)
+    df.insert(0, "Notes", "free text, not a number")
+    path = tmp_path / "hr.csv"
+    df.to_csv(path, index=False)
+
+    X, y = load_data(str(path))
+
+    assert X.shape == (len(df), len(ATTRITION_FEATURES))
+    assert np.array_equal(X, df[ATTRITION_FEATURES].to_numpy(dtype="float64"))
+    assert np.array_equal(y, (df["Attrition"] == "Yes").to_numpy(dtype="int8"))
+
+
+def test_artifact_loads_without_sklearn(tmp_path):
+    meta, _ = _train(tmp_path, "model")
+    code = ("import sys; from utils.attrition_predictor import AttritionPredictor; "
+            f"p = AttritionPredictor.from_artifact({str(tmp_path / 'model.npz')!r}); "
+            "assert 'sklearn' not in sys.modules; print(p.version)")
+
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == meta["version"]
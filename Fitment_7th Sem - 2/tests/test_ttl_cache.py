@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+
+import app as service
+from utils.ttl_cache import InvalidationLog, TTLCache
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _publish_elsewhere(db_path, *publishes):
+    """Publish (cache name, key) invalidations from a separate process, as another gunicorn worker would."""
+    code = ("import sys; from utils.ttl_cache import InvalidationLog, TTLCache; "
+            "log = InvalidationLog(sys.argv[1]); "
+            f"[log.publish(TTLCache(name), key) for name, key in {publishes!r}]")
+    subprocess.run([sys.executable, "-c", code, db_path], cwd=APP_DIR, check=True)
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted():
+    clock = Clock()
+    cache = TTLCache("test", maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    clock.now = 10
+    assert cache.get("a", "gone") == "gone"
+    cache.set("d", {"v": 1})
+    assert cache.get("d", check=lambda v: v["v"] == 2) is None
+    assert cache.stats() == {"hits": 3, "misses": 3, "evictions": 1, "expired": 1, "stale": 1, "invalidations": 0,
+                             "entries": 1, "maxsize": 2, "ttl": 10.0}
+
+
+def test_invalidations_reach_other_processes(tmp_path):
+    db_path = str(tmp_path / "log.sqlite3")
+    log = InvalidationLog(db_path, interval=60)
+    profiles = TTLCache("profiles", log=log)
+    jobs = TTLCache("jobs", log=log)
+    for key in (("score", "cand-1"), ("rank", "cand-1"), ("score", "cand-2")):
+        profiles.set(key, "profile")
+    jobs.set("job-1", ["python"])
+    assert jobs.get("job-1") == ["python"]  # synced just now
+
+    _publish_elsewhere(db_path, ("profiles", ("score", "cand-1")), ("jobs", None))
+
+    # rate limited: nothing replayed until the interval is up
+    assert jobs.get("job-1") == ["python"]
+    log.sync(force=True)
+    assert jobs.get("job-1") is None
+    assert [k for k in (("score", "cand-1"), ("rank", "cand-1"), ("score", "cand-2")) if profiles.get(k)] == [
+        ("rank", "cand-1"), ("score", "cand-2")]
+
+    # a process started later has nothing to replay
+    late = TTLCache("jobs", log=InvalidationLog(db_path))
+    late.set("job-1", ["java"])
+    assert late.get("job-1") == ["java"]
+
+
+def test_job_webhook_in_another_worker_reaches_rank(supabase_stub, monkeypatch):
+    stub = supabase_stub()
+    stub.load("jobs", [{"id": "job-ttl", "skills": ["python"]}])
+    stub.load("candidates", [{"id": "cand-ttl", "profile": {"skills": ["java"]}}])
+    stub.load("applications", [{"id": "app-ttl", "job_id": "job-ttl", "candidate_id": "cand-ttl", "status": "applied"}])
+    client = service.app.test_client()
+
+    def skill_match():
+        resp = client.post("/rank", json={"job_id": "job-ttl", "force": True})
+        return resp.get_json()[0]["sub_scores"]["Skill Match"]
+
+    assert skill_match() == 0
+    stub.load("jobs", [{"id": "job-ttl", "skills": ["java"]}])
+    assert skill_match() == 0  # still the cached requirements
+
+    # the webhook landed on another worker
+    _publish_elsewhere(service.RANK_CACHE_DB, ("job_requirements", "job-ttl"))
+    monkeypatch.setattr(service.CACHE_LOG, "_next_sync", 0.0)
+    assert skill_match() > 0
@@ -0,0 +1,24 @@
+import io
+
+import app as service
+
+RESUME = b"Jane Doe\nSkills: Python, Docker\n4 years of experience\n"
+
+
+def _upload(**form):
+    data = {"resume": (io.BytesIO(RESUME), "resume.txt"), **form}
+    return service.app.test_client().post("/upload", data=data, content_type="multipart/form-data")
+
+
+def test_upload_computes_skill_match_from_parsed_skills():
+    resp = _upload(skills_required="python, java")
+
+    assert resp.status_code == 200
+    assert "<strong>Skill Match:</strong> 50.0%" in resp.get_data(as_text=True)
+
+
+def test_upload_without_required_skills_keeps_the_placeholder():
+    resp = _upload()
+
+    assert resp.status_code == 200
+    assert "<strong>Skill Match:</strong> 85.0%" in resp.get_data(as_text=True)
@@ -0,0 +1,97 @@
+"""
+Build the skill vocabulary and vectors used by SKILL_MATCH_MODE=semantic.
+
+Run from the app folder:
+
+    python -m train_model.build_skill_vocab [--skills extra_skills.txt]
+
+Writes models/skill_vocab.json and models/skill_vectors.npy. Each skill's
+vector is its hashed n-gram embedding plus the embeddings of the broader
+skills it belongs to (RELATED below), so "pytorch lightning" lands next to
+"pytorch" and "postgresql" next to "sql". Files are replaced atomically, so
+workers that already mapped the old vectors keep a valid mapping.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from utils.resume_parser import SKILL_VOCABULARY
+from utils.skill_vectors import EMBEDDING_DIM, SKILL_ALIASES, VECTORS_PATH, VOCAB_PATH, embed_skill, normalize_skill
+
+# skill -> broader skills it should sit close to
+RELATED = {
+    "pytorch lightning": ["pytorch"],
+    "keras": ["tensorflow", "deep learning"],
+    "tensorflow": ["deep learning"],
+    "pytorch": ["deep learning"],
+    "deep learning": ["machine learning"],
+    "scikit-learn": ["machine learning"],
+    "llms": ["nlp"],
+    "next.js": ["react"],
+    "express.js": ["node.js"],
+    "typescript": ["javascript"],
+    "node.js": ["javascript"],
+    "react": ["javascript"],
+    "angular": ["javascript", "typescript"],
+    "vue": ["javascript"],
+    "tailwind css": ["css"],
+    "postgresql": ["sql"],
+    "mysql": ["sql"],
+    "sqlite": ["sql"],
+    "pyspark": ["spark", "python"],
+    "databricks": ["spark"],
+    "fastapi": ["python"],
+    "django": ["python"],
+    "flask": ["python"],
+    "spring": ["java"],
+    "kotlin": ["java"],
+    "sap abap": ["sap"],
+    "sap hcm": ["sap"],
+    "power bi": ["tableau"],
+    "github": ["git"],
+}
+RELATED_WEIGHT = 1.0
+
+
+def build(skills, aliases=None):
+    aliases = {**SKILL_ALIASES, **(aliases or {})}
+    vocab = sorted({normalize_skill(s, aliases) for s in skills} | set(aliases.values()) | set(RELATED))
+    vectors = np.empty((len(vocab), EMBEDDING_DIM), dtype=np.float32)
+    for i, skill in enumerate(vocab):
+        vec = embed_skill(skill).astype(np.float32)
+        for parent in RELATED.get(skill, ()):
+            vec = vec + RELATED_WEIGHT * embed_skill(normalize_skill(parent, aliases))
+        vectors[i] = vec / np.linalg.norm(vec)
+    version = hashlib.blake2b(vectors.tobytes() + json.dumps([vocab, aliases], sort_keys=True).encode(),
+                              digest_size=6).hexdigest()
+    return {"version": version, "dim": EMBEDDING_DIM, "skills": vocab, "aliases": aliases}, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--skills", help="text file with one extra skill per line")
+    parser.add_argument("--vocab-out", default=VOCAB_PATH)
+    parser.add_argument("--vectors-out", default=VECTORS_PATH)
+    args = parser.parse_args()
+
+    skills = list(SKILL_VOCABULARY)
+    if args.skills:
+        with open(args.skills, encoding="utf-8") as f:
+            skills += [line.strip() for line in f if line.strip()]
+
+    vocab, vectors = build(skills)
+    os.makedirs(os.path.dirname(args.vectors_out), exist_ok=True)
+    with open(args.vectors_out + ".tmp", "wb") as f:
+        np.save(f, vectors)
+    with open(args.vocab_out + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(vocab, f, indent=1)
+    os.replace(args.vectors_out + ".tmp", args.vectors_out)
+    os.replace(args.vocab_out + ".tmp", args.vocab_out)
+    print(f"✅ {len(vocab['skills'])} skills ({vocab['version']}) saved to {args.vocab_out} and {args.vectors_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,134 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-import pickle
+"""
+Train the attrition model and export it as a versioned artifact.
+
+Run from the app folder:
+
+    python -m train_model.train_attrition_model                      # fixed hyperparameters
+    python -m train_model.train_attrition_model --search --jobs -1   # cross-validated grid search
+    python -m train_model.train_attrition_model --from-pickles       # re-export models/*.pkl, no training
+
+Only the nine feature columns and the label are read from the CSV, with
+explicit dtypes. The scaler is fitted inside the pipeline on the training
+split, so the held-out accuracy is honest. The result is written as
+models/attrition_model.npz + .json (coefficients, scaler mean/scale, feature
+order, metrics, data hash and parameters), which app.py loads without
+sklearn. Training is seeded, so the same CSV and options give the same
+model version. --pickles also writes the old models/*.pkl files.
+"""
+import argparse
+import datetime
+import hashlib
 import os
+import pickle
+
+from utils.attrition_predictor import (
+    ARTIFACT_PATH, ATTRITION_FEATURES, MODELS_DIR, AttritionPredictor, save_artifact, sklearn_arrays,
+)
+
+TRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(TRAIN_DIR, "WA_Fn-UseC_-HR-Employee-Attrition.csv")
+LABEL = "Attrition"
+DTYPES = {**{name: "int32" for name in ATTRITION_FEATURES}, LABEL: "category"}
+PARAM_GRID = {
+    "clf__C": [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0],
+    "clf__class_weight": [None, "balanced"],
+}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_data(csv_path):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, usecols=ATTRITION_FEATURES + [LABEL], dtype=DTYPES)
+    X = df[ATTRITION_FEATURES].to_numpy(dtype="float64")
+    y = (df[LABEL] == "Yes").to_numpy(dtype="int8")  # 1 = left the company
+    return X, y
+
+
+def train(X, y, search=False, cv=5, jobs=-1, seed=42, test_size=0.2, scoring="roc_auc"):
+    """Fit scaler + logistic regression; returns (pipeline, best params, metrics)."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
+    pipeline = Pipeline([("scaler", StandardScaler()), ("clf", LogisticRegression(max_iter=1000))])
+    metrics = {}
+    if search:
+        grid = GridSearchCV(pipeline, PARAM_GRID, scoring=scoring, n_jobs=jobs,
+                            cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed))
+        grid.fit(X_train, y_train)
+        pipeline = grid.best_estimator_
+        metrics[f"cv_{scoring}"] = float(grid.best_score_)
+    else:
+        pipeline.fit(X_train, y_train)
+
+    proba = pipeline.predict_proba(X_test)[:, 1]
+    metrics["test_accuracy"] = float(accuracy_score(y_test, pipeline.predict(X_test)))
+    metrics["test_roc_auc"] = float(roc_auc_score(y_test, proba))
+    params = {k: v for k, v in pipeline.named_steps["clf"].get_params().items() if k in ("C", "class_weight", "penalty", "solver", "max_iter")}
+    return pipeline, params, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the attrition model and export models/attrition_model.npz")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="HR attrition CSV (IBM HR Analytics columns)")
+    parser.add_argument("--out", default=ARTIFACT_PATH, help="artifact path; .npz and .json are written side by side")
+    parser.add_argument("--search", action="store_true", help="grid-search C and class_weight with stratified k-fold CV")
+    parser.add_argument("--cv", type=int, default=5, help="folds for --search (default 5)")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits for --search (default -1: all cores)")
+    parser.add_argument("--scoring", default="roc_auc", help="sklearn scorer --search optimises (default roc_auc)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pickles", action="store_true", help="also write models/attrition_model.pkl and scaler.pkl")
+    parser.add_argument("--from-pickles", action="store_true", help="export the existing pickles instead of training")
+    args = parser.parse_args(argv)
+
+    created = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    if args.from_pickles:
+        with open(os.path.join(MODELS_DIR, "attrition_model.pkl"), "rb") as f:
+            model = pickle.load(f)
+        with open(os.path.join(MODELS_DIR, "scaler.pkl"), "rb") as f:
+            scaler = pickle.load(f)
+        meta = {"created_at": created, "source": "models/attrition_model.pkl + models/scaler.pkl"}
+    else:
+        import sklearn
+
+        X, y = load_data(args.csv)
+        pipeline, params, metrics = train(X, y, search=args.search, cv=args.cv, jobs=args.jobs,
+                                          seed=args.seed, scoring=args.scoring)
+        model, scaler = pipeline.named_steps["clf"], pipeline.named_steps["scaler"]
+        meta = {
+            "created_at": created,
+            "sklearn_version": sklearn.__version__,
+            "data": {"file": os.path.basename(args.csv), "sha256": file_sha256(args.csv), "rows": int(len(y))},
+            "training": {"search": args.search, "cv": args.cv if args.search else None, "seed": args.seed, "params": params},
+            "metrics": metrics,
+        }
+        for name, value in metrics.items():
+            print(f"{name}: {value:.4f}")
+
+    meta = save_artifact(args.out, *sklearn_arrays(model, scaler), metadata=meta)
+    # read it back the way the app will
+    AttritionPredictor.from_artifact(args.out)
+    print(f"✅ Attrition model {meta['version']} saved to {args.out} (+ .json)")
+
+    if args.pickles and not args.from_pickles:
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        with open(os.path.join(MODELS_DIR, "attrition_model.pkl"), "wb") as f:
+            pickle.dump(model, f)
+        with open(os.path.join(MODELS_DIR, "scaler.pkl"), "wb") as f:
+            pickle.dump(scaler, f)
+        print("✅ Attrition model and scaler pickles saved in 'models/' folder.")
+
 
-# Load dataset (place the CSV file in the folder called 'train_model')
-df = pd.read_csv("train_model/WA_Fn-UseC_-HR-Employee-Attrition.csv")
-
-# Encode categorical variables
-label_encoders = {}
-for col in df.select_dtypes(include=["object"]).columns:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-
-# Select relevant features
-features = [
-    "Age", "JobSatisfaction", "EnvironmentSatisfaction",
-    "MonthlyIncome", "YearsAtCompany", "DistanceFromHome",
-    "WorkLifeBalance", "Education", "JobInvolvement"
-]
-X = df[features]
-y = df["Attrition"]  # Encoded as 1 = Yes, 0 = No
-
-# Scale features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-
-# Train Logistic Regression model
-model = LogisticRegression(max_iter=1000)
-model.fit(X_train, y_train)
-
-# Evaluate accuracy
-y_pred = model.predict(X_test)
-acc = accuracy_score(y_test, y_pred)
-print(f"Model Accuracy: {acc * 100:.2f}%")
-
-# Save model and scaler
-os.makedirs("models", exist_ok=True)
-with open("models/attrition_model.pkl", "wb") as f:
-    pickle.dump(model, f)
-with open("models/scaler.pkl", "wb") as f:
-    pickle.dump(scaler, f)
-
-print("✅ Attrition model and scaler saved successfully in 'models/' folder.")
+if __name__ == "__main__":
+    main()
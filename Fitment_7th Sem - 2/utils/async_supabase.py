@@ -0,0 +1,149 @@
+"""
+asyncio Supabase REST client, for the async /rank pipeline (app.run_rank_async).
+
+Wraps an existing SupabaseClient: same URL, service key, timeouts and retry
+rules, and every call is counted in that client's stats(). aiohttp is an
+optional dependency (pip install aiohttp); without it available() is False
+and callers fall back to the synchronous client.
+
+An aiohttp session belongs to the event loop it was created on, so an
+AsyncSupabaseClient must only be used from one loop; app.py keeps a single
+loop thread per process for this.
+"""
+import asyncio
+import json
+import time
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from utils.supabase_client import IDEMPOTENT_METHODS, RETRY_STATUSES
+
+
+def available():
+    return aiohttp is not None
+
+
+class AsyncSupabaseError(Exception):
+    """A call that failed for good: `status` is the HTTP status, or None for a transport error."""
+    def __init__(self, status, text):
+        super().__init__(f"Supabase request failed ({status}): {text[:200]}")
+        self.status = status
+        self.text = text
+
+
+class AsyncResponse:
+    """The parts of a requests.Response the rank code uses, with the body already read."""
+    __slots__ = ("status_code", "content")
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AsyncSupabaseError(self.status_code, self.text)
+
+
+class AsyncSupabaseClient:
+    def __init__(self, client, limit=32):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed")
+        self.client = client
+        self.limit = limit
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = self.client.timeout
+            self._session = aiohttp.ClientSession(
+                headers=self.client.headers,
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            )
+        return self._session
+
+    async def request(self, method, table, params=None, json=None, headers=None, retry=None):
+        """
+        Async SupabaseClient.request. Returns an AsyncResponse (callers check
+        status), or raises AsyncSupabaseError once retries of a transport
+        error are exhausted.
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.client.max_retries if retry else 0)
+        url = self.client.rest_url(table)
+        session = self._get_session()
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            started = time.perf_counter()
+            try:
+                async with session.request(method, url, params=params, json=json, headers=headers) as resp:
+                    content = await resp.read()
+                    status, retry_after = resp.status, resp.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.client._record(time.perf_counter() - started, failed=last)
+                if last:
+                    raise AsyncSupabaseError(None, str(e) or type(e).__name__) from e
+                await asyncio.sleep(self.client._retry_delay(attempt, None))
+                continue
+
+            failed = status >= 500 or status == 429
+            self.client._record(time.perf_counter() - started, failed=failed and last)
+            if status in RETRY_STATUSES and not last:
+                await asyncio.sleep(self.client._retry_delay(attempt, retry_after))
+                continue
+            return AsyncResponse(status, content)
+
+    async def get(self, table, params=None, **kwargs):
+        return await self.request("GET", table, params=params, **kwargs)
+
+    async def post(self, table, json=None, **kwargs):
+        return await self.request("POST", table, json=json, **kwargs)
+
+    async def iter_pages(self, table, params=None, page_size=1000, key="id"):
+        """
+        Async SupabaseClient.iter_pages, with the same page cap and the same
+        stop at the first empty page. The request for the next page goes out
+        as soon as a page arrives, so it overlaps with whatever the caller
+        does with the current one. Raises AsyncSupabaseError on a failed page.
+        Close it (contextlib.aclosing) to drop an in-flight prefetch early.
+        """
+        params = dict(params or {})
+        page_size = min(page_size, self.client.max_rows)
+
+        def fetch(last):
+            page_params = {**params, "order": f"{key}.asc", "limit": str(page_size)}
+            if last is not None:
+                page_params[key] = f"gt.{last}"
+            return asyncio.ensure_future(self.get(table, params=page_params))
+
+        pending = fetch(None)
+        try:
+            while pending is not None:
+                resp = await pending
+                pending = None
+                resp.raise_for_status()
+                rows = resp.json()
+                if not rows:
+                    return
+                pending = fetch(rows[-1][key])
+                yield rows
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,222 @@
+"""
+Attrition predictor with the StandardScaler folded into the logistic regression.
+
+    p = sigmoid(coef . (x - mean) / scale + intercept)
+      = sigmoid(x . (coef / scale) + (intercept - coef . mean / scale))
+
+so scoring a batch is one matrix-vector product. The fused arrays are
+read-only after construction, which makes a single instance safe to share
+between request threads.
+
+The model ships as a small versioned artifact written by
+train_model/train_attrition_model.py: models/attrition_model.npz (coef,
+intercept, scaler mean/scale, feature order) plus a JSON metadata file. It
+loads with numpy alone; the sklearn pickles are only a fallback.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+
+# Column order used by train_model/train_attrition_model.py
+ATTRITION_FEATURES = [
+    "Age", "JobSatisfaction", "EnvironmentSatisfaction",
+    "MonthlyIncome", "YearsAtCompany", "DistanceFromHome",
+    "WorkLifeBalance", "Education", "JobInvolvement",
+]
+# snake_case aliases accepted in Supabase profile JSON
+_SNAKE_CASE = {
+    "Age": "age", "JobSatisfaction": "job_satisfaction", "EnvironmentSatisfaction": "environment_satisfaction",
+    "MonthlyIncome": "monthly_income", "YearsAtCompany": "years_at_company", "DistanceFromHome": "distance_from_home",
+    "WorkLifeBalance": "work_life_balance", "Education": "education", "JobInvolvement": "job_involvement",
+}
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(APP_DIR, "models")
+ARTIFACT_PATH = os.getenv("ATTRITION_MODEL") or os.path.join(MODELS_DIR, "attrition_model.npz")
+ARTIFACT_FORMAT = 1
+# Fused weights derived from the pickles, so a warm start never imports sklearn
+FUSED_CACHE_PATH = os.getenv("ATTRITION_FUSED_CACHE") or os.path.join(APP_DIR, "cache", "attrition_fused.json")
+
+
+def features_from_profile(profile):
+    """The nine model features from a dict, or None if any is missing or not numeric."""
+    if not isinstance(profile, dict):
+        return None
+    row = []
+    for name in ATTRITION_FEATURES:
+        value = profile.get(name)
+        if value is None:
+            value = profile.get(_SNAKE_CASE[name])
+        try:
+            row.append(float(value))
+        except (TypeError, ValueError):
+            return None
+    return row
+
+
+def sklearn_arrays(model, scaler):
+    """(coef, intercept, mean, scale) of a fitted LogisticRegression and StandardScaler."""
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else np.zeros_like(coef)
+    scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else np.ones_like(coef)
+    return coef, float(model.intercept_[0]), mean, scale
+
+
+def _artifact_paths(path):
+    base = path[:-len(".npz")] if path.endswith(".npz") else path
+    return base + ".npz", base + ".json"
+
+
+def save_artifact(path, coef, intercept, mean, scale, feature_names=ATTRITION_FEATURES, metadata=None):
+    """
+    Write the model as `<path>.npz` (arrays only, no pickled objects) and
+    `<path>.json` (version, feature order and whatever `metadata` holds).
+    Both files are replaced atomically. Returns the metadata written.
+    """
+    npz_path, meta_path = _artifact_paths(path)
+    predictor = AttritionPredictor.from_arrays(coef, intercept, mean, scale, feature_names)
+    meta = {"format": ARTIFACT_FORMAT, "version": predictor.version,
+            "feature_names": predictor.feature_names, **(metadata or {})}
+    os.makedirs(os.path.dirname(os.path.abspath(npz_path)), exist_ok=True)
+    tmp = f"{npz_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, coef=np.asarray(coef, dtype=np.float64), intercept=np.float64(intercept),
+                 mean=np.asarray(mean, dtype=np.float64), scale=np.asarray(scale, dtype=np.float64),
+                 feature_names=np.array(predictor.feature_names))
+    os.replace(tmp, npz_path)
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, meta_path)
+    return meta
+
+
+class AttritionPredictor:
+    def __init__(self, weights, bias, feature_names=ATTRITION_FEATURES, version=None, metadata=None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.weights.setflags(write=False)
+        self.bias = float(bias)
+        self.feature_names = list(feature_names)
+        self.version = version or hashlib.sha256(self.weights.tobytes() + np.float64(self.bias).tobytes()).hexdigest()[:12]
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_arrays(cls, coef, intercept, mean, scale, feature_names=ATTRITION_FEATURES, metadata=None):
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+        weights = coef / np.asarray(scale, dtype=np.float64)
+        bias = float(intercept) - float(np.dot(weights, np.asarray(mean, dtype=np.float64)))
+        return cls(weights, bias, feature_names, metadata=metadata)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        return cls.from_arrays(*sklearn_arrays(model, scaler))
+
+    @classmethod
+    def from_artifact(cls, path=None):
+        """
+        Load a model written by save_artifact. Raises ValueError if the arrays
+        do not match the metadata's version or the features the app builds.
+        """
+        npz_path, meta_path = _artifact_paths(path or ARTIFACT_PATH)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"{meta_path}: unsupported artifact format {meta.get('format')!r}")
+        with np.load(npz_path, allow_pickle=False) as arrays:
+            feature_names = [str(n) for n in arrays["feature_names"]]
+            predictor = cls.from_arrays(arrays["coef"], arrays["intercept"], arrays["mean"], arrays["scale"],
+                                        feature_names, metadata=meta)
+        if feature_names != ATTRITION_FEATURES:
+            raise ValueError(f"{npz_path}: feature order {feature_names} does not match {ATTRITION_FEATURES}")
+        if meta.get("version") != predictor.version:
+            raise ValueError(f"{npz_path}: weights hash to {predictor.version}, metadata says {meta.get('version')}")
+        return predictor
+
+    @classmethod
+    def from_pickles(cls, model_path=None, scaler_path=None, cache_path=None):
+        """
+        Load the sklearn pickles and fuse them. Unpickling imports sklearn,
+        which dominates startup time and memory, so the fused weights are
+        cached next to a hash of both pickles and reused while they match.
+        """
+        model_path = model_path or os.path.join(MODELS_DIR, "attrition_model.pkl")
+        scaler_path = scaler_path or os.path.join(MODELS_DIR, "scaler.pkl")
+        cache_path = cache_path or FUSED_CACHE_PATH
+
+        h = hashlib.sha256()
+        for path in (model_path, scaler_path):
+            with open(path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        source = h.hexdigest()
+
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("source") == source:
+                return cls(cached["weights"], cached["bias"], cached["feature_names"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        with open(scaler_path, "rb") as f:
+            scaler = pickle.load(f)
+        predictor = cls.from_sklearn(model, scaler)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                # floats round-trip exactly through JSON, so the cached predictor is bit-identical
+                json.dump({"source": source, "weights": predictor.weights.tolist(), "bias": predictor.bias,
+                           "feature_names": predictor.feature_names}, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+        return predictor
+
+    def predict_proba(self, rows):
+        """P(attrition) for a (n, 9) batch of feature rows, as a float64 array of length n."""
+        X = np.asarray(rows, dtype=np.float64).reshape(-1, self.weights.size)
+        z = X @ self.weights + self.bias
+        # numerically stable sigmoid
+        return np.exp(-np.logaddexp(0.0, -z))
+
+    def predict_one(self, row):
+        return float(self.predict_proba([row])[0])
+
+    def predict_partial(self, rows, default=0.0):
+        """
+        Like predict_proba, but rows may be None (features unknown); those get
+        `default`. Known rows are still scored in one batch.
+        """
+        out = np.full(len(rows), default, dtype=np.float64)
+        known = [i for i, r in enumerate(rows) if r is not None]
+        if known:
+            out[known] = self.predict_proba([rows[i] for i in known])
+        return out
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def load_predictor():
+    """The model artifact (ATTRITION_MODEL) if there is one, else the sklearn pickles."""
+    if os.path.exists(_artifact_paths(ARTIFACT_PATH)[0]):
+        return AttritionPredictor.from_artifact(ARTIFACT_PATH)
+    return AttritionPredictor.from_pickles()
+
+
+def get_predictor():
+    """Process-wide predictor, loaded on first use."""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = load_predictor()
+    return _predictor
@@ -0,0 +1,162 @@
+"""
+Vectorized fitment scoring for a whole job at once.
+
+Mirrors utils.score_calculator.calculate_fitment_score, but every input is a
+column (one entry per application) so a job with tens of thousands of
+applicants is scored in a handful of NumPy passes instead of a Python loop.
+"""
+import re
+from itertools import chain
+
+import numpy as np
+
+from utils.skill_vectors import get_skill_matcher
+
+# Bump when the scoring formula changes, so cached rankings are recomputed
+SCORING_VERSION = 1
+
+# Same weights, same order of operations as calculate_fitment_score
+SKILL_WEIGHT = 0.4
+CULTURE_WEIGHT = 0.2
+GROWTH_WEIGHT = 0.25
+ATTRITION_WEIGHT = 0.15
+
+BREAKDOWN_KEYS = (
+    "Skill Match",
+    "Cultural Fit",
+    "Growth Potential",
+    "Attrition Risk (lower is better)",
+)
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def norm_list(arr):
+    return [str(x).strip().lower() for x in (arr or []) if str(x).strip()]
+
+
+def parse_experience(exp_val):
+    """Years of experience from an int or a string like "3 years" (0 if unknown)."""
+    try:
+        if isinstance(exp_val, str):
+            m = _DIGITS.search(exp_val)
+            return int(m.group(1)) if m else 0
+        return int(exp_val or 0)
+    except Exception:
+        return 0
+
+
+def pack_skill_lists(skill_lists):
+    """
+    Flatten per-candidate skill lists into CSR form.
+
+    Returns (flat, offsets): candidate i owns flat[offsets[i]:offsets[i + 1]].
+    """
+    lengths = np.fromiter((len(s) for s in skill_lists), dtype=np.int64, count=len(skill_lists))
+    offsets = np.zeros(len(skill_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = np.array(list(chain.from_iterable(skill_lists)), dtype=str)
+    return flat, offsets
+
+
+def skill_match_batch(required, flat, offsets):
+    """
+    Percentage of required skills each candidate has (0-100).
+
+    `required` is the normalized required-skill list (duplicates count in the
+    denominator, like the scalar path); `flat`/`offsets` come from
+    pack_skill_lists over normalized candidate skills.
+    """
+    n = len(offsets) - 1
+    counts = np.zeros(n, dtype=np.int64)
+    if not required or flat.size == 0:
+        return counts.astype(np.float64)
+
+    req_unique = np.unique(np.array(required, dtype=str))
+    pos = np.searchsorted(req_unique, flat)
+    pos[pos == req_unique.size] = 0
+    hit = req_unique[pos] == flat
+
+    owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    # a candidate listing the same skill twice still matches it once
+    pairs = np.unique(owner[hit] * req_unique.size + pos[hit])
+    counts += np.bincount(pairs // req_unique.size, minlength=n)
+    return (counts / max(1, len(required))) * 100.0
+
+
+def round2(values):
+    """
+    Elementwise equivalent of Python's round(x, 2).
+
+    np.round works on x * 100, which can land on the wrong side of a .5 tie;
+    values that close to a tie fall back to the builtin so the result is
+    bit-identical to the scalar calculator.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100.0
+    out = np.rint(scaled) / 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-9 + np.abs(scaled) * 1e-15
+    if near_tie.any():
+        out[near_tie] = [round(float(v), 2) for v in values[near_tie]]
+    return out
+
+
+def calculate_fitment_scores(skill_match, cultural_fit, growth_potential, attrition_prob):
+    """
+    Batch version of calculate_fitment_score.
+
+    Returns (scores, breakdown) where scores is a float64 array and breakdown
+    maps each breakdown key to a float64 array of the same length.
+    """
+    skill_match = np.asarray(skill_match, dtype=np.float64)
+    cultural_fit = np.asarray(cultural_fit, dtype=np.float64)
+    growth = np.asarray(growth_potential, dtype=np.float64)
+    attrition_prob = np.broadcast_to(np.asarray(attrition_prob, dtype=np.float64), skill_match.shape)
+    attrition_fit = 1 - attrition_prob
+
+    score = (
+        SKILL_WEIGHT * skill_match +
+        CULTURE_WEIGHT * cultural_fit +
+        GROWTH_WEIGHT * growth +
+        ATTRITION_WEIGHT * attrition_fit
+    )
+    breakdown = {
+        "Skill Match": round2(skill_match * 100),
+        "Cultural Fit": round2(cultural_fit * 100),
+        "Growth Potential": round2(growth * 100),
+        "Attrition Risk (lower is better)": round2(attrition_prob * 100),
+    }
+    return round2(score * 100), breakdown
+
+
+def breakdown_rows(breakdown):
+    """Turn a columnar breakdown back into one dict per application."""
+    columns = [breakdown[k].tolist() for k in BREAKDOWN_KEYS]
+    return [dict(zip(BREAKDOWN_KEYS, row)) for row in zip(*columns)]
+
+
+def score_profiles(required_skills, profiles, attrition_prob=0.0):
+    """
+    Score a list of flat profile dicts against one job's required skills.
+
+    Each profile uses the /score payload keys: skills, experience_years,
+    cultural_fit, growth_potential, resume_quality. Returns
+    (scores, breakdowns, columns) with plain Python floats / dicts.
+
+    Skills are compared as exact strings unless SKILL_MATCH_MODE=semantic
+    (see utils.skill_vectors).
+    """
+    req_norm = norm_list(required_skills)
+    flat, offsets = pack_skill_lists([norm_list(p.get("skills")) for p in profiles])
+    matcher = get_skill_matcher()
+    columns = {
+        "skill_match": matcher.match(req_norm, flat, offsets) if matcher else skill_match_batch(req_norm, flat, offsets),
+        "experience_years": np.array([parse_experience(p.get("experience_years")) for p in profiles], dtype=np.int64),
+        "cultural_fit": np.array([float(p.get("cultural_fit") or 0.5) for p in profiles], dtype=np.float64),
+        "growth_potential": np.array([float(p.get("growth_potential") or 0.5) for p in profiles], dtype=np.float64),
+        "resume_quality": np.array([float(p.get("resume_quality") or 0.5) for p in profiles], dtype=np.float64),
+    }
+    scores, breakdown = calculate_fitment_scores(
+        columns["skill_match"], columns["cultural_fit"], columns["growth_potential"], attrition_prob
+    )
+    return scores.tolist(), breakdown_rows(breakdown), columns
@@ -0,0 +1,194 @@
+"""
+Parallel resume parsing for bulk uploads.
+
+Resumes are parsed in a process pool per web worker process, each getting its
+share of the available cores (see default_workers). Inputs are pulled lazily and at most `max_pending` files are in flight at once, so a huge
+batch (or zip) is never extracted or queued all at once.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.resume_parser import parse_resume, save_upload
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers():
+    """
+    BULK_INGEST_WORKERS, or the available cores split between the
+    WEB_CONCURRENCY web workers that each start their own pool.
+    """
+    if os.getenv("BULK_INGEST_WORKERS"):
+        return int(os.getenv("BULK_INGEST_WORKERS"))
+    web_workers = max(1, int(os.getenv("WEB_CONCURRENCY") or 1))
+    return max(1, available_cores() // web_workers)
+
+
+DEFAULT_WORKERS = default_workers()
+DEFAULT_MAX_PENDING = int(os.getenv("BULK_INGEST_MAX_PENDING") or DEFAULT_WORKERS * 2)
+MAX_FILES = int(os.getenv("BULK_INGEST_MAX_FILES") or 1000)
+MAX_FILE_BYTES = int(os.getenv("BULK_INGEST_MAX_FILE_BYTES") or 20 * 1024 * 1024)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process-wide pool. Workers start from a fork server (or spawn) rather than
+    forking the threaded web process, which may hold locks mid-request.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=DEFAULT_WORKERS, mp_context=ctx)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def reset_pool(pool):
+    """
+    Retire a pool that a dead worker (crash, OOM kill) has broken; the next
+    get_pool() starts a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_in_worker(filepath, digest):
+    candidate = parse_resume(filepath, digest=digest)
+    # the full text is only needed for logging; don't ship it back through the pipe
+    candidate.pop("text", None)
+    return candidate
+
+
+def iter_saved_uploads(uploads, folder, max_files=None):
+    """
+    Save each staged (filename, path) upload to `folder` under its content
+    hash, expanding .zip archives member by member; a path of None marks an
+    upload that was too large to stage. Every file is capped at
+    MAX_FILE_BYTES as it is written. Yields
+    (name, filepath, digest) items for iter_parsed, or (name, None, error) for
+    entries that were rejected.
+    """
+    max_files = max_files or MAX_FILES
+    count = 0
+
+    def save(name, stream):
+        try:
+            filepath, digest = save_upload(stream, folder, name, max_bytes=MAX_FILE_BYTES)
+        except ValueError as e:
+            return name, None, str(e)
+        return name, filepath, digest
+
+    for filename, path in uploads:
+        if path is None:
+            # rejected while staging
+            yield filename, None, "file too large"
+            continue
+        if not filename.lower().endswith(".zip"):
+            count += 1
+            if count > max_files:
+                yield filename, None, f"batch limit of {max_files} files reached"
+                return
+            with open(path, "rb") as stream:
+                yield save(filename, stream)
+            continue
+
+        try:
+            archive = zipfile.ZipFile(path)
+        except zipfile.BadZipFile:
+            yield filename, None, "not a valid zip archive"
+            continue
+        with archive:
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                    continue
+                count += 1
+                if count > max_files:
+                    yield info.filename, None, f"batch limit of {max_files} files reached"
+                    return
+                if info.file_size > MAX_FILE_BYTES:
+                    yield info.filename, None, "file too large"
+                    continue
+                with archive.open(info) as member:
+                    yield save(info.filename, member)
+
+
+def iter_parsed(items, max_pending=None, pool=None):
+    """
+    Parse resumes in parallel, yielding results in completion order.
+
+    `items` is an iterable of (name, filepath, digest); an entry may instead be
+    (name, None, error_message) for files rejected before parsing, which is
+    passed straight through. Yields (name, candidate, error) with exactly one of
+    candidate / error set.
+    """
+    shared = pool is None
+    pool = pool or get_pool()
+    max_pending = max(1, max_pending or DEFAULT_MAX_PENDING)
+    pending = {}   # future -> (name, filepath, digest, attempt)
+    items = iter(items)
+    exhausted = False
+
+    def submit(name, filepath, digest, attempt=1):
+        nonlocal pool
+        try:
+            future = pool.submit(_parse_in_worker, filepath, digest)
+        except BrokenProcessPool:
+            if not shared:
+                raise
+            reset_pool(pool)
+            pool = get_pool()
+            future = pool.submit(_parse_in_worker, filepath, digest)
+        pending[future] = (name, filepath, digest, attempt)
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    name, filepath, digest = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if filepath is None:
+                    yield name, None, digest
+                    continue
+                submit(name, filepath, digest)
+
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, filepath, digest, attempt = pending.pop(future)
+                try:
+                    yield name, future.result(), None
+                except BrokenProcessPool:
+                    # a worker died and took every queued file with it; start a
+                    # fresh pool and give each of those files one more try
+                    if shared and attempt == 1:
+                        submit(name, filepath, digest, attempt=2)
+                    else:
+                        yield name, None, "parser worker crashed"
+                except Exception as e:
+                    yield name, None, f"{type(e).__name__}: {e}"
+    finally:
+        # consumer went away (e.g. client disconnected): drop queued work
+        for future in pending:
+            future.cancel()
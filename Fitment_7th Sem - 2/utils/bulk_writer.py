@@ -0,0 +1,95 @@
+"""
+Chunked PostgREST upserts.
+
+Instead of one PATCH per application, rows are sent as JSON arrays to
+POST /rest/v1/<table> with `Prefer: resolution=merge-duplicates`, so a job
+with thousands of applications costs a handful of round trips.
+"""
+import asyncio
+import os
+
+import requests
+
+from utils.async_supabase import AsyncSupabaseError
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("SUPABASE_UPSERT_CHUNK_SIZE", "500"))
+# statuses PostgREST answers for a bad row (malformed value, constraint violation); anything
+# else (auth, 5xx after the client's retries) fails every row alike, so splitting cannot help
+ROW_LEVEL_STATUSES = frozenset({400, 409, 422})
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def bulk_upsert(client, table, rows, chunk_size=None, on_conflict="id"):
+    """
+    Upsert `rows` into `table` in chunks of `chunk_size` through a SupabaseClient.
+
+    PostgREST requires every object in one request to have the same keys, so
+    callers should build rows uniformly. A chunk rejected for its rows (400,
+    409, 422) is split in half and retried until the offending rows are
+    isolated, which keeps one bad row from failing its whole chunk; any other
+    error fails the chunk once, every row with that status.
+
+    Returns {"written": <rows accepted>, "failed": [{"row", "status", "error"}, ...]}.
+    """
+    chunk_size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+    params = {"on_conflict": on_conflict} if on_conflict else None
+    upsert_headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+    result = {"written": 0, "failed": []}
+
+    def send(chunk):
+        try:
+            # merge-duplicates makes the POST safe to repeat, so let the client retry it
+            resp = client.request("POST", table, params=params, json=chunk, headers=upsert_headers, retry=bool(on_conflict))
+        except requests.RequestException as e:
+            # transport errors say nothing about individual rows; report the chunk
+            result["failed"].extend({"row": r, "status": None, "error": str(e)} for r in chunk)
+            return
+        if resp.status_code in (200, 201, 204):
+            result["written"] += len(chunk)
+        elif len(chunk) > 1 and resp.status_code in ROW_LEVEL_STATUSES:
+            mid = len(chunk) // 2
+            send(chunk[:mid])
+            send(chunk[mid:])
+        else:
+            result["failed"].extend({"row": r, "status": resp.status_code, "error": resp.text} for r in chunk)
+
+    for chunk in _chunks(list(rows), chunk_size):
+        send(chunk)
+    return result
+
+
+async def bulk_upsert_async(client, table, rows, chunk_size=None, on_conflict="id", semaphore=None):
+    """
+    bulk_upsert through an AsyncSupabaseClient. Chunks are sent concurrently,
+    at most as many at a time as `semaphore` allows (one when not given), so
+    callers can share one limit across several upserts. Rejected chunks are
+    split the same way and the return value is the same.
+    """
+    chunk_size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+    semaphore = semaphore or asyncio.Semaphore(1)
+    params = {"on_conflict": on_conflict} if on_conflict else None
+    upsert_headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+    result = {"written": 0, "failed": []}
+
+    async def send(chunk):
+        async with semaphore:
+            try:
+                resp = await client.request("POST", table, params=params, json=chunk, headers=upsert_headers, retry=bool(on_conflict))
+            except AsyncSupabaseError as e:
+                result["failed"].extend({"row": r, "status": None, "error": e.text} for r in chunk)
+                return
+        # the halves queue for the semaphore again rather than holding it while they wait
+        if resp.status_code in (200, 201, 204):
+            result["written"] += len(chunk)
+        elif len(chunk) > 1 and resp.status_code in ROW_LEVEL_STATUSES:
+            mid = len(chunk) // 2
+            await asyncio.gather(send(chunk[:mid]), send(chunk[mid:]))
+        else:
+            result["failed"].extend({"row": r, "status": resp.status_code, "error": resp.text} for r in chunk)
+
+    await asyncio.gather(*(send(chunk) for chunk in _chunks(list(rows), chunk_size)))
+    return result
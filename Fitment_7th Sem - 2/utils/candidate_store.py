@@ -0,0 +1,858 @@
+"""
+Columnar in-memory candidate store, for ranking without per-row dicts.
+
+Every column is one NumPy array with a row per candidate, rows sorted by id:
+
+    ids                          fixed-width UTF-8 bytes (binary-searched)
+    name_* / email_*             UTF-8 blob + int64 offsets
+    skill_ids / skill_offsets    CSR: the interned skill ids of row i are
+                                 skill_ids[skill_offsets[i]:skill_offsets[i + 1]]
+                                 (canonical names, de-duplicated; `skills` maps id -> name)
+    experience                   int32 years
+    cultural_fit, growth_potential, resume_quality    float32
+    attrition_features           float32 (n, 9); has_features marks rows that have them
+
+That is a couple of hundred bytes per candidate instead of several KB of
+nested dicts, so millions fit in one worker, and when the store is loaded
+before gunicorn forks the arrays are shared by every worker. score() ranks
+straight off the columns with the same formula, skill matching and attrition
+model as /rank, except that skills are stored and looked up by canonical
+name (normalize_skill), so "k8s" and "kubernetes" are one skill even in
+exact mode, as they are to /match/jd's extracted requirements. Floats are
+widened back by rounding to 6 decimals, which restores any value with up
+to 6 decimals exactly.
+
+Build it from the candidates table (from_supabase), a local .npz (save /
+load) or Parquet (save_parquet / from_parquet, needs pyarrow). The served
+store stays current through upsert_candidates (/score), STORE_ROWS (the
+Supabase webhook) and a periodic re-snapshot; changes are layered on it
+(DeltaStore) and compacted in periodically, see get_candidate_store.
+To snapshot Supabase to a file, run from the app folder:
+
+    python -m utils.candidate_store --out cache/candidates.npz
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.attrition_predictor import ATTRITION_FEATURES, features_from_profile
+from utils.batch_scorer import calculate_fitment_scores, norm_list, parse_experience
+from utils.skill_index import candidate_skills
+from utils.skill_vectors import get_skill_matcher, normalize_skill
+
+log = logging.getLogger(__name__)
+
+# 2: skills stored by canonical name
+STORE_FORMAT = 2
+STORE_PATH = os.getenv("CANDIDATE_STORE")
+STORE_TTL = float(os.getenv("CANDIDATE_STORE_TTL", "3600"))
+# changed rows layered on the store (DeltaStore) before they are compacted into it
+STORE_COMPACT_ROWS = int(os.getenv("CANDIDATE_STORE_COMPACT_ROWS", "10000"))
+
+COLUMNS = (
+    "ids", "name_blob", "name_offsets", "email_blob", "email_offsets", "skill_ids", "skill_offsets",
+    "experience", "cultural_fit", "growth_potential", "resume_quality", "attrition_features", "has_features",
+)
+# rows scored per pass over the skill columns, to bound temporaries
+_CHUNK = 1 << 16
+
+
+def scoring_profile(candidate):
+    """Flatten a `candidates` row (embedded or not) into the profile keys score_profiles expects."""
+    profile = candidate.get("profile", {}) if isinstance(candidate.get("profile"), dict) else {}
+    return {
+        # the skill index's normaliser, so a comma separated skills_text is split the same way everywhere
+        "skills": candidate_skills(profile) or candidate_skills(candidate),
+        "experience_years": profile.get("experience_years") or profile.get("experience") or candidate.get("experience") or 0,
+        "cultural_fit": float(profile.get("cultural_fit") or 0.5),
+        "growth_potential": float(profile.get("growth_potential") or 0.5),
+        "resume_quality": float(profile.get("resume_quality") or 0.5),
+        "attrition_features": features_from_profile(profile) or features_from_profile(candidate),
+    }
+
+
+def canonical_skills(skills):
+    """norm_list with aliases resolved: the spelling the store keeps and looks skills up by."""
+    return [normalize_skill(s) for s in norm_list(skills)]
+
+
+def _pack_strings(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _widen(values):
+    """float32 column -> float64, exact for values written with up to 6 decimals."""
+    return np.rint(values.astype(np.float64) * 1e6) / 1e6
+
+
+def _segment_max(values, offsets):
+    """Max of values[offsets[i]:offsets[i + 1]] per segment, 0 for empty ones."""
+    starts = offsets[:-1]
+    padded = np.append(values, values.dtype.type(0))
+    out = np.maximum.reduceat(padded, starts)
+    out[starts == offsets[1:]] = 0
+    return out
+
+
+def _take_segments(values, offsets, rows):
+    """CSR (values, offsets) of just `rows`, in that order; works for the skill lists and the string blobs alike."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    out = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=out[1:])
+    index = np.repeat(starts - out[:-1], lengths) + np.arange(out[-1])
+    return values[index], out
+
+
+def _concat_segments(parts):
+    """Stack CSR (values, offsets) pairs into one."""
+    values = np.concatenate([v for v, _ in parts])
+    lengths = np.concatenate([np.diff(o) for _, o in parts])
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return values, offsets
+
+
+class CandidateStore:
+    def __init__(self, columns, skills, meta=None):
+        for name in COLUMNS:
+            column = np.asarray(columns[name])
+            if column.flags.writeable:
+                column.setflags(write=False)
+            setattr(self, name, column)
+        self.skills = np.array(skills, dtype=object)
+        self.meta = meta or {}
+        self._attrition = (None, None)  # (model version, probabilities)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    # --- building and persistence ----------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows, meta=None):
+        """Build from `candidates` rows (dicts as PostgREST returns them); a repeated id keeps its last row."""
+        vocab = {}
+        records = {}
+        for row in rows:
+            if row.get("id") is None:
+                continue
+            p = scoring_profile(row)
+            records[str(row["id"])] = (
+                str(row.get("display_name") or ""), str(row.get("email") or ""),
+                sorted({vocab.setdefault(s, len(vocab)) for s in canonical_skills(p["skills"])}),
+                parse_experience(p["experience_years"]),
+                p["cultural_fit"], p["growth_potential"], p["resume_quality"], p["attrition_features"],
+            )
+        ids = sorted(records)
+        n = len(ids)
+        # number skills alphabetically so the same data always gives the same arrays
+        skills = sorted(vocab)
+        renumber = np.empty(len(vocab), dtype=np.int32)
+        renumber[[vocab[s] for s in skills]] = np.arange(len(skills), dtype=np.int32)
+
+        columns = {
+            "ids": np.array([i.encode("utf-8") for i in ids], dtype=bytes) if n else np.array([], dtype="S1"),
+            "skill_offsets": np.zeros(n + 1, dtype=np.int64),
+            "experience": np.empty(n, dtype=np.int32),
+            "cultural_fit": np.empty(n, dtype=np.float32),
+            "growth_potential": np.empty(n, dtype=np.float32),
+            "resume_quality": np.empty(n, dtype=np.float32),
+            "attrition_features": np.zeros((n, len(ATTRITION_FEATURES)), dtype=np.float32),
+            "has_features": np.zeros(n, dtype=bool),
+        }
+        names, emails, skill_lists = [], [], []
+        for i, cid in enumerate(ids):
+            name, email, skill_ids, exp, cf, gp, rq, features = records[cid]
+            names.append(name)
+            emails.append(email)
+            skill_lists.append(skill_ids)
+            columns["experience"][i] = exp
+            columns["cultural_fit"][i], columns["growth_potential"][i], columns["resume_quality"][i] = cf, gp, rq
+            if features is not None:
+                columns["attrition_features"][i] = features
+                columns["has_features"][i] = True
+        np.cumsum([len(s) for s in skill_lists], out=columns["skill_offsets"][1:])
+        flat = np.fromiter((s for lst in skill_lists for s in lst), dtype=np.int32, count=int(columns["skill_offsets"][-1]))
+        columns["skill_ids"] = renumber[flat] if flat.size else flat
+        columns["name_blob"], columns["name_offsets"] = _pack_strings(names)
+        columns["email_blob"], columns["email_offsets"] = _pack_strings(emails)
+        return cls(columns, skills, meta)
+
+    def with_changes(self, rows=(), removed=()):
+        """
+        This store with `rows` (candidates rows, or {"id", "profile"} as
+        /score sees them) upserted and the ids in `removed` dropped, as a
+        DeltaStore over it: nothing here is copied and readers holding this
+        store are unaffected.
+        """
+        return DeltaStore(self).with_changes(rows, removed)
+
+    def compact(self):
+        return self
+
+    @classmethod
+    def from_supabase(cls, client, page_size=1000):
+        """Snapshot the whole candidates table, one keyset page at a time."""
+        rows = (row for page in client.iter_pages("candidates", {"select": "*"}, page_size=page_size) for row in page)
+        return cls.from_rows(rows, meta={"source": "supabase", "created_at": _now()})
+
+    def save(self, path):
+        """Write an .npz (arrays only, no pickles); replaced atomically."""
+        meta = {**self.meta, "format": STORE_FORMAT}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.savez(f, skills=np.array(self.skills.tolist(), dtype=str), meta=np.array(json.dumps(meta)),
+                     **{name: getattr(self, name) for name in COLUMNS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format") != STORE_FORMAT:
+                raise ValueError(f"{path}: unsupported candidate store format {meta.get('format')!r}")
+            return cls({name: data[name] for name in COLUMNS}, data["skills"].tolist(), meta)
+
+    def save_parquet(self, path):
+        """One row per candidate: id, display_name, email, skills (list), experience, floats, attrition_features (list or null)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        n = len(self)
+        features = pa.FixedSizeListArray.from_arrays(self.attrition_features.ravel(), len(ATTRITION_FEATURES))
+        table = pa.table({
+            "id": [self.candidate_id(i) for i in range(n)],
+            "display_name": [self.display_name(i) for i in range(n)],
+            "email": [self.email(i) for i in range(n)],
+            "skills": pa.ListArray.from_arrays(pa.array(self.skill_offsets.astype(np.int32)),
+                                               pa.array(self.skills[self.skill_ids].tolist(), type=pa.string())),
+            "experience": self.experience,
+            "cultural_fit": self.cultural_fit,
+            "growth_potential": self.growth_potential,
+            "resume_quality": self.resume_quality,
+            "attrition_features": pa.ListArray.from_arrays(
+                pa.array(np.arange(n + 1, dtype=np.int32) * len(ATTRITION_FEATURES)), features.flatten(),
+                mask=pa.array(~self.has_features)),
+        })
+        meta = {"fitment": json.dumps({**self.meta, "format": STORE_FORMAT})}
+        pq.write_table(table.replace_schema_metadata(meta), path)
+
+    @classmethod
+    def from_parquet(cls, path):
+        """Load a file written by save_parquet (needs pyarrow)."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(b"fitment", b"{}"))
+        if meta.get("format") != STORE_FORMAT:
+            raise ValueError(f"{path}: unsupported candidate store format {meta.get('format')!r}")
+        ids = table.column("id").to_pylist()
+        order = np.argsort(np.array([i.encode("utf-8") for i in ids], dtype=bytes), kind="stable")
+        table = table.take(pa.array(order, type=pa.int64()))
+
+        skills_col = table.column("skills").combine_chunks()
+        values = skills_col.flatten()
+        vocab = pc.unique(values).sort()
+        features_col = table.column("attrition_features").combine_chunks()
+        has_features = ~np.asarray(features_col.is_null().to_numpy(zero_copy_only=False), dtype=bool)
+        attrition = np.zeros((len(table), len(ATTRITION_FEATURES)), dtype=np.float32)
+        flat_features = features_col.flatten().to_numpy(zero_copy_only=False).astype(np.float32)
+        attrition[has_features] = flat_features.reshape(-1, len(ATTRITION_FEATURES))
+
+        columns = {
+            "ids": np.array([i.encode("utf-8") for i in table.column("id").to_pylist()], dtype=bytes),
+            "skill_ids": pc.index_in(values, value_set=vocab).to_numpy(zero_copy_only=False).astype(np.int32),
+            "skill_offsets": skills_col.offsets.to_numpy().astype(np.int64),
+            "experience": table.column("experience").to_numpy().astype(np.int32),
+            "cultural_fit": table.column("cultural_fit").to_numpy().astype(np.float32),
+            "growth_potential": table.column("growth_potential").to_numpy().astype(np.float32),
+            "resume_quality": table.column("resume_quality").to_numpy().astype(np.float32),
+            "attrition_features": attrition,
+            "has_features": has_features,
+        }
+        columns["name_blob"], columns["name_offsets"] = _pack_strings(table.column("display_name").to_pylist())
+        columns["email_blob"], columns["email_offsets"] = _pack_strings(table.column("email").to_pylist())
+        return cls(columns, vocab.to_pylist(), meta)
+
+    # --- lookups -----------------------------------------------------------
+
+    def candidate_id(self, row):
+        return self.ids[row].decode("utf-8")
+
+    def display_name(self, row):
+        return self.name_blob[self.name_offsets[row]:self.name_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def email(self, row):
+        return self.email_blob[self.email_offsets[row]:self.email_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def rows_for(self, candidate_ids):
+        """Row numbers of the given candidate ids, in the order given; ids not in the store are skipped."""
+        pos = self._positions(candidate_ids)
+        return pos[pos >= 0]
+
+    def _positions(self, candidate_ids):
+        """Row number of each candidate id, -1 where it is not in the store."""
+        width = self.ids.dtype.itemsize
+        keys = [str(c).encode("utf-8") for c in candidate_ids]
+        out = np.full(len(keys), -1, dtype=np.int64)
+        fits = np.flatnonzero([len(k) <= width for k in keys]) if len(self) else np.zeros(0, dtype=np.int64)
+        if fits.size:
+            wanted = np.array([keys[i] for i in fits], dtype=self.ids.dtype)
+            pos = np.searchsorted(self.ids, wanted).clip(0, len(self) - 1)
+            found = self.ids[pos] == wanted
+            out[fits[found]] = pos[found]
+        return out
+
+    def _skills_of(self, rows):
+        """CSR (skill_ids, offsets) of the given rows, or of every row."""
+        if rows is None:
+            return self.skill_ids, self.skill_offsets
+        return _take_segments(self.skill_ids, self.skill_offsets, rows)
+
+    # --- scoring -----------------------------------------------------------
+
+    def _skill_credit(self, req_unique):
+        """(R, len(skills)) credit of each stored skill towards each required skill, or (1, len(skills)) in exact mode."""
+        matcher = get_skill_matcher()
+        if matcher is None:
+            # each stored skill equals at most one required skill, so credit simply adds up
+            return np.isin(self.skills, req_unique).astype(np.float64)[None, :]
+        return np.hstack([matcher.similarities(req_unique, self.skills[i:i + _CHUNK].tolist())
+                          for i in range(0, len(self.skills), _CHUNK)])
+
+    def skill_match(self, required_skills, rows=None, credit=None):
+        """
+        Same 0-100 skill match as batch_scorer.score_profiles, on canonical
+        skill names, for every row (or `rows`). Pass `credit` (from
+        _skill_credit) to reuse it across calls.
+        """
+        req_norm = canonical_skills(required_skills)
+        flat, offsets = self._skills_of(rows)
+        n = len(offsets) - 1
+        if not req_norm or flat.size == 0:
+            return np.zeros(n, dtype=np.float64)
+        if credit is None:
+            credit = self._skill_credit(sorted(set(req_norm)))
+
+        total = np.zeros(n, dtype=np.float64)
+        for start in range(0, n, _CHUNK):
+            stop = min(n, start + _CHUNK)
+            lo, hi = offsets[start], offsets[stop]
+            chunk_offsets = offsets[start:stop + 1] - lo
+            chunk = flat[lo:hi]
+            if get_skill_matcher() is None:
+                hits = np.add.reduceat(np.append(credit[0][chunk], 0.0), chunk_offsets[:-1])
+                hits[chunk_offsets[:-1] == chunk_offsets[1:]] = 0.0
+                total[start:stop] = hits
+            else:
+                # best credit per required skill, summed over required skills (as SkillVectors.match does)
+                for r in range(credit.shape[0]):
+                    total[start:stop] += _segment_max(credit[r][chunk], chunk_offsets).astype(np.float64)
+        return (total / max(1, len(req_norm))) * 100.0
+
+    def attrition(self, predictor):
+        """P(attrition) per row under `predictor`, 0 where the features are unknown; computed once per model version."""
+        with self._lock:
+            version, probs = self._attrition
+            if version != predictor.version:
+                probs = np.zeros(len(self), dtype=np.float64)
+                known = np.flatnonzero(self.has_features)
+                for i in range(0, known.size, _CHUNK):
+                    rows = known[i:i + _CHUNK]
+                    probs[rows] = predictor.predict_proba(_widen(self.attrition_features[rows]))
+                probs.setflags(write=False)
+                self._attrition = (predictor.version, probs)
+            return probs
+
+    def score(self, required_skills, predictor, rows=None, credit=None):
+        """Fitment scores of every row (or `rows`): (scores, breakdown) as calculate_fitment_scores returns them."""
+        select = slice(None) if rows is None else rows
+        return calculate_fitment_scores(
+            self.skill_match(required_skills, rows, credit),
+            _widen(self.cultural_fit[select]), _widen(self.growth_potential[select]),
+            self.attrition(predictor)[select],
+        )
+
+    def top(self, required_skills, predictor, k=50, rows=None):
+        """
+        The `k` best candidates as [(row, fitment_score, sub_scores)], best
+        first; ties go to the lower row (candidate id) order.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if k <= 0 or rows.size == 0:
+            return []
+        scores, breakdown = self.score(required_skills, predictor, rows)
+        keep = np.arange(rows.size)
+        if rows.size > k:
+            # everything that can make the top k, ties at the cut included
+            cut = np.partition(scores, rows.size - k)[rows.size - k]
+            keep = np.flatnonzero(scores >= cut)
+        keep = keep[np.lexsort((rows[keep], -scores[keep]))][:k]
+        return [(int(rows[i]), float(scores[i]), {key: float(col[i]) for key, col in breakdown.items()}) for i in keep]
+
+    def iter_top(self, required_skills, predictor, k=10, rows=None, min_experience=0, first_chunk=256):
+        """
+        Best-first search for the `k` best candidates with at least
+        `min_experience` years. Yields (top, stats) each time the top k
+        improves, then once more with stats["done"] True; `top` is as top()
+        returns it.
+
+        Each candidate's fitment is bounded from above without matching skills:
+        skill match can be no better than full credit for as many required
+        skills as the candidate lists (semantic mode: each required skill
+        earns at most the best credit any of the candidate's own skills gets
+        towards any required skill), and the other terms are exact.
+        Candidates are scored in chunks of the highest bounds still pending
+        (chunks doubling from `first_chunk`, so the first results come
+        quickly), and the search stops once the k-th best score beats every
+        remaining bound. Ties go to the lower row, as in top().
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        stats = {"candidates": int(rows.size), "filtered": 0, "scored": 0, "skipped": 0, "done": False}
+        if min_experience:
+            eligible = self.experience[rows] >= min_experience
+            stats["filtered"] = int(rows.size - eligible.sum())
+            rows = rows[eligible]
+
+        req_norm = canonical_skills(required_skills)
+        req_unique = sorted(set(req_norm))
+        credit = self._skill_credit(req_unique) if req_norm else None
+        if credit is None:
+            best = np.zeros(rows.size)
+        elif get_skill_matcher() is None:
+            counts = self.skill_offsets[rows + 1] - self.skill_offsets[rows]
+            best = np.minimum(counts, len(req_unique)).astype(np.float64)
+        else:
+            # one pass over the skill column instead of one per required skill; a stored skill
+            # may earn credit towards several required skills, so each is capped separately.
+            # Summed in the same order as skill_match, so the bound is never below it
+            flat, offsets = self._skills_of(rows)
+            own_best = _segment_max(credit.max(axis=0)[flat], offsets).astype(np.float64) if rows.size else np.zeros(0)
+            best = np.zeros(rows.size)
+            for r in range(credit.shape[0]):
+                best += np.minimum(np.float64(credit[r].max(initial=0)), own_best)
+        best_skill = best / max(1, len(req_norm)) * 100.0
+        bounds, _ = calculate_fitment_scores(
+            best_skill, _widen(self.cultural_fit[rows]), _widen(self.growth_potential[rows]),
+            self.attrition(predictor)[rows],
+        )
+
+        top_rows = np.empty(0, dtype=np.int64)
+        top_scores = np.empty(0, dtype=np.float64)
+        top = []
+        size = max(1, first_chunk)
+        while rows.size and k > 0:
+            if top_rows.size == k and top_scores[-1] > bounds.max():
+                break
+            # the `size` highest bounds still pending, partitioned out rather than fully sorted
+            if size < rows.size:
+                pick = np.argpartition(-bounds, size - 1)[:size]
+                pending = np.ones(rows.size, dtype=bool)
+                pending[pick] = False
+                chunk, rows, bounds = rows[pick], rows[pending], bounds[pending]
+            else:
+                chunk, rows, bounds = rows, rows[:0], bounds[:0]
+            scores, breakdown = self.score(required_skills, predictor, chunk, credit)
+            stats["scored"] += int(chunk.size)
+            size *= 2
+
+            merged_rows = np.concatenate([top_rows, chunk])
+            merged_scores = np.concatenate([top_scores, scores])
+            keep = np.lexsort((merged_rows, -merged_scores))[:k]
+            if np.array_equal(merged_rows[keep], top_rows):
+                continue
+            known = {row: entry for row, entry in zip(top_rows.tolist(), top)}
+            top = []
+            for i in keep:
+                row = int(merged_rows[i])
+                if row in known:
+                    top.append(known[row])
+                else:
+                    j = i - top_rows.size
+                    top.append((row, float(scores[j]), {key: float(col[j]) for key, col in breakdown.items()}))
+            top_rows, top_scores = merged_rows[keep], merged_scores[keep]
+            yield top, dict(stats)
+
+        stats["skipped"] = int(rows.size)
+        stats["done"] = True
+        yield top, stats
+
+
+def _merge(parts, meta):
+    """One CandidateStore of the given (store, rows) parts, whose ids must not overlap."""
+    skills = sorted(set().union(*(store.skills.tolist() for store, _ in parts)))
+    index = {s: i for i, s in enumerate(skills)}
+    skill_parts = []
+    for store, part_rows in parts:
+        flat, offsets = _take_segments(store.skill_ids, store.skill_offsets, part_rows)
+        renumber = np.array([index[s] for s in store.skills.tolist()], dtype=np.int32)
+        skill_parts.append((renumber[flat] if flat.size else flat.astype(np.int32), offsets))
+
+    ids = np.concatenate([store.ids[part_rows] for store, part_rows in parts])
+    order = np.argsort(ids, kind="stable")
+    columns = {"ids": ids[order]}
+    for name in ("experience", "cultural_fit", "growth_potential", "resume_quality", "attrition_features", "has_features"):
+        columns[name] = np.concatenate([getattr(store, name)[part_rows] for store, part_rows in parts])[order]
+    columns["skill_ids"], columns["skill_offsets"] = _take_segments(*_concat_segments(skill_parts), order)
+    for blob in ("name", "email"):
+        merged = _concat_segments([
+            _take_segments(getattr(store, f"{blob}_blob"), getattr(store, f"{blob}_offsets"), part_rows)
+            for store, part_rows in parts])
+        columns[f"{blob}_blob"], columns[f"{blob}_offsets"] = _take_segments(*merged, order)
+    return CandidateStore(columns, skills, meta)
+
+
+class DeltaStore:
+    """
+    A CandidateStore (`base`) with changes layered on instead of copied in:
+    upserted rows live in a small `tail` store and the base rows they
+    replace, or that were removed, are masked out by `dead`. Row numbers
+    below len(base) are base rows, the rest tail rows. rows_for, top and
+    iter_top answer exactly as compact() would, ties included, and the base
+    keeps its attrition probabilities across writes. A write costs the size
+    of the tail, not of the store; get_candidate_store compacts the tail
+    into a new base in the background once it passes STORE_COMPACT_ROWS.
+    """
+
+    def __init__(self, base, tail=None, dead=None, removed=0, meta=None):
+        self.base = base
+        self.tail = tail if tail is not None else CandidateStore.from_rows([])
+        self.dead = dead if dead is not None else np.zeros(len(base), dtype=bool)
+        self.removed = removed  # dead.sum()
+        self.meta = meta or base.meta
+
+    def __len__(self):
+        return len(self.base) - self.removed + len(self.tail)
+
+    @property
+    def delta_rows(self):
+        """Rows layered on the base: the tail and the masked-out base rows."""
+        return len(self.tail) + self.removed
+
+    @property
+    def skills(self):
+        return np.union1d(self.base.skills, self.tail.skills)
+
+    @property
+    def nbytes(self):
+        return self.base.nbytes + self.tail.nbytes + self.dead.nbytes
+
+    def with_changes(self, rows=(), removed=()):
+        """As CandidateStore.with_changes; only the tail is rebuilt. A row without display_name / email keeps the stored one."""
+        rows = [dict(row) for row in rows if row.get("id") is not None]
+        for row in rows:
+            if not (row.get("display_name") and row.get("email")):
+                found = self.rows_for([row["id"]])
+                if len(found):
+                    row.setdefault("display_name", self.display_name(found[0]))
+                    row.setdefault("email", self.email(found[0]))
+        fresh = CandidateStore.from_rows(rows)
+        gone = [*map(str, removed), *(fresh.candidate_id(i) for i in range(len(fresh)))]
+
+        hit = np.unique(self.base.rows_for(gone))
+        hit = hit[~self.dead[hit]]
+        dead = self.dead
+        if hit.size:
+            dead = dead.copy()
+            dead[hit] = True
+        keep = np.ones(len(self.tail), dtype=bool)
+        keep[self.tail.rows_for(gone)] = False
+        meta = {**self.meta, "updated_at": _now()}
+        tail = _merge([(self.tail, np.flatnonzero(keep)), (fresh, np.arange(len(fresh)))], meta)
+        return DeltaStore(self.base, tail, dead, self.removed + int(hit.size), meta)
+
+    def compact(self):
+        """The same candidates as one CandidateStore."""
+        return _merge([(self.base, np.flatnonzero(~self.dead)), (self.tail, np.arange(len(self.tail)))], self.meta)
+
+    # --- lookups -----------------------------------------------------------
+
+    def _locate(self, row):
+        if row < len(self.base):
+            return self.base, row
+        return self.tail, row - len(self.base)
+
+    def candidate_id(self, row):
+        store, row = self._locate(row)
+        return store.candidate_id(row)
+
+    def display_name(self, row):
+        store, row = self._locate(row)
+        return store.display_name(row)
+
+    def email(self, row):
+        store, row = self._locate(row)
+        return store.email(row)
+
+    def rows_for(self, candidate_ids):
+        ids = [str(c) for c in candidate_ids]
+        in_tail = self.tail._positions(ids)
+        in_base = self.base._positions(ids)
+        in_base[(in_base >= 0) & self.dead[in_base.clip(0)]] = -1
+        rows = np.where(in_tail >= 0, in_tail + len(self.base), in_base)
+        return rows[rows >= 0]
+
+    # --- scoring -----------------------------------------------------------
+
+    def _split(self, rows):
+        """(base rows, tail rows) of `rows`, or of every live row."""
+        nb = len(self.base)
+        if rows is None:
+            return (np.flatnonzero(~self.dead) if self.removed else None), None
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows[rows < nb], rows[rows >= nb] - nb
+
+    def _best(self, entries, k):
+        """The best k of top() entries, ties to the lower candidate id as in a compacted store."""
+        def key(entry):
+            store, row = self._locate(entry[0])
+            return -entry[1], store.ids[row]
+        return sorted(entries, key=key)[:k]
+
+    def _shift(self, entries):
+        return [(row + len(self.base), score, breakdown) for row, score, breakdown in entries]
+
+    def top(self, required_skills, predictor, k=50, rows=None):
+        base_rows, tail_rows = self._split(rows)
+        return self._best([*self.base.top(required_skills, predictor, k, base_rows),
+                           *self._shift(self.tail.top(required_skills, predictor, k, tail_rows))], k)
+
+    def iter_top(self, required_skills, predictor, k=10, rows=None, min_experience=0, first_chunk=256):
+        """As CandidateStore.iter_top: the (small) tail is searched in full first, then merged into every base result."""
+        base_rows, tail_rows = self._split(rows)
+        for tail_top, tail_stats in self.tail.iter_top(required_skills, predictor, k, tail_rows, min_experience, first_chunk):
+            pass
+        tail_top = self._shift(tail_top)
+        shown = None
+        for top, stats in self.base.iter_top(required_skills, predictor, k, base_rows, min_experience, first_chunk):
+            top = self._best([*top, *tail_top], k)
+            stats = {key: value if key == "done" else value + tail_stats[key] for key, value in stats.items()}
+            if stats["done"] or [entry[0] for entry in top] != shown:
+                shown = [entry[0] for entry in top]
+                yield top, stats
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+def load_store(path):
+    if path.endswith(".parquet"):
+        return CandidateStore.from_parquet(path)
+    return CandidateStore.load(path)
+
+
+_store = None
+_store_lock = threading.Lock()
+_store_loaded_at = 0.0
+# candidate id -> latest row, or None once deleted; folded into the store on the next read
+_pending = {}
+# ids changed in Supabase (possibly by another worker's webhook), re-read on the next read with a client
+_stale = set()
+# changes seen while a refresh or a compaction builds a new store, replayed onto it
+_journal = None
+
+
+def _apply(store, changes):
+    if not changes:
+        return store
+    rows = [row for row in changes.values() if row is not None]
+    removed = [cid for cid, row in changes.items() if row is None]
+    return store.with_changes(rows, removed)
+
+
+def _record(changes):
+    with _store_lock:
+        # nothing to keep current until a store exists; loading it picks the rows up anyway
+        if _store is None:
+            return
+        _pending.update(changes)
+        if _journal is not None:
+            _journal.update(changes)
+
+
+def upsert_candidates(rows):
+    """Fold new or edited candidates rows (or {"id", "profile"} as /score gets them) into this worker's store."""
+    _record({str(row["id"]): row for row in rows if row.get("id") is not None})
+
+
+class StoreRows:
+    """
+    The store as an InvalidationLog (utils.ttl_cache) cache: publishing a
+    candidate id marks that row stale in every worker, and the next
+    get_candidate_store(client) re-reads it from Supabase (or drops it if
+    the row is gone). Publishing without a key empties the store.
+    """
+    name = "candidate_store"
+
+    def invalidate(self, key):
+        with _store_lock:
+            if _store is None:
+                return 0
+            _stale.add(str(key))
+            return 1
+
+    def clear(self):
+        global _store, _journal
+        with _store_lock:
+            if _store is None:
+                return 0
+            dropped = len(_store)
+            _store = CandidateStore.from_rows([], meta={**_store.meta, "updated_at": _now()})
+            _pending.clear()
+            _stale.clear()
+            # a refresh or compaction still running was built from the rows just dropped
+            _journal = None
+            return dropped
+
+
+STORE_ROWS = StoreRows()
+
+
+def _fetch_stale(client):
+    with _store_lock:
+        ids = sorted(_stale)
+        _stale.clear()
+    if not ids:
+        return
+    try:
+        rows = client.select_in("candidates", ids)
+    except Exception:
+        log.warning("Could not re-read %d changed candidates; retrying on the next read", len(ids), exc_info=True)
+        with _store_lock:
+            _stale.update(ids)
+        return
+    changes = {cid: None for cid in ids}
+    changes.update((str(row["id"]), row) for row in rows if row.get("id") is not None)
+    _record(changes)
+
+
+def _swap_in(fresh, journal):
+    """Under _store_lock: serve `fresh` with every change recorded in `journal` since it was opened."""
+    global _store, _journal
+    if _journal is not journal:
+        return False  # emptied meanwhile (StoreRows.clear)
+    if fresh is not None:
+        _store = _apply(fresh, {**journal, **_pending})
+        _pending.clear()
+    _journal = None
+    return fresh is not None
+
+
+def _refresh(client, journal):
+    global _store_loaded_at
+    try:
+        fresh = CandidateStore.from_supabase(client)
+    except Exception:
+        log.exception("Candidate store refresh failed; keeping the current snapshot")
+        fresh = None
+    with _store_lock:
+        _store_loaded_at = time.monotonic()
+        if _swap_in(fresh, journal):
+            log.info("Candidate store refreshed: %d candidates", len(_store))
+
+
+def _compact(store, journal):
+    try:
+        fresh = store.compact()
+    except Exception:
+        log.exception("Candidate store compaction failed; keeping the changes layered")
+        fresh = None
+    with _store_lock:
+        _swap_in(fresh, journal)
+
+
+def get_candidate_store(client=None):
+    """
+    The process-wide store: loaded from CANDIDATE_STORE (.npz or .parquet)
+    if set, otherwise snapshotted from the candidates table through `client`
+    on first use. None while neither is available.
+
+    Rows passed to upsert_candidates are folded in on the next call, and
+    given a client so are rows published stale through STORE_ROWS. They are
+    layered on the store (DeltaStore) rather than copied in, and compacted
+    into it in the background once CANDIDATE_STORE_COMPACT_ROWS of them
+    pile up (0 turns that off). Given a client the store is also
+    re-snapshotted in the background every CANDIDATE_STORE_TTL seconds (0
+    turns that off), for writes no webhook reported. Either way the current
+    store keeps serving meanwhile.
+    """
+    global _store, _store_loaded_at, _journal
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if STORE_PATH:
+                    _store = load_store(STORE_PATH)
+                elif client is not None:
+                    _store = CandidateStore.from_supabase(client)
+                if _store is not None:
+                    _store_loaded_at = time.monotonic()
+                    log.info("Candidate store: %d candidates, %d skills, %.1f MB",
+                             len(_store), len(_store.skills), _store.nbytes / 1e6)
+    if _store is None:
+        return None
+    if client is not None and _stale:
+        _fetch_stale(client)
+    with _store_lock:
+        if _pending:
+            _store = _apply(_store, _pending)
+            _pending.clear()
+        if _journal is None:
+            if client is not None and STORE_TTL > 0 and time.monotonic() - _store_loaded_at > STORE_TTL:
+                _journal = {}
+                threading.Thread(target=_refresh, args=(client, _journal), name="candidate-store-refresh",
+                                 daemon=True).start()
+            elif isinstance(_store, DeltaStore) and 0 < STORE_COMPACT_ROWS <= _store.delta_rows:
+                _journal = {}
+                threading.Thread(target=_compact, args=(_store, _journal), name="candidate-store-compact",
+                                 daemon=True).start()
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot candidates into a columnar store file")
+    parser.add_argument("--out", required=True, help="output file, .npz or .parquet")
+    parser.add_argument("--from", dest="source", help="convert this .npz / .parquet instead of reading Supabase")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        store = load_store(args.source)
+    else:
+        from utils.supabase_client import get_client
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        client = get_client()
+        if client is None:
+            parser.error("SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY are not set")
+        store = CandidateStore.from_supabase(client)
+    if args.out.endswith(".parquet"):
+        store.save_parquet(args.out)
+    else:
+        store.save(args.out)
+    print(f"✅ {len(store)} candidates ({len(store.skills)} skills, {store.nbytes / 1e6:.1f} MB) saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
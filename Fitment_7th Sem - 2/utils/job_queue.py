@@ -0,0 +1,216 @@
+"""
+SQLite-backed queue for background ranking runs.
+
+POST /rank/jobs enqueues a run and returns a token straight away; worker
+threads claim queued rows, run the ranking and store the result. The queue is
+a single SQLite file, so every web worker process on the host shares it:
+  * a partial unique index allows only one queued/running row per run key
+    (the job_id plus every option that changes the result), so repeated
+    requests for the same run coalesce onto the existing token;
+  * claiming is an UPDATE inside BEGIN IMMEDIATE, so a row runs once;
+  * running rows keep a heartbeat, and rows whose worker died are re-queued.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.getenv("RANK_QUEUE_DB") or os.path.join(APP_DIR, "cache", "rank_jobs.sqlite3")
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rank_jobs (
+    token       TEXT PRIMARY KEY,
+    job_id      TEXT NOT NULL,
+    run_key     TEXT,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL,          -- queued | running | done | failed
+    stage       TEXT,
+    done        INTEGER,
+    total       INTEGER,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+"""
+_INDEXES = """
+DROP INDEX IF EXISTS rank_jobs_active;
+CREATE UNIQUE INDEX IF NOT EXISTS rank_jobs_active_run ON rank_jobs(run_key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS rank_jobs_status ON rank_jobs(status, created_at);
+"""
+
+
+class RankJobQueue:
+    def __init__(self, handler, db_path=None, workers=2, poll_interval=0.5, stale_after=600, keep_for=86400,
+                 heartbeat_interval=None):
+        """
+        `handler(job_id, payload, progress)` does the work and returns a
+        JSON-serialisable result; `progress(stage, done, total)` reports status.
+        A running row is touched every `heartbeat_interval` seconds (default
+        stale_after / 4) whether or not the handler reports progress, and is
+        re-queued once it has gone `stale_after` seconds without.
+        """
+        self.handler = handler
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval or stale_after / 4
+        self.keep_for = keep_for
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        # queues created before runs were keyed by their options
+        if "run_key" not in {row["name"] for row in conn.execute("PRAGMA table_info(rank_jobs)")}:
+            conn.execute("ALTER TABLE rank_jobs ADD COLUMN run_key TEXT")
+        conn.executescript(_INDEXES)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job_id, payload, key=None):
+        """
+        Queue a run for job_id, or join the one already queued/running under
+        the same `key` (default: the job_id alone). Returns (token, created).
+        """
+        key = job_id if key is None else key
+        conn = self._conn()
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn.execute("DELETE FROM rank_jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (now - self.keep_for,))
+        try:
+            conn.execute(
+                "INSERT INTO rank_jobs (token, job_id, run_key, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (token, job_id, key, json.dumps(payload), now, now),
+            )
+        except sqlite3.IntegrityError:
+            row = conn.execute(
+                "SELECT token FROM rank_jobs WHERE run_key = ? AND status IN ('queued', 'running')", (key,)
+            ).fetchone()
+            if row is not None:
+                return row["token"], False
+            # the active run finished between our INSERT and SELECT; try again
+            return self.submit(job_id, payload, key)
+        self.start()
+        self._wake.set()
+        return token, True
+
+    def get(self, token, include_result=True):
+        row = self._conn().execute("SELECT * FROM rank_jobs WHERE token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        out = {
+            "token": row["token"],
+            "job_id": row["job_id"],
+            "status": row["status"],
+            "progress": {"stage": row["stage"], "done": row["done"], "total": row["total"]},
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if row["error"]:
+            out["error"] = row["error"]
+        if include_result and row["result"] is not None:
+            out["result"] = json.loads(row["result"])
+        return out
+
+    def counts(self):
+        """{status: number of runs} over the runs still kept in the queue."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM rank_jobs GROUP BY status")
+        return {status: n for status, n in rows}
+
+    def start(self):
+        """Start the worker threads for this process (idempotent)."""
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for _ in range(self.workers - len(self._threads)):
+                t = threading.Thread(target=self._work_loop, name="rank-queue-worker", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _claim(self):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT token, job_id, payload FROM rank_jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now - self.stale_after,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE rank_jobs SET status = 'running', stage = NULL, done = NULL, total = NULL, updated_at = ? WHERE token = ?",
+                    (now, row["token"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _update(self, token, **fields):
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self._conn().execute(f"UPDATE rank_jobs SET {cols} WHERE token = ?", (*fields.values(), token))
+
+    def _heartbeat(self, token, stop):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self._conn().execute(
+                    "UPDATE rank_jobs SET updated_at = ? WHERE token = ? AND status = 'running'", (time.time(), token)
+                )
+            except sqlite3.Error:
+                log.warning("Rank run %s: heartbeat failed; retrying", token, exc_info=True)
+
+    def _work_loop(self):
+        while True:
+            try:
+                row = self._claim()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            token = row["token"]
+
+            def progress(stage, done, total):
+                # status only; a failed write must not fail the run
+                try:
+                    self._update(token, stage=stage, done=done, total=total)
+                except sqlite3.Error:
+                    log.warning("Rank run %s: could not record progress", token, exc_info=True)
+
+            stop = threading.Event()
+            threading.Thread(target=self._heartbeat, args=(token, stop), name="rank-queue-heartbeat", daemon=True).start()
+            try:
+                result = self.handler(row["job_id"], json.loads(row["payload"]), progress)
+                outcome = {"status": "done", "result": json.dumps(result)}
+            except Exception as e:
+                outcome = {"status": "failed", "error": str(e) or type(e).__name__}
+            finally:
+                stop.set()
+            try:
+                self._update(token, **outcome)
+            except Exception:
+                # the row stays running without a heartbeat, so it is re-queued after stale_after
+                log.exception("Rank run %s: could not record its outcome", token)
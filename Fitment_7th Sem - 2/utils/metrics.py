@@ -0,0 +1,335 @@
+"""
+Counters, latency histograms and per-request stage profiling.
+
+Metrics are kept per process and rendered in the Prometheus text exposition
+format by render() (served at /metrics). Code under measurement wraps each
+step in `with stage("rank", "fetch"):`; the time lands in the
+fitment_stage_seconds histogram and, when the current request opted in to
+profiling, in that request's stage breakdown (returned as a Server-Timing
+header by app.py).
+
+Collectors registered with register_collector() are called at scrape time to
+export state that lives elsewhere (Supabase client counters, index sizes).
+
+Metrics live in each process. Under several gunicorn workers, set
+METRICS_DIR to a directory shared by them: every worker then writes a
+snapshot there every METRICS_FLUSH_INTERVAL seconds (default 5) and /metrics
+adds all snapshots up, so whichever worker answers a scrape reports the same
+monotonic totals. Counters of workers that have exited stay in the sum;
+gauges are reported per live worker with a "pid" label. gunicorn.conf.py
+empties the directory when the master starts.
+"""
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_metrics = []
+_collectors = []
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL") or 5)
+_flusher = None
+
+# stage name -> seconds for the request being profiled, if it asked for it
+_profile = contextvars.ContextVar("fitment_profile", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            return sorted(self._values.items())
+
+    @staticmethod
+    def merge(into, key, value):
+        into[key] = into.get(key, 0) + value
+
+    def render(self, items=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        items = self.samples() if items is None else items
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + seconds)
+
+    def samples(self):
+        with _lock:
+            return sorted((k, (list(c), t)) for k, (c, t) in self._values.items())
+
+    @staticmethod
+    def merge(into, key, value):
+        counts, total = into.get(key) or ([0] * len(value[0]), 0.0)
+        into[key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+
+    def render(self, items=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        items = self.samples() if items is None else items
+        for key, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                le = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+def register_collector(fn):
+    """
+    `fn()` returns [(name, type, help, [(labels dict, value), ...]), ...] and
+    is called on every scrape; a collector that raises is skipped.
+    """
+    with _lock:
+        _collectors.append(fn)
+    return fn
+
+
+def _collect():
+    with _lock:
+        collectors = list(_collectors)
+    families = []
+    for fn in collectors:
+        try:
+            families += fn()
+        except Exception:
+            continue
+    return families
+
+
+def render():
+    """All metrics in Prometheus text format (version 0.0.4), summed over workers when METRICS_DIR is set."""
+    if METRICS_DIR:
+        return _render_shared()
+    with _lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    for name, kind, help, samples in _collect():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- sharing metrics between worker processes ----------------------------------
+
+def flush():
+    """Write this process's metrics to METRICS_DIR/<pid>.json (atomically)."""
+    if not METRICS_DIR:
+        return
+    with _lock:
+        metrics = list(_metrics)
+    snapshot = {
+        "pid": os.getpid(),
+        "metrics": {m.name: [[list(key), value] for key, value in m.samples()] for m in metrics},
+        "families": [[name, kind, help, [[labels, value] for labels, value in samples]]
+                     for name, kind, help, samples in _collect()],
+    }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def start_flusher(interval=None):
+    """Flush this process's snapshot every `interval` seconds from a daemon thread (call once per worker, after fork)."""
+    global _flusher
+    if not METRICS_DIR or (_flusher is not None and _flusher.is_alive() and _flusher.pid == os.getpid()):
+        return
+    interval = FLUSH_INTERVAL if interval is None else interval
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except Exception:
+                pass
+
+    _flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+    _flusher.pid = os.getpid()
+    _flusher.start()
+
+
+def clear_shared():
+    """Remove every snapshot in METRICS_DIR (a fresh server starts counting from zero)."""
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        for name in os.listdir(METRICS_DIR):
+            if name.endswith((".json", ".tmp")):
+                os.remove(os.path.join(METRICS_DIR, name))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _render_shared():
+    flush()
+    snapshots = []
+    for name in sorted(os.listdir(METRICS_DIR)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(METRICS_DIR, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    with _lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        merged = {}
+        for snap in snapshots:
+            for key, value in snap["metrics"].get(metric.name, []):
+                metric.merge(merged, tuple(key), value)
+        lines += metric.render(sorted(merged.items()))
+
+    # collector families: counters are summed, gauges reported per live worker
+    families = {}
+    for snap in snapshots:
+        alive = _alive(snap["pid"])
+        for name, kind, help, samples in snap["families"]:
+            family = families.setdefault(name, (kind, help, {}))
+            for labels, value in samples:
+                if kind == "counter":
+                    key = tuple(sorted(labels.items()))
+                    family[2][key] = family[2].get(key, 0) + value
+                elif alive:
+                    family[2][tuple(sorted({**labels, "pid": snap["pid"]}.items()))] = value
+    for name, (kind, help, samples) in families.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for key, value in sorted(samples.items()):
+            labels = dict(key)
+            lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = Counter("fitment_http_requests_total", "HTTP requests handled", ("endpoint", "method", "status"))
+HTTP_SECONDS = Histogram("fitment_http_request_seconds", "HTTP request latency", ("endpoint", "method"))
+STAGE_SECONDS = Histogram("fitment_stage_seconds", "Time spent in each stage of a request", ("endpoint", "stage"))
+ROWS_SCORED = Counter("fitment_rows_scored_total", "Applications / resumes scored", ("endpoint",))
+ROWS_WRITTEN = Counter("fitment_rows_written_total", "Scores written back to Supabase", ("endpoint",))
+FAILURES = Counter("fitment_failures_total", "Failed steps", ("endpoint", "stage"))
+CACHE_HITS = Counter("fitment_cache_hits_total", "Cache hits", ("cache",))
+CACHE_MISSES = Counter("fitment_cache_misses_total", "Cache misses", ("cache",))
+
+
+@contextmanager
+def stage(endpoint, name):
+    """Time a block into fitment_stage_seconds and the current request's profile."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(endpoint, name, time.perf_counter() - start)
+
+
+def record_stage(endpoint, name, seconds):
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+    profile = _profile.get()
+    if profile is not None:
+        profile[name] = profile.get(name, 0.0) + seconds
+
+
+def timed_iter(iterable, endpoint, name):
+    """Yield from `iterable`, timing each step (e.g. fetching the next page) as a stage."""
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            record_stage(endpoint, name, time.perf_counter() - start)
+            return
+        record_stage(endpoint, name, time.perf_counter() - start)
+        yield item
+
+
+def start_profile(profile=None):
+    """
+    Collect stage timings for the current request; returns a token for
+    end_profile. Pass the request's profile to keep collecting into it from
+    another thread or asyncio task.
+    """
+    return _profile.set({} if profile is None else profile)
+
+
+def current_profile():
+    return _profile.get()
+
+
+def end_profile(token):
+    _profile.reset(token)
+
+
+def server_timing(profile, total=None):
+    """Format a stage breakdown as a Server-Timing header value (durations in ms)."""
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in profile.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
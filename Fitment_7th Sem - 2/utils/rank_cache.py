@@ -0,0 +1,150 @@
+"""
+Per-application fingerprints of scoring inputs, for incremental re-ranking.
+
+A fingerprint covers everything that can change an application's score: the
+job's required skills, the candidate's normalized skills, experience, profile
+floats, attrition features, the scoring formula version, the skill matching
+mode and vocabulary, and the attrition model version. /rank rescores and writes back only rows whose fingerprint
+changed, and reuses the stored score for the rest.
+
+/rank works one page of applications at a time, so lookups and stores are
+per page; each touched row is stamped with the run id, and rows a finished
+run never saw are pruned with forget_unseen.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from utils.batch_scorer import SCORING_VERSION, norm_list, parse_experience
+from utils.skill_vectors import match_version
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.getenv("RANK_CACHE_DB") or os.path.join(APP_DIR, "cache", "rank_cache.sqlite3")
+
+# keep IN (...) lists under SQLite's bound-parameter limit
+_MAX_PARAMS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rank_fingerprints (
+    job_id        TEXT NOT NULL,
+    row_key       TEXT NOT NULL,
+    fingerprint   TEXT NOT NULL,
+    fitment_score REAL NOT NULL,
+    sub_scores    TEXT NOT NULL,
+    last_run      TEXT,
+    PRIMARY KEY (job_id, row_key)
+) WITHOUT ROWID;
+"""
+
+
+def _digest(obj):
+    return hashlib.blake2b(json.dumps(obj, separators=(",", ":"), sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def job_fingerprint(required_skills, model_version):
+    # duplicates matter: they count in the skill-match denominator
+    return _digest([SCORING_VERSION, match_version(), model_version, sorted(norm_list(required_skills))])
+
+
+def profile_key(profile):
+    """
+    The job-independent part of row_fingerprint, as the JSON it hashes minus
+    the leading '[' and job fingerprint. Worth caching with the profile.
+    """
+    return json.dumps([
+        sorted(set(norm_list(profile.get("skills")))),
+        parse_experience(profile.get("experience_years")),
+        profile.get("cultural_fit"),
+        profile.get("growth_potential"),
+        profile.get("resume_quality"),
+        profile.get("attrition_features"),
+    ], separators=(",", ":"), sort_keys=True)[1:]
+
+
+def row_fingerprint(job_fp, profile, key=None):
+    """
+    Fingerprint of one flat scoring profile (see candidate_store.scoring_profile)
+    under a job; `key` is profile_key(profile) if already known.
+    """
+    # the same bytes _digest([job_fp, ...]) would hash; job_fp is hex, so it needs no escaping
+    key = key or profile_key(profile)
+    return hashlib.blake2b(f'["{job_fp}",{key}'.encode(), digest_size=16).hexdigest()
+
+
+class RankCache:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        # caches created before last_run existed
+        if "last_run" not in {row[1] for row in conn.execute("PRAGMA table_info(rank_fingerprints)")}:
+            with conn:
+                conn.execute("ALTER TABLE rank_fingerprints ADD COLUMN last_run TEXT")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, job_id):
+        """{row_key: (fingerprint, fitment_score, sub_scores)} for every cached row of the job."""
+        rows = self._conn().execute(
+            "SELECT row_key, fingerprint, fitment_score, sub_scores FROM rank_fingerprints WHERE job_id = ?", (job_id,)
+        )
+        return {key: (fp, score, json.loads(sub)) for key, fp, score, sub in rows}
+
+    def lookup(self, job_id, row_keys, run_id=None):
+        """
+        Like load, restricted to `row_keys`. When run_id is given the rows
+        found are stamped as seen by that run.
+        """
+        out = {}
+        row_keys = list(row_keys)
+        with self._conn() as conn:
+            for i in range(0, len(row_keys), _MAX_PARAMS):
+                part = row_keys[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    "SELECT row_key, fingerprint, fitment_score, sub_scores FROM rank_fingerprints "
+                    f"WHERE job_id = ? AND row_key IN ({marks})", (job_id, *part)
+                )
+                out.update((key, (fp, score, json.loads(sub))) for key, fp, score, sub in rows)
+                if run_id is not None:
+                    conn.execute(
+                        f"UPDATE rank_fingerprints SET last_run = ? WHERE job_id = ? AND row_key IN ({marks})",
+                        (run_id, job_id, *part),
+                    )
+        return out
+
+    def store(self, job_id, entries, run_id=None):
+        """Save (row_key, fingerprint, fitment_score, sub_scores) tuples for rows that were written back."""
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rank_fingerprints (job_id, row_key, fingerprint, fitment_score, sub_scores, last_run) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((job_id, key, fp, score, json.dumps(sub), run_id) for key, fp, score, sub in entries),
+            )
+
+    def forget_unseen(self, job_id, run_id):
+        """Drop cached rows of a job that the run `run_id` did not look up or store."""
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM rank_fingerprints WHERE job_id = ? AND (last_run IS NULL OR last_run != ?)", (job_id, run_id)
+            )
+
+    def forget(self, job_id, row_keys=None):
+        """Drop cached rows of a job (all of them when row_keys is None)."""
+        with self._conn() as conn:
+            if row_keys is None:
+                conn.execute("DELETE FROM rank_fingerprints WHERE job_id = ?", (job_id,))
+            else:
+                conn.executemany(
+                    "DELETE FROM rank_fingerprints WHERE job_id = ? AND row_key = ?", ((job_id, k) for k in row_keys)
+                )
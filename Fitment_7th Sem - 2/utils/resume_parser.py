@@ -1,20 +1,309 @@
-def parse_resume(filepath):
+"""
+Resume text extraction and feature extraction.
+
+PDFs are read page by page through pypdf and DOCX bodies are streamed out of
+the zip with iterparse, so a large upload is never held in memory whole.
+Parsed results are cached on disk under the SHA-256 of the file content;
+re-uploading the same resume returns the cached features without parsing.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+from utils.skill_vectors import SKILL_ALIASES, normalize_skill
+
+PARSER_VERSION = 2
+CHUNK_SIZE = 64 * 1024
+MAX_TEXT_CHARS = 200_000
+ALLOWED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("RESUME_CACHE_DIR") or os.path.join(APP_DIR, "cache", "resumes")
+
+# Placeholders for what the resume cannot tell us, the values the parser has always returned.
+# extract_features overwrites Age, YearsAtCompany and Education when it finds them; skill_match
+# only stands in when no required skills are given (see app._score_resume)
+DEFAULT_FEATURES = {
+    "Age": 27,
+    "JobSatisfaction": 4,
+    "EnvironmentSatisfaction": 3,
+    "MonthlyIncome": 6500,
+    "YearsAtCompany": 2,
+    "DistanceFromHome": 10,
+    "WorkLifeBalance": 3,
+    "Education": 3,
+    "JobInvolvement": 3,
+    "skill_match": 0.85,
+    "cultural_fit": 0.7,
+    "growth_potential": 0.78,
+}
+
+SKILL_VOCABULARY = [
+    "python", "java", "javascript", "typescript", "c++", "c#", ".net", "golang", "rust", "kotlin", "swift",
+    "php", "ruby", "scala", "matlab", "sql", "postgresql", "mysql", "mongodb", "redis", "sqlite",
+    "html", "css", "react", "angular", "vue", "next.js", "node.js", "express.js", "tailwind css", "django",
+    "flask", "fastapi", "spring", "graphql", "rest apis", "numpy", "pandas", "scikit-learn", "tensorflow",
+    "pytorch", "keras", "opencv", "nlp", "machine learning", "deep learning", "llms", "pyspark", "spark",
+    "hadoop", "kafka", "airflow", "databricks", "tableau", "power bi", "excel", "aws", "azure", "gcp",
+    "docker", "kubernetes", "terraform", "linux", "git", "github", "ci/cd", "jira", "agile", "scrum",
+    "postman", "supabase", "firebase", "sap", "sap abap", "sap hcm", "etl", "data modelling",
+]
+_SKILL_PATTERN = re.compile(
+    r"(?<![a-z0-9+#.])(" + "|".join(re.escape(s) for s in sorted(SKILL_VOCABULARY, key=len, reverse=True)) + r")(?![a-z0-9+#])"
+)
+
+# Job descriptions also use the matcher's alias spellings ("k8s", "node", "Go"). The ones that are
+# ordinary words or single letters only count as items of a list ("Go, C, R and node"), not in prose.
+_LIST_ONLY_TERMS = {"c", "r", "go", "rest", "express", "node", "cv", "tf", "ml", "dl"}
+_JD_TERMS = sorted(set(SKILL_VOCABULARY) | set(SKILL_ALIASES) | _LIST_ONLY_TERMS, key=len, reverse=True)
+_JD_SKILL_PATTERN = re.compile(r"(?<![a-z0-9+#.])(" + "|".join(re.escape(s) for s in _JD_TERMS) + r")(?![a-z0-9+#])")
+_LIST_BEFORE = re.compile(r"(?:[,;/|(:*\n•-]|\band|\bor)\s*$")
+_LIST_AFTER = re.compile(r"\s*(?:[,;/|)\n]|\.(?:\s|$)|and\b|or\b|$)")
+
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_DATE = r"(?:(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*)?((?:19|20)\d{2})"
+_RANGE_PATTERN = re.compile(_DATE + r"\s*(?:-|–|—|to)\s*(?:" + _DATE + r"|(present|current|now|till date))")
+_YEARS_PATTERN = re.compile(r"(\d{1,2})\+?\s*(?:years?|yrs?)(?:\s+of)?\s+(?:\w+\s+){0,2}experience")
+# "3+ years", "3-5 years", "minimum of 2 yrs" ... of/in/with ... experience
+_JD_YEARS_PATTERN = re.compile(
+    r"(\d{1,2})\s*(?:\+|(?:-|–|—|to)\s*\d{1,2})?\s*(?:years?|yrs?)(?:\s+\w+){0,4}?\s+experience"
+    r"|experience\s*(?:of|:)?\s*(?:at least|minimum(?: of)?|min\.?)?\s*(\d{1,2})\s*\+?\s*(?:years?|yrs?)"
+)
+_AGE_PATTERN = re.compile(r"\bage\s*[:\-]?\s*(\d{2})\b")
+_DOB_PATTERN = re.compile(r"\b(?:dob|date of birth|born)\b[^\n]{0,20}?((?:19|20)\d{2})")
+_EDUCATION_LINE = re.compile(r"universit|college|school|institute|secondary|examination|bachelor|master|b\.?tech|degree|cgpa|gpa")
+_EDUCATION_LEVELS = [
+    (5, re.compile(r"\bph\.?d\b|doctor(?:ate| of)")),
+    (4, re.compile(r"\bmaster|\bm\.?tech\b|\bm\.?sc\b|\bmba\b|\bm\.?e\b|\bm\.?s\b")),
+    (3, re.compile(r"\bbachelor|\bb\.?tech\b|\bb\.?sc\b|\bb\.?e\b|\bb\.?com\b|\bbca\b|\bb\.?a\b")),
+    (2, re.compile(r"\bdiploma\b|\bassociate degree\b")),
+]
+
+
+def hash_stream(fileobj):
+    """SHA-256 hex digest of a binary stream, read in chunks."""
+    h = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_file(filepath):
+    with open(filepath, "rb") as f:
+        return hash_stream(f)
+
+
+def copy_stream(stream, out, max_bytes=None, hasher=None):
+    """Copy `stream` to `out` in chunks; raises ValueError once more than `max_bytes` have been read."""
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise ValueError("file too large")
+        if hasher is not None:
+            hasher.update(chunk)
+        out.write(chunk)
+    return size
+
+
+def save_upload(stream, folder, filename, max_bytes=None):
     """
-    Extract features (mock data for now).
-    In real use, parse resume to infer these.
+    Stream an upload to `folder` while hashing it. The file is stored as
+    <sha256><ext> rather than under the client-supplied name, so identical
+    uploads share one file and names can't escape the folder.
+
+    Returns (filepath, sha256). Raises ValueError for unsupported extensions
+    and for uploads over `max_bytes` (counted as written, not as declared).
     """
-    candidate = {
-        "Age": 27,
-        "JobSatisfaction": 4,
-        "EnvironmentSatisfaction": 3,
-        "MonthlyIncome": 6500,
-        "YearsAtCompany": 2,
-        "DistanceFromHome": 10,
-        "WorkLifeBalance": 3,
-        "Education": 3,
-        "JobInvolvement": 3,
-        "skill_match": 0.85,
-        "cultural_fit": 0.7,
-        "growth_potential": 0.78
-    }
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"unsupported resume type: {ext or filename!r}")
+    os.makedirs(folder, exist_ok=True)
+    h = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            copy_stream(stream, out, max_bytes, h)
+        digest = h.hexdigest()
+        filepath = os.path.join(folder, digest + ext)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filepath, digest
+
+
+def _iter_pdf_text(filepath):
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF parsing requires pypdf (pip install pypdf)") from e
+    with open(filepath, "rb") as f:
+        for page in PdfReader(f).pages:
+            yield page.extract_text() or ""
+
+
+def _iter_docx_text(filepath):
+    w = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+    with zipfile.ZipFile(filepath) as zf, zf.open("word/document.xml") as xml:
+        parts = []
+        for _, elem in iterparse(xml, events=("end",)):
+            if elem.tag == w + "t" and elem.text:
+                parts.append(elem.text)
+            elif elem.tag in (w + "tab",):
+                parts.append("\t")
+            elif elem.tag == w + "p":
+                parts.append("\n")
+                yield "".join(parts)
+                parts = []
+                elem.clear()
+
+
+def _iter_txt_text(filepath):
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+            yield chunk
+
+
+def extract_text(filepath):
+    """Plain text of a PDF, DOCX or TXT resume (truncated to MAX_TEXT_CHARS)."""
+    ext = os.path.splitext(filepath)[1].lower()
+    # PDF pages and DOCX paragraphs are separate lines; TXT chunks are cut mid-line
+    if ext == ".pdf":
+        pieces, sep = _iter_pdf_text(filepath), "\n"
+    elif ext == ".docx":
+        pieces, sep = _iter_docx_text(filepath), "\n"
+    elif ext == ".txt":
+        pieces, sep = _iter_txt_text(filepath), ""
+    else:
+        raise ValueError(f"unsupported resume type: {ext}")
+
+    out, size = [], 0
+    for piece in pieces:
+        out.append(piece)
+        size += len(piece)
+        if size >= MAX_TEXT_CHARS:
+            break
+    return sep.join(out)[:MAX_TEXT_CHARS]
+
+
+def _month(name):
+    return _MONTHS.get((name or "")[:3], 1)
+
+
+def _work_intervals(lines, today):
+    """(start, end) month indexes of date ranges that are not on education lines."""
+    intervals = []
+    for line in lines:
+        if _EDUCATION_LINE.search(line):
+            continue
+        for m in _RANGE_PATTERN.finditer(line):
+            start = int(m.group(2)) * 12 + _month(m.group(1)) - 1
+            if m.group(5):
+                end = today.year * 12 + today.month - 1
+            else:
+                end = int(m.group(4)) * 12 + _month(m.group(3)) - 1
+            if end >= start:
+                intervals.append((start, end + 1))
+    return sorted(intervals)
+
+
+def extract_features(text, today=None):
+    """Skills, experience and the nine attrition-model features from resume text."""
+    today = today or datetime.date.today()
+    lower = text.lower()
+    lines = lower.splitlines()
+    features = dict(DEFAULT_FEATURES)
+
+    features["skills"] = sorted(set(_SKILL_PATTERN.findall(lower)))
+
+    intervals = _work_intervals(lines, today)
+    merged_months, cur_start, cur_end = 0, None, None
+    for start, end in intervals:
+        if cur_end is None or start > cur_end:
+            if cur_end is not None:
+                merged_months += cur_end - cur_start
+            cur_start, cur_end = start, end
+        else:
+            cur_end = max(cur_end, end)
+    if cur_end is not None:
+        merged_months += cur_end - cur_start
+    stated = [int(y) for y in _YEARS_PATTERN.findall(lower)]
+    features["experience_years"] = max(stated) if stated else merged_months // 12
+
+    if intervals:
+        # tenure in the most recent role
+        start, end = max(intervals, key=lambda iv: (iv[1], iv[0]))
+        features["YearsAtCompany"] = max(0, (end - start) // 12)
+
+    age = _AGE_PATTERN.search(lower)
+    dob = _DOB_PATTERN.search(lower)
+    if age:
+        features["Age"] = int(age.group(1))
+    elif dob:
+        features["Age"] = today.year - int(dob.group(1))
+
+    for level, pattern in _EDUCATION_LEVELS:
+        if pattern.search(lower):
+            features["Education"] = level
+            break
+
+    features["text"] = text
+    return features
+
+
+def extract_requirements(text):
+    """
+    Required skills and the experience floor of a job description, with the
+    same skill vocabulary as resumes: {"skills": [...], "min_experience": int}.
+    Alias spellings are resolved with normalize_skill, so "k8s" and "node"
+    come back as the canonical "kubernetes" and "node.js". The floor is the
+    lowest number of years the text asks for (0 if none).
+    """
+    lower = text.lower()
+    years = [int(a or b) for a, b in _JD_YEARS_PATTERN.findall(lower)]
+    skills = set()
+    for m in _JD_SKILL_PATTERN.finditer(lower):
+        term, start = m.group(1), m.start()
+        if term in _LIST_ONLY_TERMS and not (
+                not lower[:start].strip() or _LIST_BEFORE.search(lower, max(0, start - 6), start)
+                or _LIST_AFTER.match(lower, m.end())):
+            continue
+        skills.add(normalize_skill(term))
+    return {"skills": sorted(skills), "min_experience": min(years) if years else 0}
+
+
+def parse_resume(filepath, digest=None, cache_dir=None):
+    """
+    Extract features from a resume file, reusing the on-disk cache when a file
+    with the same content hash has been parsed before.
+    """
+    digest = digest or hash_file(filepath)
+    cache_dir = cache_dir or CACHE_DIR
+    cache_path = os.path.join(cache_dir, f"{digest}.v{PARSER_VERSION}.json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        cached["cache_hit"] = True
+        return cached
+    except (OSError, ValueError):
+        pass
+
+    candidate = extract_features(extract_text(filepath))
+    candidate["sha256"] = digest
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(candidate, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+    candidate["cache_hit"] = False
     return candidate
@@ -0,0 +1,239 @@
+"""
+In-process inverted index: normalized skill -> compact array of candidate docs.
+
+Finding the best candidates for a required-skills list only touches the
+posting lists of those skills, never the whole candidate pool. Candidates are
+updated incrementally: a changed candidate gets a fresh doc number and its old
+one is tombstoned until the next compaction. Every worker holds its own
+index; candidates published through INDEX_ROWS (the Supabase webhook) are
+re-read into each of them on their next get_skill_index(client).
+"""
+import logging
+import threading
+from array import array
+
+import numpy as np
+
+from utils.batch_scorer import norm_list
+
+log = logging.getLogger(__name__)
+
+
+def candidate_skills(row):
+    """Skill list of a `candidates` row; skills_text may be a comma separated string."""
+    value = row.get("skills") or row.get("skills_text") or []
+    if isinstance(value, str):
+        value = value.split(",")
+    return norm_list(value)
+
+
+class SkillIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self._recorded = None    # updates made while a replacement index is being built
+
+    def _reset(self):
+        self._postings = {}      # skill -> array("i") of doc numbers
+        self._doc_ids = []       # doc -> candidate id
+        self._doc_skills = []    # doc -> tuple of skills, None once tombstoned
+        self._docs = {}          # candidate id -> live doc
+        self._alive = bytearray()
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def update(self, candidate_id, skills):
+        """Add or replace a candidate's skills (already normalized or not)."""
+        skills = tuple(sorted(set(norm_list(skills))))
+        with self._lock:
+            if self._recorded is not None:
+                self._recorded[candidate_id] = skills
+            doc = self._docs.get(candidate_id)
+            if doc is not None:
+                if self._doc_skills[doc] == skills:
+                    return
+                self._tombstone(doc)
+            if not skills:
+                self._docs.pop(candidate_id, None)
+                return
+            doc = len(self._doc_ids)
+            self._doc_ids.append(candidate_id)
+            self._doc_skills.append(skills)
+            self._alive.append(1)
+            self._docs[candidate_id] = doc
+            for s in skills:
+                self._postings.setdefault(s, array("i")).append(doc)
+            if self._dead > max(1024, len(self._docs)):
+                self._compact()
+
+    def remove(self, candidate_id):
+        with self._lock:
+            if self._recorded is not None:
+                self._recorded[candidate_id] = ()
+            doc = self._docs.pop(candidate_id, None)
+            if doc is not None:
+                self._tombstone(doc)
+
+    def build(self, rows):
+        """Bulk load `candidates` rows (id, skills/skills_text), replacing the current contents."""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                if row.get("id") is not None:
+                    self.update(row["id"], candidate_skills(row))
+            self.ready = True
+
+    def clear(self):
+        """Drop every candidate; the next get_skill_index(client) rebuilds from Supabase."""
+        with self._lock:
+            self._reset()
+            if self._recorded is not None:
+                self._recorded.clear()
+            self.ready = False
+
+    def start_recording(self):
+        # anything already held came from incremental updates; carry it over too
+        with self._lock:
+            self._recorded = {cid: self._doc_skills[doc] for cid, doc in self._docs.items()}
+
+    def stop_recording(self):
+        with self._lock:
+            self._recorded = None
+
+    def swap(self, other):
+        """Take over `other`'s contents, then replay updates recorded since start_recording()."""
+        with self._lock:
+            recorded, self._recorded = self._recorded or {}, None
+            self._postings, self._doc_ids, self._doc_skills = other._postings, other._doc_ids, other._doc_skills
+            self._docs, self._alive, self._dead = other._docs, other._alive, other._dead
+            for candidate_id, skills in recorded.items():
+                self.update(candidate_id, skills)
+            self.ready = True
+
+    def top_k(self, required_skills, k=20):
+        """
+        Candidates with the most required skills, best first.
+
+        Posting lists of the required skills are merged and counted, so the
+        cost is proportional to how many candidates hold those skills.
+        Returns [{"candidate_id", "matched", "skill_match"}] where skill_match
+        uses the same formula as the scorer.
+        """
+        req_norm = norm_list(required_skills)
+        if not req_norm or k <= 0:
+            return []
+        with self._lock:
+            lists = [np.array(self._postings[s], dtype=np.int32) for s in set(req_norm) if s in self._postings]
+            if not lists:
+                return []
+            docs = np.concatenate(lists)
+            alive = np.frombuffer(self._alive, dtype=np.uint8)
+            docs = docs[alive[docs] == 1]
+            del alive  # release the buffer export so _alive can grow again
+            doc_ids = self._doc_ids
+            docs, counts = np.unique(docs, return_counts=True)
+            if docs.size > k:
+                keep = np.argpartition(-counts, k - 1)[:k]
+                docs, counts = docs[keep], counts[keep]
+            # most matches first, earlier docs first among ties
+            order = np.lexsort((docs, -counts))
+            return [
+                {
+                    "candidate_id": doc_ids[d],
+                    "matched": int(c),
+                    "skill_match": (int(c) / max(1, len(req_norm))) * 100.0,
+                }
+                for d, c in zip(docs[order].tolist(), counts[order].tolist())
+            ]
+
+    def _tombstone(self, doc):
+        if self._alive[doc]:
+            self._alive[doc] = 0
+            self._doc_skills[doc] = None
+            self._dead += 1
+
+    def _compact(self):
+        live = [(self._doc_ids[d], self._doc_skills[d]) for d in self._docs.values()]
+        self._reset()
+        for candidate_id, skills in live:
+            self.update(candidate_id, skills)
+
+
+_index = SkillIndex()
+_build_lock = threading.Lock()
+# candidate ids changed in Supabase, possibly reported to another worker; re-read on the next lookup
+_stale = set()
+_stale_lock = threading.Lock()
+
+
+class IndexRows:
+    """
+    The index as an InvalidationLog (utils.ttl_cache) cache: publishing a
+    candidate id marks it stale in every worker, to be re-read from the
+    candidates table by the next get_skill_index(client). Publishing without
+    a key (TRUNCATE) empties the index and has it rebuilt.
+    """
+    name = "skill_index"
+
+    def invalidate(self, key):
+        if not _index.ready:
+            return 0  # the build will read the row as it is now
+        with _stale_lock:
+            _stale.add(str(key))
+        return 1
+
+    def clear(self):
+        dropped = len(_index)
+        with _stale_lock:
+            _stale.clear()
+        _index.clear()
+        return dropped
+
+
+INDEX_ROWS = IndexRows()
+
+
+def _refresh_stale(client):
+    with _stale_lock:
+        ids = sorted(_stale)
+        _stale.clear()
+    if not ids:
+        return
+    try:
+        rows = client.select_in("candidates", ids, select="id,skills,skills_text")
+    except Exception:
+        log.warning("Could not re-read %d changed candidates; retrying on the next lookup", len(ids), exc_info=True)
+        with _stale_lock:
+            _stale.update(ids)
+        return
+    found = {str(row["id"]): row for row in rows if row.get("id") is not None}
+    for candidate_id in ids:
+        if candidate_id in found:
+            _index.update(candidate_id, candidate_skills(found[candidate_id]))
+        else:
+            _index.remove(candidate_id)
+
+
+def get_skill_index(client=None):
+    """
+    The process-wide index, built from the `candidates` table on first use when
+    a SupabaseClient is given. Until then it only holds incremental updates.
+    Given a client, candidates marked stale through INDEX_ROWS are re-read first.
+    """
+    if client is not None and not _index.ready:
+        with _build_lock:
+            if not _index.ready:
+                _index.start_recording()
+                fresh = SkillIndex()
+                try:
+                    fresh.build(row for page in client.iter_pages("candidates", {"select": "id,skills,skills_text"}) for row in page)
+                except Exception:
+                    _index.stop_recording()
+                    raise
+                _index.swap(fresh)
+    if client is not None and _stale:
+        _refresh_stale(client)
+    return _index
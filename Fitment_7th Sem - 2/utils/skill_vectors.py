@@ -0,0 +1,214 @@
+"""
+Semantic skill matching over a precomputed skill vocabulary.
+
+Skill names are first canonicalized through an alias table ("JS" ->
+"javascript", "k8s" -> "kubernetes"), then compared by cosine similarity of
+their vectors. Vectors for the vocabulary are built offline by
+train_model/build_skill_vocab.py and stored as a float32 .npy file that is
+opened with mmap_mode="r": every worker process maps the same pages from the
+page cache instead of holding its own copy. Skills outside the vocabulary get
+the same hashed character n-gram embedding on the fly.
+
+For each required skill a candidate earns the best similarity among their
+skills (1.0 for the same canonical skill, 0 below the threshold), so the
+result is on the same 0-100 scale as batch_scorer.skill_match_batch and
+equals it when nothing but exact matches clear the threshold.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+VOCAB_PATH = os.path.join(MODELS_DIR, "skill_vocab.json")
+VECTORS_PATH = os.path.join(MODELS_DIR, "skill_vectors.npy")
+
+EMBEDDING_DIM = 512
+_PROBES = 4
+DEFAULT_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD") or 0.6)
+
+# Common spellings -> canonical vocabulary name. The vocabulary file can add more.
+SKILL_ALIASES = {
+    "js": "javascript", "ecmascript": "javascript", "es6": "javascript",
+    "ts": "typescript",
+    "py": "python", "python3": "python",
+    "go": "golang",
+    "cpp": "c++", "csharp": "c#", "dotnet": ".net", "asp.net": ".net",
+    "postgres": "postgresql", "psql": "postgresql",
+    "mongo": "mongodb",
+    "reactjs": "react", "react.js": "react",
+    "angularjs": "angular", "vuejs": "vue", "vue.js": "vue",
+    "nextjs": "next.js", "nodejs": "node.js", "node": "node.js", "expressjs": "express.js", "express": "express.js",
+    "tailwind": "tailwind css", "tailwindcss": "tailwind css",
+    "rest": "rest apis", "rest api": "rest apis", "restful apis": "rest apis",
+    "sklearn": "scikit-learn", "scikit learn": "scikit-learn",
+    "tf": "tensorflow", "torch": "pytorch",
+    "cv": "opencv",
+    "natural language processing": "nlp",
+    "ml": "machine learning", "dl": "deep learning",
+    "llm": "llms", "large language models": "llms",
+    "apache spark": "spark", "apache kafka": "kafka", "apache airflow": "airflow",
+    "powerbi": "power bi", "ms excel": "excel", "microsoft excel": "excel",
+    "amazon web services": "aws", "microsoft azure": "azure", "google cloud": "gcp", "google cloud platform": "gcp",
+    "k8s": "kubernetes",
+    "ci cd": "ci/cd", "cicd": "ci/cd",
+    "data modeling": "data modelling",
+}
+
+_SPACES = re.compile(r"\s+")
+_TOKENS = re.compile(r"[a-z0-9+#.]+")
+
+
+def normalize_skill(name, aliases=SKILL_ALIASES):
+    """Lower-case, collapse whitespace and resolve aliases."""
+    key = _SPACES.sub(" ", str(name).strip().lower())
+    return aliases.get(key, key)
+
+
+def _buckets(feature):
+    # each feature is spread over a few signed buckets so one hash collision only moves a fraction of it
+    digest = hashlib.blake2b(feature.encode(), digest_size=4 * _PROBES).digest()
+    for k in range(_PROBES):
+        h = int.from_bytes(digest[4 * k:4 * k + 4], "little")
+        yield h % EMBEDDING_DIM, 1.0 if (h >> 31) else -1.0
+
+
+@lru_cache(maxsize=4096)
+def _embed_cached(skill):
+    vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+
+    def add(feature, weight):
+        for i, sign in _buckets(feature):
+            vec[i] += sign * weight
+
+    for token in _TOKENS.findall(skill):
+        add("w:" + token, 1.0)
+        padded = f"<{token.strip('.')}>"
+        grams = [padded[j:j + 3] for j in range(max(1, len(padded) - 2))]
+        for gram in grams:
+            add("g:" + gram, 1.0 / len(grams))
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    vec.setflags(write=False)
+    return vec
+
+
+def embed_skill(skill):
+    """Hashed token + character-trigram embedding of a canonical skill name (unit length)."""
+    return _embed_cached(skill)
+
+
+class SkillVectors:
+    def __init__(self, skills, vectors, aliases=None, version=None, threshold=None):
+        """`vectors[i]` is the unit vector of `skills[i]`; vectors may be a read-only memmap."""
+        self.skills = list(skills)
+        self.vectors = vectors
+        self.aliases = {**SKILL_ALIASES, **(aliases or {})}
+        self.version = version or "unversioned"
+        self.threshold = DEFAULT_THRESHOLD if threshold is None else float(threshold)
+        self._row = {s: i for i, s in enumerate(self.skills)}
+
+    @classmethod
+    def from_files(cls, vocab_path=None, vectors_path=None, threshold=None):
+        with open(vocab_path or VOCAB_PATH, encoding="utf-8") as f:
+            vocab = json.load(f)
+        vectors = np.load(vectors_path or VECTORS_PATH, mmap_mode="r")
+        if vectors.shape != (len(vocab["skills"]), EMBEDDING_DIM):
+            raise ValueError(f"skill vectors {vectors.shape} do not match the vocabulary")
+        return cls(vocab["skills"], vectors, vocab.get("aliases"), vocab.get("version"), threshold)
+
+    @property
+    def match_version(self):
+        """Identifies the matching behaviour, for cache fingerprints."""
+        return f"semantic:{self.version}:{self.threshold}"
+
+    def canonical(self, name):
+        return normalize_skill(name, self.aliases)
+
+    def embed(self, names):
+        """Unit vectors for canonical skill names, shape (len(names), EMBEDDING_DIM)."""
+        out = np.empty((len(names), EMBEDDING_DIM), dtype=np.float32)
+        rows = [self._row.get(n, -1) for n in names]
+        known = [i for i, r in enumerate(rows) if r >= 0]
+        if known:
+            out[known] = self.vectors[[rows[i] for i in known]]
+        for i, r in enumerate(rows):
+            if r < 0:
+                out[i] = embed_skill(names[i])
+        return out
+
+    def similarities(self, required, names):
+        """
+        Credit of each skill in `names` towards each skill in `required` (both
+        normalized), shape (len(required), len(names)): 1.0 for the same
+        canonical skill, the cosine similarity when it reaches the threshold,
+        else 0.
+        """
+        req_canon = [self.canonical(s) for s in required]
+        cand_canon = [self.canonical(s) for s in names]
+        sims = self.embed(req_canon) @ self.embed(cand_canon).T
+        # the same canonical skill is a full match regardless of float rounding
+        same = np.array(req_canon, dtype=object)[:, None] == np.array(cand_canon, dtype=object)[None, :]
+        sims[same] = 1.0
+        sims[sims < self.threshold] = 0.0
+        return sims
+
+    def match(self, required, flat, offsets):
+        """
+        Semantic counterpart of skill_match_batch: same arguments (normalized
+        required skills, CSR-packed normalized candidate skills), same 0-100 scale.
+        """
+        n = len(offsets) - 1
+        if not required or flat.size == 0:
+            return np.zeros(n, dtype=np.float64)
+
+        req_unique = sorted(set(required))
+        cand_unique, inverse = np.unique(flat, return_inverse=True)
+        sims = self.similarities(req_unique, cand_unique.tolist())
+
+        # best similarity per (required skill, candidate): max over each candidate's slice
+        per_skill = np.zeros((len(req_unique), flat.size + 1), dtype=np.float32)
+        per_skill[:, :-1] = sims[:, inverse.ravel()]
+        starts = offsets[:-1]
+        best = np.maximum.reduceat(per_skill, starts, axis=1)
+        best[:, starts == offsets[1:]] = 0.0
+
+        credit = best.astype(np.float64).sum(axis=0)
+        return (credit / max(1, len(required))) * 100.0
+
+
+_matcher = None
+_matcher_loaded = False
+_matcher_lock = threading.Lock()
+
+
+def get_skill_matcher():
+    """
+    Process-wide SkillVectors when SKILL_MATCH_MODE=semantic, else None (exact
+    string matching). Loaded on first use; missing vocabulary files fall back
+    to exact matching.
+    """
+    global _matcher, _matcher_loaded
+    if not _matcher_loaded:
+        with _matcher_lock:
+            if not _matcher_loaded:
+                if (os.getenv("SKILL_MATCH_MODE") or "exact").lower() == "semantic":
+                    try:
+                        _matcher = SkillVectors.from_files()
+                    except (OSError, ValueError, KeyError) as e:
+                        log.warning("Semantic skill matching unavailable, using exact matching: %s", e)
+                _matcher_loaded = True
+    return _matcher
+
+
+def match_version():
+    matcher = get_skill_matcher()
+    return matcher.match_version if matcher is not None else "exact"
@@ -0,0 +1,210 @@
+"""
+Shared Supabase REST client.
+
+One pooled, keep-alive requests.Session per process, so the endpoints stop
+paying a TCP + TLS handshake on every PostgREST call. Idempotent requests are
+retried with exponential backoff on 429/5xx and connection errors.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"})
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+class SupabaseClient:
+    def __init__(self, url, service_key, pool_connections=4, pool_maxsize=32,
+                 connect_timeout=5.0, read_timeout=30.0, max_retries=3, backoff=0.5, max_rows=1000):
+        self.url = url.rstrip("/")
+        # PostgREST's db-max-rows: no response holds more rows, whatever limit was asked for
+        self.max_rows = max_rows
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+            "Content-Type": "application/json",
+        }
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # retries are handled in request() so they can be counted and limited to idempotent calls
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._adapter = adapter
+
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "latency_seconds_total": 0.0, "latency_seconds_max": 0.0}
+
+    @classmethod
+    def from_env(cls):
+        url = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            return None
+        return cls(
+            url, key,
+            pool_connections=int(_env_float("SUPABASE_POOL_CONNECTIONS", 4)),
+            pool_maxsize=int(_env_float("SUPABASE_POOL_MAXSIZE", 32)),
+            connect_timeout=_env_float("SUPABASE_CONNECT_TIMEOUT", 5),
+            read_timeout=_env_float("SUPABASE_READ_TIMEOUT", 30),
+            max_retries=int(_env_float("SUPABASE_MAX_RETRIES", 3)),
+            backoff=_env_float("SUPABASE_RETRY_BACKOFF", 0.5),
+            max_rows=int(_env_float("SUPABASE_MAX_ROWS", 1000)),
+        )
+
+    def rest_url(self, table):
+        return f"{self.url}/rest/v1/{table}"
+
+    def request(self, method, table, params=None, json=None, headers=None, timeout=None, retry=None):
+        """
+        Call /rest/v1/<table>. Returns the final Response (callers check status),
+        or raises requests.RequestException once retries are exhausted.
+
+        `retry` defaults to True for idempotent methods; pass retry=True for POSTs
+        that are safe to repeat, e.g. merge-duplicates upserts.
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if retry else 0)
+        url = self.rest_url(table)
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, params=params, json=json, headers=headers,
+                                            timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(time.perf_counter() - started, failed=last)
+                if last:
+                    raise
+                self._sleep_before_retry(attempt, None)
+                continue
+
+            failed = resp.status_code >= 500 or resp.status_code == 429
+            self._record(time.perf_counter() - started, failed=failed and last)
+            if resp.status_code in RETRY_STATUSES and not last:
+                self._sleep_before_retry(attempt, resp.headers.get("Retry-After"))
+                continue
+            return resp
+
+    def get(self, table, params=None, **kwargs):
+        return self.request("GET", table, params=params, **kwargs)
+
+    def post(self, table, json=None, **kwargs):
+        return self.request("POST", table, json=json, **kwargs)
+
+    def patch(self, table, params=None, json=None, **kwargs):
+        return self.request("PATCH", table, params=params, json=json, **kwargs)
+
+    def iter_pages(self, table, params=None, page_size=1000, key="id"):
+        """
+        Yield lists of rows from `table` using keyset pagination on `key`
+        (order=key.asc, key=gt.<last seen>), so large tables are never held in
+        memory at once. Raises requests.HTTPError on a failed page.
+
+        `page_size` is capped at max_rows. A short page is not taken as the
+        end, since the server may cap pages below what was asked for; paging
+        stops at the first empty page.
+        """
+        params = dict(params or {})
+        page_size = min(page_size, self.max_rows)
+        last = None
+        while True:
+            page_params = {**params, "order": f"{key}.asc", "limit": str(page_size)}
+            if last is not None:
+                page_params[key] = f"gt.{last}"
+            resp = self.get(table, params=page_params)
+            resp.raise_for_status()
+            rows = resp.json()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][key]
+
+    def select_in(self, table, values, column="id", select="*", batch_size=100):
+        """
+        Rows of `table` whose `column` is one of `values`, `batch_size` values
+        per in.(...) filter. Values must not contain commas or parentheses
+        (ids and uuids are fine). Raises requests.HTTPError on a failed request.
+        """
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), batch_size):
+            resp = self.get(table, params={"select": select, column: f"in.({','.join(map(str, values[i:i + batch_size]))})"})
+            resp.raise_for_status()
+            rows.extend(resp.json())
+        return rows
+
+    def _retry_delay(self, attempt, retry_after):
+        """Count a retry and return how long to wait before it (Retry-After wins over backoff)."""
+        with self._lock:
+            self._counters["retries"] += 1
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.backoff * (2 ** attempt)
+        return min(delay, 30.0)
+
+    def _sleep_before_retry(self, attempt, retry_after):
+        time.sleep(self._retry_delay(attempt, retry_after))
+
+    def _record(self, elapsed, failed):
+        with self._lock:
+            c = self._counters
+            c["requests"] += 1
+            c["failures"] += int(failed)
+            c["latency_seconds_total"] += elapsed
+            c["latency_seconds_max"] = max(c["latency_seconds_max"], elapsed)
+
+    def stats(self):
+        """Request/retry/failure/latency counters plus connection reuse from the urllib3 pools."""
+        with self._lock:
+            stats = dict(self._counters)
+        opened = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        stats["connections_opened"] = opened
+        stats["connections_reused"] = max(0, sent - opened)
+        stats["latency_seconds_avg"] = stats["latency_seconds_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client built from the environment, or None if Supabase is not configured."""
+    global _client
+    url = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    with _client_lock:
+        if _client is not None and (_client.url, _client.headers["apikey"]) != (url, key):
+            _client.close()
+            _client = None
+        if _client is None:
+            _client = SupabaseClient.from_env()
+        return _client
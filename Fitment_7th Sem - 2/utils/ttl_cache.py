@@ -0,0 +1,170 @@
+"""
+Bounded in-process cache with per-entry expiry and LRU eviction.
+
+For data that is costly to fetch or rebuild and changes rarely: a job's
+required skills, normalized candidate profiles. Entries expire `ttl` seconds
+after they were stored, the least recently used entry is evicted once
+`maxsize` entries are held, and invalidate() drops an entry early when its
+source is known to have changed. Thread-safe; one instance per process.
+
+Each gunicorn worker has its own caches, so an invalidation seen by one
+worker is also written to an InvalidationLog: a table in a SQLite file
+shared by every process on the host. The other workers replay it, at most
+`interval` seconds (default 1) after it was written, on their next lookup.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name, maxsize=1024, ttl=300.0, clock=time.monotonic, log=None):
+        self.name = name
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._log = log
+        if log is not None:
+            log.attach(self)
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "stale": 0, "invalidations": 0}
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key, default=None, check=None):
+        """
+        The cached value, or `default` if absent or expired. `check(value)`,
+        if given, must return True for the value to be used; a value that
+        fails it is dropped and counted as stale.
+        """
+        if self._log is not None:
+            self._log.sync()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= self._clock():
+                del self._data[key]
+                self._stats["expired"] += 1
+                entry = _MISSING
+            elif entry is not _MISSING and check is not None and not check(entry[1]):
+                del self._data[key]
+                self._stats["stale"] += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        """Drop `key`; returns True if it was cached."""
+        with self._lock:
+            found = self._data.pop(key, _MISSING) is not _MISSING
+            self._stats["invalidations"] += int(found)
+            return found
+
+    def clear(self):
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self._stats["invalidations"] += n
+            return n
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    cache       TEXT NOT NULL,
+    key         TEXT,                   -- JSON; NULL clears the whole cache
+    created_at  REAL NOT NULL
+);
+"""
+
+
+class InvalidationLog:
+    def __init__(self, db_path, interval=1.0, keep_for=3600.0):
+        self.db_path = db_path
+        self.interval = float(interval)
+        self.keep_for = float(keep_for)
+        self._caches = {}
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._next_sync = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_LOG_SCHEMA)
+        # a new process starts with empty caches: nothing older needs replaying
+        self._seen = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def attach(self, cache):
+        self._caches[cache.name] = cache
+
+    def publish(self, cache, key=None):
+        """Invalidate `key` (or everything) in `cache` here and, through the log, in every other process."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT INTO cache_invalidations (cache, key, created_at) VALUES (?, ?, ?)",
+                     (cache.name, None if key is None else json.dumps(key), now))
+        conn.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (now - self.keep_for,))
+        return cache.clear() if key is None else cache.invalidate(key)
+
+    def sync(self, force=False):
+        """Replay invalidations written by other processes since the last sync (rate-limited to `interval`)."""
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = now + self.interval
+            try:
+                rows = self._conn().execute(
+                    "SELECT seq, cache, key FROM cache_invalidations WHERE seq > ? ORDER BY seq", (self._seen,)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return
+            for seq, name, key in rows:
+                cache = self._caches.get(name)
+                if cache is not None:
+                    if key is None:
+                        cache.clear()
+                    else:
+                        key = json.loads(key)
+                        cache.invalidate(tuple(key) if isinstance(key, list) else key)
+                self._seen = seq
+        finally:
+            self._sync_lock.release()